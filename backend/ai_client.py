@@ -0,0 +1,335 @@
+"""Connection pooling, retries, deadlines and circuit breakers for Claude API calls."""
+
+import asyncio
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from instrumentation import counter, gauge
+
+if TYPE_CHECKING:
+    from anthropic import Anthropic, AsyncAnthropic
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits (429) and
+# server errors including "overloaded" (529)
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+# Breaker states as exported by the workout_ai_breaker_state gauge
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+ATTEMPTS = counter("workout_ai_attempts", "Claude API attempts by model and outcome", ["model", "outcome"])
+FALLBACKS = counter("workout_ai_fallbacks", "Calls answered by a fallback model", ["model"])
+BREAKER_STATE = gauge("workout_ai_breaker_state", "Circuit breaker per model (0 closed, 1 open, 2 half open)", ["model"])
+
+
+class AIUnavailableError(Exception):
+    """No model could answer within the retry budget; `retry_after` hints when to try again."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an API error is transient (rate limit, overload, server error, timeout, lost connection)."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUSES
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+
+    from anthropic import APIConnectionError  # also covers APITimeoutError
+    return isinstance(error, APIConnectionError)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked to wait (`retry-after` header), if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _error_name(error: BaseException) -> str:
+    """Short label for an error: its HTTP status or class name."""
+    status = getattr(error, "status_code", None)
+    return str(status) if status is not None else type(error).__name__
+
+
+def pooled_clients(api_key: Optional[str], max_connections: int = 20) -> "tuple[Anthropic, AsyncAnthropic]":
+    """
+    Sync and async SDK clients sharing one tuned pool size.
+
+    Connections are kept alive between analyses, and the SDK's own retries
+    are off: RetryPolicy retries within the call's deadline instead.
+    """
+    import httpx
+    from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=60.0
+    )
+    return (
+        Anthropic(api_key=api_key, max_retries=0, http_client=DefaultHttpxClient(limits=limits)),
+        AsyncAnthropic(api_key=api_key, max_retries=0, http_client=DefaultAsyncHttpxClient(limits=limits)),
+    )
+
+
+class CircuitBreaker:
+    """
+    Stops calling a model that keeps failing.
+
+    After `failure_threshold` transient failures in a row the breaker opens
+    and calls are refused for `reset_seconds`. Then a single trial call is
+    let through (half open): success closes the breaker, failure opens it
+    again.
+    """
+
+    def __init__(self, model: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, model=model)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        BREAKER_STATE.set(STATE_VALUES[state], model=self.model)
+
+    def allow(self) -> bool:
+        """Whether a call may be made now."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a trial call through."""
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_cancelled(self) -> None:
+        """Free the trial slot of a call that ended without an outcome, leaving the state as it is."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+
+class RetryPolicy:
+    """
+    How one logical call is retried.
+
+    Every call has a `deadline` in seconds. Each attempt gets at most
+    `attempt_timeout` of what is left. Transient failures are retried up to
+    `max_attempts` times per model, after a full-jitter exponential backoff
+    (or the server's `retry-after`, if longer). When a wait would not leave
+    `min_attempt_seconds` before the deadline, or the model's breaker is
+    open, the next model in the call's list is tried instead.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        deadline: float = 120.0,
+        attempt_timeout: float = 60.0,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        min_attempt_seconds: float = 2.0,
+        breaker_failures: int = 5,
+        breaker_reset_seconds: float = 30.0
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_attempt_seconds = min_attempt_seconds
+        self.breaker_failures = breaker_failures
+        self.breaker_reset_seconds = breaker_reset_seconds
+
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        """The circuit breaker of a model (shared by every call)."""
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = self._breakers[model] = CircuitBreaker(
+                    model, self.breaker_failures, self.breaker_reset_seconds
+                )
+            return breaker
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (1 for the first retry)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def attempts(self, models: Sequence[str]) -> "CallAttempts":
+        """Attempts for one call, trying `models` in order."""
+        return CallAttempts(self, list(models))
+
+
+class Attempt:
+    """
+    One try of a call, used as a context manager.
+
+    A transient error raised inside it is recorded and swallowed so the
+    loop moves on to the next attempt; anything else propagates. Call
+    `commit()` once output has been passed on (e.g. streamed text), after
+    which errors are no longer retried.
+    """
+
+    def __init__(self, attempts: "CallAttempts", model: str, timeout: float):
+        self._attempts = attempts
+        self.model = model
+        self.timeout = timeout
+        self.committed = False
+
+    def commit(self) -> None:
+        self.committed = True
+
+    def __enter__(self) -> "Attempt":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        breaker = self._attempts.policy.breaker(self.model)
+        if exc is None:
+            breaker.record_success()
+            ATTEMPTS.inc(model=self.model, outcome="ok")
+            self._attempts.succeed(self.model)
+            return False
+
+        if not isinstance(exc, Exception):
+            # Cancelled or interrupted: says nothing about the model either way
+            breaker.record_cancelled()
+            return False
+
+        if not is_retryable(exc):
+            # The API answered (e.g. 400): not a sign the model is unavailable
+            breaker.record_success()
+            ATTEMPTS.inc(model=self.model, outcome=_error_name(exc))
+            return False
+
+        breaker.record_failure()
+        ATTEMPTS.inc(model=self.model, outcome=_error_name(exc))
+        self._attempts.fail(exc)
+        return not self.committed
+
+
+class CallAttempts:
+    """
+    The attempts of one call; iterate (or `async for`) and run each in `with attempt:`.
+
+        for attempt in policy.attempts([model, fallback]):
+            with attempt:
+                response = client.messages.create(**request, model=attempt.model, timeout=attempt.timeout)
+
+    The loop ends after the first success. When the models, attempts or
+    deadline are used up it raises AIUnavailableError instead.
+    """
+
+    def __init__(self, policy: RetryPolicy, models: List[str]):
+        self.policy = policy
+        self.models = models
+        self.expires = time.monotonic() + policy.deadline
+        self.done = False
+        self.model: Optional[str] = None
+        self._index = 0
+        self._tries = 0
+        self._tries_on_model = 0
+        self._error: Optional[BaseException] = None
+
+    def succeed(self, model: str) -> None:
+        self.done = True
+        self.model = model
+        if model != self.models[0]:
+            FALLBACKS.inc(model=model)
+
+    def fail(self, error: BaseException) -> None:
+        self._error = error
+
+    def _unavailable(self, retry_in: Optional[float] = None) -> AIUnavailableError:
+        if self._error is not None:
+            hint = retry_after(self._error)
+            message = f"Claude unavailable after {self._tries} attempt(s): {self._error}"
+            error = AIUnavailableError(message, hint if hint is not None else retry_in)
+            error.__cause__ = self._error
+            return error
+        return AIUnavailableError(f"Claude unavailable: circuit open for {', '.join(self.models)}", retry_in)
+
+    def _plan(self) -> Iterator[tuple]:
+        """Yield (delay, model, timeout) for each attempt until one succeeds."""
+        retry_in = None
+        while not self.done:
+            if self._index >= len(self.models):
+                raise self._unavailable(retry_in)
+
+            model = self.models[self._index]
+            breaker = self.policy.breaker(model)
+            tries_here = self._tries_on_model
+            delay = 0.0
+            if tries_here:
+                delay = self.policy.backoff(tries_here)
+                hint = retry_after(self._error) if self._error is not None else None
+                if hint is not None:
+                    delay = max(delay, hint)
+
+            remaining = self.expires - time.monotonic()
+            if tries_here >= self.policy.max_attempts or remaining - delay < self.policy.min_attempt_seconds:
+                self._next_model()
+                if remaining < self.policy.min_attempt_seconds:
+                    raise self._unavailable(retry_in)
+                continue
+
+            if not breaker.allow():
+                retry_in = min(retry_in, breaker.retry_in()) if retry_in is not None else breaker.retry_in()
+                self._next_model()
+                continue
+
+            self._tries += 1
+            self._tries_on_model += 1
+            yield delay, model, min(self.policy.attempt_timeout, remaining - delay)
+
+    def _next_model(self) -> None:
+        self._index += 1
+        self._tries_on_model = 0
+
+    def __iter__(self) -> Iterator[Attempt]:
+        for delay, model, timeout in self._plan():
+            if delay:
+                time.sleep(delay)
+            yield Attempt(self, model, timeout)
+
+    async def __aiter__(self) -> AsyncIterator[Attempt]:
+        for delay, model, timeout in self._plan():
+            if delay:
+                await asyncio.sleep(delay)
+            yield Attempt(self, model, timeout)
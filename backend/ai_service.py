@@ -1,24 +1,385 @@
 """Claude AI integration for workout analysis."""
 
+import asyncio
 import json
-from typing import List
-from anthropic import Anthropic
-from models import WorkoutLog, AIAnalysis, MachineContext
+import os
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+from models import WorkoutLog, AIAnalysis, MachineContext, TokenUsage
+from summary_store import normalize_body_area
+from exercise_metrics import normalize_exercise_name
+from analysis_cache import AnalysisCache
+from ai_client import RetryPolicy, pooled_clients
+from json_repair import extract_object, repair as repair_json
+from instrumentation import counter, histogram, FAST_BUCKETS, SLOW_BUCKETS
 from datetime import datetime
 
+if TYPE_CHECKING:
+    # The SDK takes a noticeable share of startup; it is imported on first use
+    from anthropic import Anthropic, AsyncAnthropic
+
+# Bump whenever _build_analysis_prompt changes meaningfully, so batch
+# re-analysis can find logs analysed with an older prompt
+PROMPT_VERSION = "3"
+
+PROMPT_BUILD_SECONDS = histogram(
+    "workout_ai_prompt_build_seconds", "Building an analysis request from a log and its history",
+    buckets=FAST_BUCKETS
+)
+API_SECONDS = histogram(
+    "workout_ai_request_seconds", "Claude API round-trip by call type (stream: until the final message)",
+    ["mode"], SLOW_BUCKETS
+)
+API_ERRORS = counter("workout_ai_request_errors", "Claude API calls that raised, by call type", ["mode"])
+TOKENS = counter("workout_ai_tokens", "Tokens used by analyses, by kind", ["kind"])
+PARSE_FAILURES = counter("workout_ai_parse_failures", "Responses that couldn't be parsed into an analysis")
+CONTEXT_REPAIRS = counter(
+    "workout_ai_context_repairs", "Malformed MACHINE CONTEXT JSON fixed locally or by re-asking", ["method"]
+)
+ROUTED = counter("workout_ai_routed", "Analyses by the model they were routed to", ["model"])
+CACHE_LOOKUPS = counter("workout_ai_cache_lookups", "Analysis cache lookups by result", ["result"])
+
+# Fields and allowed values of the MACHINE CONTEXT JSON
+MACHINE_CONTEXT_TEMPLATE = """{
+  "training_phase": "early_adaptation|maintenance|progressive_overload|deload",
+  "overall_fatigue": "low|moderate|high|very_high",
+  "injury_risk": "low|low_to_moderate|moderate|moderate_to_high|high",
+  "problem_areas": ["area1", "area2"],
+  "movement_quality": "excellent|good|acceptable|poor",
+  "recommended_focus": ["focus1", "focus2"],
+  "load_adjustment": "increase|maintain|maintain_or_slightly_reduce|reduce|rest",
+  "confidence_score": 0.75
+}"""
+
+# Static instructions sent as a cacheable system block on every request
+SYSTEM_PROMPT = """You are an expert fitness coach and movement analyst. Your role is to:
+1. Analyze workout data objectively
+2. Detect warning signals (fatigue accumulation, injury risk)
+3. Identify patterns across multiple training sessions
+4. Provide conservative, safety-focused recommendations
+5. Generate both human-friendly insights and structured machine context
+
+Your analysis should be:
+- Evidence-based and specific
+- Conservative (err on the side of safety)
+- Encouraging but honest
+- Actionable
+
+## HISTORY TABLE
+
+Previous sessions are given as a pipe-separated table, oldest first, with columns:
+- date: YYYY-MM-DD
+- type: strength | run | recovery
+- eff: perceived effort, e=easy m=moderate h=hard
+- fat: fatigue 1-10 (1=fresh, 10=exhausted)
+- vol: strength volume as total sets x total reps
+- run: distance km / duration min / pace min per km
+- pain: severity (mild|moderate|severe) followed by affected body areas
+- risk: injury_risk from that day's earlier analysis
+A "-" means the value was not recorded. Gaps between dates are rest days
+with no log.
+
+## RELATED EARLIER SESSIONS
+
+Older sessions chosen for relevance rather than recency: the last times the
+same body area hurt, the same exercise was done or the same workout type was
+trained. Same columns as the history table, oldest first, plus:
+- match: why the session was chosen (area:<body area>, ex:<exercise>, type)
+These sessions are not contiguous; gaps between them say nothing about rest.
+
+## OUTPUT FORMAT
+
+You MUST provide your analysis in exactly this format:
+
+### HUMAN INSIGHT
+[2-3 sentences of encouraging, practical feedback written naturally]
+
+### MACHINE CONTEXT
+```json
+""" + MACHINE_CONTEXT_TEMPLATE + """
+```
+
+Guidelines:
+- Be specific about problem areas and recommendations
+- Confidence score should reflect data quality and certainty
+- Conservative recommendations prioritize long-term health
+- Focus on actionable next steps
+"""
+
+# Asks for a malformed MACHINE CONTEXT again, without the log or its history
+REPAIR_PROMPT = """This JSON was meant to follow the template below but is not valid JSON.
+Reply with only the corrected JSON object, keeping its values.
+
+Template:
+{template}
+
+JSON:
+{text}"""
+REPAIR_MAX_TOKENS = 500
+
+# With a fast model configured, logs showing any of these go to the main model
+DEEP_FATIGUE = 7
+DEEP_EXERCISES = 6
+DEEP_REFLECTION_CHARS = 300
+ELEVATED_RISKS = ("moderate", "high")
+
+HISTORY_HEADER = "date|type|eff|fat|vol|run|pain|risk"
+RELATED_HEADER = HISTORY_HEADER + "|match"
+
+# Rough characters per token, for budgeting history rows
+CHARS_PER_TOKEN = 4
+
+
+def _num(value: Optional[float]) -> str:
+    """Format an optional number compactly ("-" when missing)."""
+    if value is None:
+        return "-"
+    return f"{value:g}"
+
+
+def _history_row(log: WorkoutLog) -> str:
+    """Encode one history log as a compact table row."""
+    effort = log.perceived_effort.value[0] if log.perceived_effort else "-"
+
+    volume = "-"
+    if log.exercises:
+        sets = sum(ex.sets or 0 for ex in log.exercises)
+        reps = sum((ex.sets or 1) * (ex.reps or 0) for ex in log.exercises)
+        volume = f"{sets}x{reps}"
+
+    run = "-"
+    rd = log.running_data
+    if rd and (rd.distance_km or rd.duration_minutes or rd.pace_min_per_km):
+        run = f"{_num(rd.distance_km)}/{_num(rd.duration_minutes)}/{_num(rd.pace_min_per_km)}"
+
+    pain = "-"
+    pt = log.pain_or_tightness
+    if pt and (pt.severity or pt.body_areas):
+        severity = pt.severity.value if pt.severity else "?"
+        pain = f"{severity}:{','.join(pt.body_areas or [])}"
+
+    risk = "-"
+    if log.ai_analysis and log.ai_analysis.machine_context.injury_risk:
+        risk = log.ai_analysis.machine_context.injury_risk
+
+    return "|".join([
+        log.date.isoformat(),
+        log.workout_type.value,
+        effort,
+        _num(log.fatigue_level),
+        volume,
+        run,
+        pain,
+        risk
+    ])
+
+
+def _match_reasons(log: WorkoutLog, current_log: WorkoutLog) -> str:
+    """What an earlier log has in common with the one being analysed."""
+    def areas(entry: WorkoutLog) -> List[str]:
+        pain = entry.pain_or_tightness
+        return [normalize_body_area(a) for a in (pain.body_areas or [])] if pain else []
+
+    def exercises(entry: WorkoutLog) -> List[str]:
+        return [normalize_exercise_name(ex.name) for ex in entry.exercises or []]
+
+    current_areas, current_exercises = set(areas(current_log)), set(exercises(current_log))
+    reasons = [f"area:{a}" for a in dict.fromkeys(areas(log)) if a in current_areas]
+    reasons += [f"ex:{e}" for e in dict.fromkeys(exercises(log)) if e in current_exercises]
+    if log.workout_type == current_log.workout_type:
+        reasons.append("type")
+    return ",".join(reasons) or "-"
+
+
+def history_row_tokens(log: WorkoutLog) -> int:
+    """Approximate prompt tokens taken by a log's history row."""
+    return len(_history_row(log)) // CHARS_PER_TOKEN + 1
+
+
+def needs_deep_analysis(log: WorkoutLog, history_logs: Optional[List[WorkoutLog]] = None) -> bool:
+    """
+    Whether a log is complex enough for the main model: pain or tightness,
+    high fatigue, a long session or reflection, or pain or elevated injury
+    risk in its recent history.
+    """
+    pain = log.pain_or_tightness
+    if pain and (pain.body_areas or pain.severity or pain.description):
+        return True
+    if (log.fatigue_level or 0) >= DEEP_FATIGUE:
+        return True
+    if len(log.exercises or []) > DEEP_EXERCISES or len(log.free_text_reflection or "") > DEEP_REFLECTION_CHARS:
+        return True
+
+    for entry in history_logs or []:
+        if entry.pain_or_tightness and entry.pain_or_tightness.body_areas:
+            return True
+        risk = entry.ai_analysis.machine_context.injury_risk if entry.ai_analysis else None
+        if risk and any(level in risk for level in ELEVATED_RISKS):
+            return True
+    return False
+
+
+class ContextParseError(ValueError):
+    """The MACHINE CONTEXT JSON of a response could not be parsed, even after repair."""
+
+    def __init__(self, message: str, context_text: str):
+        super().__init__(message)
+        self.context_text = context_text
+
+
+@contextmanager
+def _api_call(mode: str) -> Iterator[None]:
+    """Time a Claude API call and count it if it fails."""
+    try:
+        with API_SECONDS.time(mode=mode):
+            yield
+    except Exception:
+        API_ERRORS.inc(mode=mode)
+        raise
+
+
+def _count_cache_lookup(cached: Optional[AIAnalysis]) -> Optional[AIAnalysis]:
+    """Count an analysis cache lookup and pass its result through."""
+    CACHE_LOOKUPS.inc(result="hit" if cached else "miss")
+    return cached
+
 
 class ClaudeAnalyzer:
-    """Handles AI-powered workout analysis using Claude."""
+    """
+    Handles AI-powered workout analysis using Claude.
 
-    def __init__(self, api_key: str, model: str = "claude-sonnet-4-20250514"):
-        """Initialize Claude client."""
-        self.client = Anthropic(api_key=api_key)
+    The Anthropic SDK is imported and its clients created on the first
+    analysis (or by `warm_up`), not at construction, to keep startup fast.
+
+    Every call goes through `policy`: transient errors are retried within a
+    deadline, and a model whose circuit breaker is open is skipped for the
+    other one. With a `fast_model`, simple logs are analysed by it and
+    complex or injury-flagged ones by `model` (see needs_deep_analysis).
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "claude-sonnet-4-20250514",
+        client: Optional["Anthropic"] = None,
+        async_client: Optional["AsyncAnthropic"] = None,
+        cache: Optional[AnalysisCache] = None,
+        fast_model: Optional[str] = None,
+        policy: Optional[RetryPolicy] = None,
+        max_connections: int = 20
+    ):
+        """Initialize settings, optional clients (pass fakes to run without the API) and result cache."""
+        self.api_key = api_key
+        self._client = client
+        self._async_client = async_client
+        self._client_lock = threading.Lock()
         self.model = model
+        self.fast_model = fast_model if fast_model != model else None
+        self.policy = policy or RetryPolicy()
+        self.max_connections = max_connections
+        self.cache = cache
+
+    def _create_clients(self) -> None:
+        """Create whichever SDK clients weren't passed in, on pooled connections."""
+        with self._client_lock:
+            if self._client is None or self._async_client is None:
+                client, async_client = pooled_clients(self.api_key, self.max_connections)
+                self._client = self._client or client
+                self._async_client = self._async_client or async_client
+
+    @property
+    def client(self) -> "Anthropic":
+        """Synchronous SDK client, created on first use."""
+        if self._client is None:
+            self._create_clients()
+        return self._client
+
+    @property
+    def async_client(self) -> "AsyncAnthropic":
+        """Async SDK client, created on first use."""
+        if self._async_client is None:
+            self._create_clients()
+        return self._async_client
+
+    @property
+    def models(self) -> List[str]:
+        """Models analyses may come from."""
+        return [model for model in (self.model, self.fast_model) if model]
+
+    def route(self, current_log: WorkoutLog, history_logs: Optional[List[WorkoutLog]] = None) -> str:
+        """Model to analyse a log with."""
+        if self.fast_model and not needs_deep_analysis(current_log, history_logs):
+            return self.fast_model
+        return self.model
+
+    def _fallbacks(self, model: str) -> List[str]:
+        """A model followed by the others to fall back to."""
+        return [model] + [other for other in self.models if other != model]
+
+    def _create(self, request: dict, mode: str) -> Tuple[object, str]:
+        """messages.create with retries and fallback; returns the response and the model that gave it."""
+        with _api_call(mode):
+            attempts = self.policy.attempts(self._fallbacks(request["model"]))
+            for attempt in attempts:
+                with attempt:
+                    response = self.client.messages.create(
+                        **{**request, "model": attempt.model}, timeout=attempt.timeout
+                    )
+        return response, attempts.model
+
+    async def _create_async(self, request: dict, mode: str) -> Tuple[object, str]:
+        """Async variant of _create."""
+        with _api_call(mode):
+            attempts = self.policy.attempts(self._fallbacks(request["model"]))
+            async for attempt in attempts:
+                with attempt:
+                    response = await self.async_client.messages.create(
+                        **{**request, "model": attempt.model}, timeout=attempt.timeout
+                    )
+        return response, attempts.model
+
+    def _complete(self, request: dict, mode: str) -> AIAnalysis:
+        """Call Claude and parse the analysis, re-asking for a MACHINE CONTEXT that can't be repaired."""
+        response, model = self._create(request, mode)
+        try:
+            return self._analysis_from_response(response, model)
+        except ContextParseError as error:
+            repaired, _ = self._create(self._repair_request(error.context_text), "repair")
+            return self._analysis_from_response(response, model, repaired)
+
+    async def _complete_async(self, request: dict, mode: str) -> AIAnalysis:
+        """Async variant of _complete."""
+        response, model = await self._create_async(request, mode)
+        try:
+            return self._analysis_from_response(response, model)
+        except ContextParseError as error:
+            repaired, _ = await self._create_async(self._repair_request(error.context_text), "repair")
+            return self._analysis_from_response(response, model, repaired)
+
+    def _repair_request(self, context_text: str) -> dict:
+        """A small request for a corrected MACHINE CONTEXT, answered by the fast model if there is one."""
+        return {
+            "model": self.fast_model or self.model,
+            "max_tokens": REPAIR_MAX_TOKENS,
+            "temperature": 0,
+            "messages": [{
+                "role": "user",
+                "content": REPAIR_PROMPT.format(template=MACHINE_CONTEXT_TEMPLATE, text=context_text)
+            }]
+        }
+
+    def warm_up(self) -> None:
+        """Import the SDK and create both clients ahead of the first analysis."""
+        self.client
+        self.async_client
 
     def analyze_workout(
         self,
         current_log: WorkoutLog,
-        history_logs: List[WorkoutLog] = None
+        history_logs: List[WorkoutLog] = None,
+        use_cache: bool = True,
+        related_logs: Optional[List[WorkoutLog]] = None
     ) -> AIAnalysis:
         """
         Analyze a workout log with optional historical context.
@@ -26,56 +387,247 @@ class ClaudeAnalyzer:
         Args:
             current_log: The workout log to analyze
             history_logs: Optional list of recent logs for pattern detection
+            use_cache: Return a cached result for an identical request if there is one
+            related_logs: Optional older logs chosen for relevance (see history_retrieval)
 
         Returns:
             AIAnalysis object with human insight and machine context
         """
-        # Build the analysis prompt
-        prompt = self._build_analysis_prompt(current_log, history_logs)
-
-        # Call Claude API
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=2000,
-            temperature=0.3,  # Lower temperature for more consistent analysis
-            messages=[
+        request = self._build_request(current_log, history_logs, related_logs)
+        cache_key = self._cache_key(request)
+
+        if cache_key and use_cache:
+            cached = _count_cache_lookup(self.cache.get(cache_key))
+            if cached:
+                return cached
+
+        # Call Claude API and parse the response
+        analysis = self._complete(request, "sync")
+
+        # Answers from a fallback model aren't cached, so the next request tries the routed one again
+        if cache_key and analysis.model == request["model"]:
+            self.cache.put(cache_key, analysis)
+
+        return analysis
+
+    def is_outdated(self, analysis: Optional[AIAnalysis], log_version: Optional[int] = None) -> bool:
+        """Check whether an analysis is missing, came from another model/prompt, or predates a log edit."""
+        return (
+            analysis is None
+            or analysis.model not in self.models
+            or analysis.prompt_version != PROMPT_VERSION
+            or (log_version is not None and analysis.log_version is not None and analysis.log_version < log_version)
+        )
+
+    def analyze_period(
+        self,
+        rollup: dict,
+        logs: List[WorkoutLog],
+        use_cache: bool = True
+    ) -> AIAnalysis:
+        """Analyze a weekly or monthly rollup together with its sessions."""
+        aggregates = {
+            key: value for key, value in rollup.items()
+            if key not in ("dates", "source_hash", "generated_at", "ai_analysis")
+        }
+        prompt_parts = [
+            f"## {rollup['kind'].upper()} ROLLUP {rollup['period']} "
+            f"({rollup['start_date']} to {rollup['end_date']})\n",
+            json.dumps(aggregates, ensure_ascii=False),
+            "\n## SESSIONS\n",
+            HISTORY_HEADER,
+            *(_history_row(log) for log in logs),
+            "\nAnalyze this period as a whole: overall load, fatigue and pain trends, "
+            "and what to adjust in the next period."
+        ]
+
+        request = self._build_request_for_prompt("\n".join(prompt_parts))
+        cache_key = self._cache_key(request)
+
+        if cache_key and use_cache:
+            cached = _count_cache_lookup(self.cache.get(cache_key))
+            if cached:
+                return cached
+
+        analysis = self._complete(request, "period")
+
+        if cache_key and analysis.model == request["model"]:
+            self.cache.put(cache_key, analysis)
+
+        return analysis
+
+    async def analyze_workout_async(
+        self,
+        current_log: WorkoutLog,
+        history_logs: List[WorkoutLog] = None,
+        use_cache: bool = True,
+        related_logs: Optional[List[WorkoutLog]] = None
+    ) -> AIAnalysis:
+        """Async variant of analyze_workout that doesn't hold a thread during the API call."""
+        request = self._build_request(current_log, history_logs, related_logs)
+        cache_key = self._cache_key(request)
+
+        if cache_key and use_cache:
+            cached = _count_cache_lookup(await asyncio.to_thread(self.cache.get, cache_key))
+            if cached:
+                return cached
+
+        analysis = await self._complete_async(request, "async")
+
+        if cache_key and analysis.model == request["model"]:
+            await asyncio.to_thread(self.cache.put, cache_key, analysis)
+
+        return analysis
+
+    async def stream_analysis(
+        self,
+        current_log: WorkoutLog,
+        history_logs: List[WorkoutLog] = None,
+        use_cache: bool = True,
+        related_logs: Optional[List[WorkoutLog]] = None
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Stream an analysis as it is generated.
+
+        Yields ("insight", text) chunks of the human insight as they arrive,
+        ("context", fields) as machine context fields complete, and finally
+        ("analysis", AIAnalysis) parsed from the full response.
+        """
+        request = self._build_request(current_log, history_logs, related_logs)
+        cache_key = self._cache_key(request)
+
+        if cache_key and use_cache:
+            cached = _count_cache_lookup(await asyncio.to_thread(self.cache.get, cache_key))
+            if cached:
+                yield ("insight", cached.human_insight)
+                yield ("context", cached.machine_context.model_dump())
+                yield ("analysis", cached)
+                return
+
+        # Failed attempts are retried (or fall back) only until the first event has been sent
+        with _api_call("stream"):
+            attempts = self.policy.attempts(self._fallbacks(request["model"]))
+            async for attempt in attempts:
+                with attempt:
+                    parser = StreamingAnalysisParser()
+                    async with self.async_client.messages.stream(
+                        **{**request, "model": attempt.model}, timeout=attempt.timeout
+                    ) as stream:
+                        async for text in stream.text_stream:
+                            for event in parser.feed(text):
+                                attempt.commit()
+                                yield event
+                        response = await stream.get_final_message()
+
+        for event in parser.close():
+            yield event
+
+        try:
+            analysis = self._analysis_from_response(response, attempts.model)
+        except ContextParseError as error:
+            repaired, _ = await self._create_async(self._repair_request(error.context_text), "repair")
+            analysis = self._analysis_from_response(response, attempts.model, repaired)
+
+        if cache_key and analysis.model == request["model"]:
+            await asyncio.to_thread(self.cache.put, cache_key, analysis)
+
+        yield ("analysis", analysis)
+
+    def _analysis_from_response(self, response, model: str, repaired=None) -> AIAnalysis:
+        """
+        Parse a Messages API response and attach its token usage.
+
+        `repaired` is the answer to a repair request for the response's
+        MACHINE CONTEXT, used in its place. Raises ContextParseError if the
+        context can't be parsed and no repair was given yet.
+        """
+        tokens = TokenUsage()
+        for message in (response, repaired):
+            if message is None:
+                continue
+            usage = message.usage
+            tokens.input_tokens += usage.input_tokens
+            tokens.cache_creation_input_tokens += getattr(usage, "cache_creation_input_tokens", None) or 0
+            tokens.cache_read_input_tokens += getattr(usage, "cache_read_input_tokens", None) or 0
+            tokens.output_tokens += usage.output_tokens
+
+        try:
+            analysis = self._parse_analysis_response(
+                response.content[0].text,
+                model,
+                context_text=repaired.content[0].text if repaired is not None else None
+            )
+        except ContextParseError:
+            if repaired is not None:
+                PARSE_FAILURES.inc()
+            raise
+        except (ValueError, IndexError):
+            PARSE_FAILURES.inc()
+            raise
+
+        if repaired is not None:
+            CONTEXT_REPAIRS.inc(method="reask")
+        ROUTED.inc(model=model)
+        for kind, count in tokens.model_dump().items():
+            TOKENS.inc(count, kind=kind.removesuffix("_tokens"))
+
+        analysis.usage = tokens
+        return analysis
+
+    def _cache_key(self, request: dict) -> Optional[str]:
+        """Content hash of a request, or None when caching is disabled."""
+        if self.cache is None:
+            return None
+        return AnalysisCache.make_key(request, PROMPT_VERSION)
+
+    def _build_request(
+        self,
+        current_log: WorkoutLog,
+        history_logs: List[WorkoutLog] = None,
+        related_logs: Optional[List[WorkoutLog]] = None
+    ) -> dict:
+        """Build the messages.create arguments shared by the sync and async paths."""
+        with PROMPT_BUILD_SECONDS.time():
+            # Build the analysis prompt
+            prompt = self._build_analysis_prompt(current_log, history_logs, related_logs)
+
+            return self._build_request_for_prompt(prompt, self.route(current_log, history_logs))
+
+    def _build_request_for_prompt(self, prompt: str, model: Optional[str] = None) -> dict:
+        """Wrap a user prompt with the model settings and cached system block."""
+        return {
+            "model": model or self.model,
+            "max_tokens": 2000,
+            "temperature": 0.3,  # Lower temperature for more consistent analysis
+            "system": [
+                {
+                    "type": "text",
+                    "text": SYSTEM_PROMPT,
+                    # Identical on every call, so Claude can serve it from the prompt cache
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            "messages": [
                 {
                     "role": "user",
                     "content": prompt
                 }
             ]
-        )
-
-        # Parse the response
-        return self._parse_analysis_response(response.content[0].text)
+        }
 
     def _build_analysis_prompt(
         self,
         current_log: WorkoutLog,
-        history_logs: List[WorkoutLog] = None
+        history_logs: List[WorkoutLog] = None,
+        related_logs: Optional[List[WorkoutLog]] = None
     ) -> str:
-        """Build the analysis prompt for Claude."""
+        """Build the per-request part of the prompt (current log and history tables)."""
         prompt_parts = []
 
-        # System context
-        prompt_parts.append("""You are an expert fitness coach and movement analyst. Your role is to:
-1. Analyze workout data objectively
-2. Detect warning signals (fatigue accumulation, injury risk)
-3. Identify patterns across multiple training sessions
-4. Provide conservative, safety-focused recommendations
-5. Generate both human-friendly insights and structured machine context
-
-Your analysis should be:
-- Evidence-based and specific
-- Conservative (err on the side of safety)
-- Encouraging but honest
-- Actionable
-""")
-
         # Current workout data
-        prompt_parts.append("\n## CURRENT WORKOUT LOG\n")
+        prompt_parts.append("## CURRENT WORKOUT LOG\n")
         prompt_parts.append(f"Date: {current_log.date}")
-        prompt_parts.append(f"Type: {current_log.workout_type}")
+        prompt_parts.append(f"Type: {current_log.workout_type.value}")
 
         if current_log.exercises:
             prompt_parts.append("\nExercises:")
@@ -104,7 +656,7 @@ Your analysis should be:
                 prompt_parts.append(f"- Route: {rd.route}")
 
         if current_log.perceived_effort:
-            prompt_parts.append(f"\nPerceived effort: {current_log.perceived_effort}")
+            prompt_parts.append(f"\nPerceived effort: {current_log.perceived_effort.value}")
 
         if current_log.fatigue_level:
             prompt_parts.append(f"Fatigue level: {current_log.fatigue_level}/10")
@@ -116,56 +668,40 @@ Your analysis should be:
             if pain.description:
                 prompt_parts.append(f"Description: {pain.description}")
             if pain.severity:
-                prompt_parts.append(f"Severity: {pain.severity}")
+                prompt_parts.append(f"Severity: {pain.severity.value}")
 
         if current_log.free_text_reflection:
             prompt_parts.append(f"\nUser reflection:\n{current_log.free_text_reflection}")
 
-        # Historical context
+        # Historical context, one table row per log (see HISTORY TABLE in the system prompt)
         if history_logs:
-            prompt_parts.append("\n## RECENT WORKOUT HISTORY\n")
-            for log in history_logs[-7:]:  # Last 7 days max
-                prompt_parts.append(f"\n{log.date} - {log.workout_type}")
-                if log.fatigue_level:
-                    prompt_parts.append(f"  Fatigue: {log.fatigue_level}/10")
-                if log.pain_or_tightness and log.pain_or_tightness.body_areas:
-                    prompt_parts.append(f"  Pain/tightness: {', '.join(log.pain_or_tightness.body_areas)}")
-
-        # Output format instructions
-        prompt_parts.append("""
-
-## OUTPUT FORMAT
-
-You MUST provide your analysis in exactly this format:
-
-### HUMAN INSIGHT
-[2-3 sentences of encouraging, practical feedback written naturally]
-
-### MACHINE CONTEXT
-```json
-{
-  "training_phase": "early_adaptation|maintenance|progressive_overload|deload",
-  "overall_fatigue": "low|moderate|high|very_high",
-  "injury_risk": "low|low_to_moderate|moderate|moderate_to_high|high",
-  "problem_areas": ["area1", "area2"],
-  "movement_quality": "excellent|good|acceptable|poor",
-  "recommended_focus": ["focus1", "focus2"],
-  "load_adjustment": "increase|maintain|maintain_or_slightly_reduce|reduce|rest",
-  "confidence_score": 0.75
-}
-```
-
-Guidelines:
-- Be specific about problem areas and recommendations
-- Confidence score should reflect data quality and certainty
-- Conservative recommendations prioritize long-term health
-- Focus on actionable next steps
-""")
+            prompt_parts.append("\n## HISTORY\n")
+            prompt_parts.append(HISTORY_HEADER)
+            for log in history_logs:
+                prompt_parts.append(_history_row(log))
+
+        # Older sessions picked for relevance, with why each was picked
+        if related_logs:
+            prompt_parts.append("\n## RELATED EARLIER SESSIONS\n")
+            prompt_parts.append(RELATED_HEADER)
+            for log in related_logs:
+                prompt_parts.append(f"{_history_row(log)}|{_match_reasons(log, current_log)}")
 
         return "\n".join(prompt_parts)
 
-    def _parse_analysis_response(self, response_text: str) -> AIAnalysis:
-        """Parse Claude's response into structured AIAnalysis object."""
+    def _parse_analysis_response(
+        self,
+        response_text: str,
+        model: Optional[str] = None,
+        context_text: Optional[str] = None
+    ) -> AIAnalysis:
+        """
+        Parse Claude's response into structured AIAnalysis object.
+
+        Malformed MACHINE CONTEXT JSON is repaired where possible; if it
+        can't be, ContextParseError carries it for a repair request.
+        `context_text` replaces the response's own JSON (a repaired one).
+        """
         # Extract human insight (between HUMAN INSIGHT and MACHINE CONTEXT)
         human_insight = ""
         machine_context_json = ""
@@ -194,15 +730,149 @@ Guidelines:
             elif in_json_section:
                 json_lines.append(line)
 
-        # Parse JSON
-        machine_context_json = "\n".join(json_lines)
-        machine_context_dict = json.loads(machine_context_json)
+        # Parse JSON (without a ```json fence, whatever follows MACHINE CONTEXT)
+        machine_context_json = context_text or "\n".join(json_lines)
+        if not machine_context_json.strip() and "MACHINE CONTEXT" in response_text:
+            machine_context_json = response_text.split("MACHINE CONTEXT", 1)[1]
 
         # Create objects
-        machine_context = MachineContext(**machine_context_dict)
+        machine_context = self._parse_machine_context(machine_context_json, repaired=context_text is not None)
 
         return AIAnalysis(
             human_insight=human_insight.strip(),
             machine_context=machine_context,
-            analyzed_at=datetime.utcnow()
+            analyzed_at=datetime.utcnow(),
+            model=model or self.model,
+            prompt_version=PROMPT_VERSION
         )
+
+    def _parse_machine_context(self, text: str, repaired: bool = False) -> MachineContext:
+        """Validate MACHINE CONTEXT JSON, fixing what json_repair can."""
+        try:
+            return MachineContext(**json.loads(text))
+        except (ValueError, TypeError):
+            pass
+
+        try:
+            context = MachineContext(**json.loads(repair_json(text)))
+        except (ValueError, TypeError) as e:
+            raise ContextParseError(f"Malformed MACHINE CONTEXT: {e}", extract_object(text) or text.strip())
+
+        if not repaired:
+            CONTEXT_REPAIRS.inc(method="local")
+        return context
+
+
+class StreamingAnalysisParser:
+    """
+    Incremental counterpart of ClaudeAnalyzer._parse_analysis_response.
+
+    `feed` takes response text as it streams in and returns the events that
+    can already be determined: ("insight", text) for HUMAN INSIGHT text, and
+    ("context", {field: value}) whenever more MACHINE CONTEXT fields have a
+    complete JSON value. Section markers are matched per line, as in the
+    non-streaming parser.
+    """
+
+    def __init__(self):
+        self.context = {}
+        self._line = ""
+        self._line_sent = 0
+        self._section: Optional[str] = None
+        self._json_lines: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """Consume a chunk of response text."""
+        events = []
+        self._line += chunk
+
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            events.extend(self._complete_line(line))
+            self._line_sent = 0
+
+        # Forward partial insight text right away, unless it could still turn
+        # out to be a section marker or code fence
+        partial = self._line
+        if (
+            self._section == "insight"
+            and partial.strip()
+            and not partial.lstrip().startswith(("#", "`"))
+        ):
+            events.append(("insight", partial[self._line_sent:]))
+            self._line_sent = len(partial)
+
+        return [event for event in events if event[1]]
+
+    def close(self) -> List[Tuple[str, object]]:
+        """Flush the final line once the stream has ended."""
+        line, self._line = self._line, ""
+        return [event for event in self._complete_line(line) if event[1]]
+
+    def _complete_line(self, line: str) -> List[Tuple[str, object]]:
+        """Handle one complete line of the response."""
+        if "HUMAN INSIGHT" in line:
+            self._section = "insight"
+        elif "MACHINE CONTEXT" in line:
+            self._section = None
+        elif "```json" in line:
+            self._section = "json"
+        elif "```" in line and self._section == "json":
+            self._section = None
+        elif self._section == "insight":
+            return [("insight", line[self._line_sent:] + "\n")]
+        elif self._section == "json":
+            self._json_lines.append(line)
+            return self._context_fields()
+        return []
+
+    def _context_fields(self) -> List[Tuple[str, object]]:
+        """Parse the JSON received so far, closing it off, and report new fields."""
+        candidate = "\n".join(self._json_lines).strip().rstrip(",")
+        if not candidate.startswith("{"):
+            return []
+        if not candidate.endswith("}"):
+            candidate += "}"
+
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            # Mid-way through a multi-line value; try again on the next line
+            return []
+
+        new_fields = {
+            key: value for key, value in parsed.items()
+            if key not in self.context or self.context[key] != value
+        }
+        self.context.update(new_fields)
+        return [("context", new_fields)]
+
+
+def create_analyzer(cache: Optional[AnalysisCache] = None) -> ClaudeAnalyzer:
+    """Build an analyzer from environment variables (ANTHROPIC_FAKE selects canned clients)."""
+    settings = {
+        "model": os.getenv("CLAUDE_MODEL", "claude-sonnet-4-20250514"),
+        "fast_model": os.getenv("CLAUDE_FAST_MODEL") or None,
+        "cache": cache,
+        "max_connections": int(os.getenv("ANTHROPIC_MAX_CONNECTIONS", 20)),
+        "policy": RetryPolicy(
+            max_attempts=int(os.getenv("ANTHROPIC_MAX_ATTEMPTS", 3)),
+            deadline=float(os.getenv("ANTHROPIC_DEADLINE_SECONDS", 120)),
+            attempt_timeout=float(os.getenv("ANTHROPIC_TIMEOUT_SECONDS", 60)),
+            breaker_failures=int(os.getenv("ANTHROPIC_BREAKER_FAILURES", 5)),
+            breaker_reset_seconds=float(os.getenv("ANTHROPIC_BREAKER_RESET_SECONDS", 30))
+        ),
+    }
+
+    if os.getenv("ANTHROPIC_FAKE"):
+        # Canned responses for tests and offline development
+        from fake_anthropic import FakeAnthropic, FakeAsyncAnthropic
+        delay = float(os.getenv("ANTHROPIC_FAKE_DELAY", 0))
+        return ClaudeAnalyzer(
+            api_key=None,
+            client=FakeAnthropic(delay=delay),
+            async_client=FakeAsyncAnthropic(delay=delay),
+            **settings
+        )
+
+    return ClaudeAnalyzer(api_key=os.getenv("ANTHROPIC_API_KEY"), **settings)
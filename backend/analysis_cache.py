@@ -0,0 +1,121 @@
+"""Content-addressed cache of AI analysis results."""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from models import AIAnalysis
+from write_journal import atomic_write
+
+
+class AnalysisCache:
+    """
+    Stores AIAnalysis results on disk keyed by a hash of the Claude request.
+
+    The key covers the model, prompt version and every input the prompt is
+    built from, so an identical request can be answered without calling the
+    API. Entries expire after `max_age_days`; beyond `max_entries` the oldest
+    entries are evicted, a tenth of the cache at a time so the directory is
+    scanned only once in a while.
+    """
+
+    def __init__(self, cache_dir: Path, max_entries: int = 1000, max_age_days: float = 90):
+        """Initialize the cache directory."""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+
+        self._lock = threading.Lock()
+        # Counted on the first write rather than at startup
+        self._entry_count: Optional[int] = None
+
+    @staticmethod
+    def make_key(request: dict, prompt_version: str) -> str:
+        """Hash a request (model, parameters, prompt content) and prompt version."""
+        canonical = json.dumps(
+            {"prompt_version": prompt_version, "request": request},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[AIAnalysis]:
+        """Return the cached analysis for a key, if present and not expired."""
+        path = self._path(key)
+
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age > self.max_age_seconds:
+                self._remove(path)
+                return None
+
+            with open(path, 'r', encoding='utf-8') as f:
+                return AIAnalysis(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Corrupt entry; drop it and treat as a miss
+            self._remove(path)
+            return None
+
+    def put(self, key: str, analysis: AIAnalysis) -> None:
+        """Store an analysis, evicting old entries if the cache is full."""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        is_new = not path.exists()
+
+        # The same analysis may be stored at once by a request, a job and a batch run
+        atomic_write(path, analysis.model_dump_json().encode("utf-8"))
+
+        with self._lock:
+            if self._entry_count is None:
+                self._entry_count = sum(1 for _ in self.cache_dir.glob("*/*.json"))
+            elif is_new:
+                self._entry_count += 1
+            over_limit = self._entry_count > self.max_entries
+
+        if over_limit:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove expired entries, then the oldest ones down to a tenth below max_entries."""
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+
+        entries.sort()
+        excess = 0
+        if len(entries) > self.max_entries:
+            excess = len(entries) - self.max_entries + max(1, self.max_entries // 10)
+        kept = 0
+        for i, (mtime, path) in enumerate(entries):
+            if i < excess or now - mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+            else:
+                kept += 1
+
+        with self._lock:
+            self._entry_count = kept
+
+    def _path(self, key: str) -> Path:
+        """Entries are spread over 256 subdirectories by key prefix."""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _remove(self, path: Path) -> None:
+        """Delete an entry file."""
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._entry_count is not None:
+                self._entry_count -= 1
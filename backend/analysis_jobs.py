@@ -0,0 +1,148 @@
+"""Background queue for non-blocking AI analysis."""
+
+import asyncio
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+from models import AnalysisJob, JobStatus
+from ai_service import ClaudeAnalyzer
+from tenants import Tenant
+
+
+class AnalysisJobQueue:
+    """
+    Runs AI analyses on a fixed pool of asyncio workers.
+
+    The number of workers is the concurrency limit for Claude calls, shared
+    by all tenants. Each job runs against its tenant's storage, which stays
+    open until the job has finished. Storage reads and writes run in
+    threads so the event loop stays free while analyses are in flight.
+    `on_finished` is called with the tenant id and job when a job ends.
+    """
+
+    def __init__(
+        self,
+        analyzer: ClaudeAnalyzer,
+        concurrency: int = 2,
+        max_finished_jobs: int = 500,
+        on_finished: Optional[Callable[[str, AnalysisJob], None]] = None
+    ):
+        """Initialize the queue (workers start with `start`)."""
+        self.analyzer = analyzer
+        self.concurrency = concurrency
+        self.max_finished_jobs = max_finished_jobs
+        self.on_finished = on_finished
+
+        # Submitted from request threads as well as the event loop
+        self._jobs: "OrderedDict[str, AnalysisJob]" = OrderedDict()
+        self._owners: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the worker pool on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued jobs are left as they are."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(
+        self,
+        tenant: Tenant,
+        log_date: date,
+        include_history_days: int = 7,
+        refresh: bool = False
+    ) -> AnalysisJob:
+        """Queue an analysis of a tenant's log. Safe to call from sync routes running in threads."""
+        if self._loop is None:
+            raise RuntimeError("Analysis job queue is not running")
+
+        job = AnalysisJob(
+            id=uuid.uuid4().hex,
+            log_date=log_date,
+            include_history_days=include_history_days,
+            refresh=refresh
+        )
+        with self._lock:
+            self._jobs[job.id] = job
+            self._owners[job.id] = tenant.id
+            self._prune()
+
+        tenant.retain()
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (job, tenant))
+        return job
+
+    def get(self, job_id: str, tenant_id: str) -> Optional[AnalysisJob]:
+        """Look up one of a tenant's jobs by id."""
+        with self._lock:
+            if self._owners.get(job_id) != tenant_id:
+                return None
+            return self._jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        """Process jobs one at a time until cancelled."""
+        while True:
+            job, tenant = await self._queue.get()
+            try:
+                await self._run(job, tenant)
+            finally:
+                tenant.release()
+                self._queue.task_done()
+
+    async def _run(self, job: AnalysisJob, tenant: Tenant) -> None:
+        """Analyze one log and save the result."""
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+
+        try:
+            log = await asyncio.to_thread(tenant.storage.get_log, job.log_date)
+            if not log:
+                raise LookupError(f"No log found for {job.log_date}")
+
+            history_logs, related_logs = await asyncio.to_thread(
+                tenant.history_retriever.select, log, job.include_history_days
+            )
+            analysis = await self.analyzer.analyze_workout_async(
+                log, history_logs, use_cache=not job.refresh, related_logs=related_logs
+            )
+
+            saved = await asyncio.to_thread(
+                tenant.storage.attach_analysis, job.log_date, analysis, log.metadata.version
+            )
+            if not saved:
+                raise LookupError(f"Log for {job.log_date} was deleted during analysis")
+
+            job.result = analysis
+            job.status = JobStatus.SUCCEEDED
+
+        except Exception as e:
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+
+        finally:
+            job.finished_at = datetime.utcnow()
+            if self.on_finished:
+                self.on_finished(tenant.id, job)
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond `max_finished_jobs` (call with the lock held)."""
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+        ]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+            del self._owners[job_id]
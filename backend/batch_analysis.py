@@ -0,0 +1,246 @@
+"""Batch re-analysis of workout logs over a date range.
+
+Usage:
+    python batch_analysis.py --start 2025-01-01 --end 2025-03-31
+    python batch_analysis.py --all --concurrency 8 --rpm 100
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from bisect import bisect_left
+from datetime import date, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from models import WorkoutLog
+from storage import WorkoutStorage
+from ai_service import ClaudeAnalyzer, PROMPT_VERSION
+from history_retrieval import HistoryRetriever
+
+
+class RateLimiter:
+    """Spaces out request starts to stay under a requests-per-minute limit."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Wait until the next request is allowed to start."""
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class BatchAnalyzer:
+    """
+    Re-analyses many logs concurrently with a checkpoint for resuming.
+
+    The requested range plus its history lead-in is read from storage once;
+    each target's history window is sliced from that in-memory list, and
+    older relevant logs are added by the history retriever.
+    """
+
+    def __init__(
+        self,
+        storage: WorkoutStorage,
+        analyzer: ClaudeAnalyzer,
+        concurrency: int = 4,
+        requests_per_minute: float = 50,
+        retriever: Optional[HistoryRetriever] = None
+    ):
+        """Initialize with storage, analyzer and rate limits."""
+        self.storage = storage
+        self.analyzer = analyzer
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.retriever = retriever or HistoryRetriever(storage)
+        self.checkpoint_dir = storage.analysis_dir / "batch"
+
+    async def run(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        include_history_days: int = 7,
+        only_outdated: bool = True,
+        refresh: bool = False
+    ) -> AsyncIterator[dict]:
+        """
+        Analyze every log in the range, yielding one result per date as it finishes.
+
+        A final `{"summary": ...}` item reports totals. At most `concurrency`
+        analyses run at once, and they are cancelled if the caller stops
+        iterating. Completed dates are checkpointed per batch, so re-running
+        the same batch after an interruption skips them; the checkpoint is
+        removed once a batch finishes without errors. With `refresh` the
+        analysis cache is bypassed.
+        """
+        all_dates = await asyncio.to_thread(self.storage.list_all_dates)
+        if not all_dates:
+            yield {"summary": {"analyzed": 0, "failed": 0, "skipped": 0}}
+            return
+
+        start_date = start_date or all_dates[0]
+        end_date = end_date or all_dates[-1]
+
+        # One read for the whole range including the first target's history
+        history_start = start_date - timedelta(days=include_history_days)
+        logs = await asyncio.to_thread(self.storage.get_logs_range, history_start, end_date)
+        log_dates = [log.date for log in logs]
+
+        key = self._checkpoint_key(start_date, end_date, include_history_days, only_outdated)
+        completed = self._load_checkpoint(key)
+
+        targets = [
+            log for log in logs
+            if start_date <= log.date <= end_date
+            and log.date.isoformat() not in completed
+            and (not only_outdated or self.analyzer.is_outdated(log.ai_analysis, log.metadata.version))
+        ]
+        skipped = sum(1 for d in log_dates if start_date <= d <= end_date) - len(targets)
+
+        limiter = RateLimiter(self.requests_per_minute)
+
+        async def analyze(log: WorkoutLog) -> dict:
+            # History window: logs in [date - N days, date), sliced from memory
+            lo = bisect_left(log_dates, log.date - timedelta(days=include_history_days))
+            hi = bisect_left(log_dates, log.date)
+
+            await limiter.wait()
+            try:
+                # Older relevant logs are looked up per target (they can be anywhere in the history)
+                history_logs, related_logs = await asyncio.to_thread(
+                    self.retriever.select, log, include_history_days, logs[lo:hi]
+                )
+                analysis = await self.analyzer.analyze_workout_async(
+                    log, history_logs, use_cache=not refresh, related_logs=related_logs
+                )
+                saved = await asyncio.to_thread(
+                    self.storage.attach_analysis, log.date, analysis, log.metadata.version
+                )
+                if not saved:
+                    raise LookupError(f"Log for {log.date} was deleted during analysis")
+            except Exception as e:
+                return {"date": log.date.isoformat(), "status": "failed", "error": str(e)}
+
+            return {
+                "date": log.date.isoformat(),
+                "status": "analyzed",
+                "analysis": analysis.model_dump(mode="json")
+            }
+
+        pending: "asyncio.Queue[WorkoutLog]" = asyncio.Queue()
+        for log in targets:
+            pending.put_nowait(log)
+        # Bounded, so workers wait for a slow consumer instead of running ahead
+        finished: "asyncio.Queue[dict]" = asyncio.Queue(self.concurrency)
+
+        async def worker() -> None:
+            while not pending.empty():
+                await finished.put(await analyze(pending.get_nowait()))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(targets)))]
+        analyzed = failed = 0
+        try:
+            for _ in targets:
+                result = await finished.get()
+                if result["status"] == "analyzed":
+                    analyzed += 1
+                    completed.add(result["date"])
+                    await asyncio.to_thread(self._save_checkpoint, key, completed)
+                else:
+                    failed += 1
+                yield result
+        finally:
+            # The caller stopped early (e.g. the client disconnected): don't keep analysing
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        if not failed:
+            self._checkpoint_path(key).unlink(missing_ok=True)
+
+        yield {"summary": {"analyzed": analyzed, "failed": failed, "skipped": skipped}}
+
+    def _checkpoint_key(self, *params) -> str:
+        """Identify a batch by its parameters, model and prompt version."""
+        raw = json.dumps([str(p) for p in params] + [self.analyzer.model, PROMPT_VERSION])
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+    def _checkpoint_path(self, key: str) -> Path:
+        return self.checkpoint_dir / f"{key}.json"
+
+    def _load_checkpoint(self, key: str) -> set:
+        """Dates already completed by an interrupted run of the same batch."""
+        try:
+            with open(self._checkpoint_path(key), 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return set()
+
+        return set(checkpoint.get("completed", [])) if checkpoint.get("key") == key else set()
+
+    def _save_checkpoint(self, key: str, completed: set) -> None:
+        """Atomically record completed dates."""
+        path = self._checkpoint_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "completed": sorted(completed)}, f)
+        os.replace(tmp_path, path)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    """Run a batch from the command line, printing NDJSON results."""
+    from dotenv import load_dotenv
+    from ai_service import create_analyzer
+    from analysis_cache import AnalysisCache
+
+    load_dotenv()
+    storage = WorkoutStorage(
+        data_dir=os.getenv("DATA_DIR", "../data"),
+        durability=os.getenv("STORAGE_DURABILITY", "atomic"),
+        backend=os.getenv("STORAGE_BACKEND", "json")
+    )
+    batch = BatchAnalyzer(
+        storage,
+        create_analyzer(cache=AnalysisCache(storage.analysis_dir / "cache")),
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        retriever=HistoryRetriever(
+            storage,
+            max_related=int(os.getenv("ANALYSIS_RELATED_LOGS", 8)),
+            token_budget=int(os.getenv("ANALYSIS_HISTORY_TOKENS", 1500))
+        )
+    )
+
+    async for result in batch.run(
+        start_date=args.start,
+        end_date=args.end,
+        include_history_days=args.history_days,
+        only_outdated=not args.all,
+        refresh=args.refresh
+    ):
+        print(json.dumps(result), flush=True)
+
+    storage.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-analyse workout logs with Claude")
+    parser.add_argument("--start", type=date.fromisoformat, help="First date (default: first log)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last date (default: last log)")
+    parser.add_argument("--all", action="store_true", help="Re-analyse logs that are already up to date")
+    parser.add_argument("--refresh", action="store_true", help="Bypass the analysis cache")
+    parser.add_argument("--history-days", type=int, default=7, help="Days of history per analysis")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", 4)))
+    parser.add_argument("--rpm", type=float, default=float(os.getenv("BATCH_REQUESTS_PER_MINUTE", 50)))
+    asyncio.run(_main(parser.parse_args()))
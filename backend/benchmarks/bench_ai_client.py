@@ -0,0 +1,268 @@
+"""Tail latency and error rates of Claude calls against a local fake Messages API.
+
+Usage:
+    python benchmarks/bench_ai_client.py [--calls 300] [--concurrency 8] [--latency-ms 40]
+                                         [--tail-rate 0.02] [--tail-ms 3000] [--rate-limit-rate 0.05]
+                                         [--overload-rate 0.1] [--malformed-rate 0.1]
+
+Starts an HTTP server speaking the Messages API on localhost and points the
+real SDK at it (ANTHROPIC_BASE_URL). The server answers after a log-normal
+delay, with a share of slow outliers; it returns 429 rate limits (any
+model), 529 overloaded errors (main model only), and MACHINE CONTEXT JSON
+that is slightly broken (trailing comma, truncation: repaired locally) or
+garbled (re-asked).
+
+The same analyses run through several client setups:
+- baseline: SDK defaults (its own 2 retries, 10 minute timeout), no repair
+  of malformed JSON (as before the retry policy)
+- retry: RetryPolicy with a per-attempt timeout, deadline and breaker
+- retry_fallback: as retry, with CLAUDE_FAST_MODEL routing and fallback
+
+Prints one JSON line per setup: latency percentiles, error rate and the
+requests the server saw.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ai_client import AIUnavailableError, RetryPolicy  # noqa: E402
+from ai_service import ClaudeAnalyzer  # noqa: E402
+from fake_anthropic import FAKE_RESPONSE  # noqa: E402
+from synthetic import generate_logs  # noqa: E402
+
+MAIN_MODEL = "claude-main"
+FAST_MODEL = "claude-fast"
+
+# Broken MACHINE CONTEXT variants: the first two repair locally, the last needs a re-ask
+REPAIRABLE = [
+    FAKE_RESPONSE.replace('"confidence_score": 0.7', '"confidence_score": 0.7,'),
+    FAKE_RESPONSE.split('"movement_quality"')[0],
+]
+GARBLED = FAKE_RESPONSE.split("```json")[0] + '```json\n{"injury_risk": "low" "problem_areas" ["calves"}\n```\n'
+REPAIRED_CONTEXT = '{"injury_risk": "low", "problem_areas": ["calves"], "confidence_score": 0.6}'
+
+
+class FakeMessagesServer(ThreadingHTTPServer):
+    """Messages API stand-in with injected latency, errors and malformed output."""
+
+    daemon_threads = True
+
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(("127.0.0.1", 0), FakeMessagesHandler)
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.requests: Counter = Counter()
+
+    def decide(self, model: str, repair: bool) -> tuple:
+        """(delay seconds, outcome) for one request."""
+        args = self.args
+        with self.lock:
+            roll = self.rng.random()
+            delay = self.rng.lognormvariate(0, 0.35) * args.latency_ms / 1000
+            if self.rng.random() < args.tail_rate:
+                delay += args.tail_ms / 1000
+            malformed = self.rng.random()
+
+        if roll < args.rate_limit_rate:
+            outcome = "429"
+        elif model == MAIN_MODEL and roll < args.rate_limit_rate + args.overload_rate:
+            outcome = "529"
+        elif repair:
+            outcome = "repair"
+        elif malformed < args.malformed_rate / 2:
+            outcome = "repairable"
+        elif malformed < args.malformed_rate:
+            outcome = "garbled"
+        else:
+            outcome = "ok"
+
+        with self.lock:
+            self.requests[f"{model}:{outcome}"] += 1
+        return (0.002 if outcome in ("429", "529") else delay), outcome
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients hang up on slow responses once their attempt times out
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class FakeMessagesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: dict, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = request["model"]
+        repair = request["messages"][0]["content"].startswith("This JSON was meant")
+        delay, outcome = self.server.decide(model, repair)
+        time.sleep(delay)
+
+        if outcome == "429":
+            self._send(429, {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limited"}},
+                       {"retry-after": str(self.server.args.retry_after)})
+            return
+        if outcome == "529":
+            self._send(529, {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}})
+            return
+
+        if outcome == "repair":
+            text = REPAIRED_CONTEXT
+        elif outcome == "repairable":
+            text = random.choice(REPAIRABLE)
+        elif outcome == "garbled":
+            text = GARBLED
+        else:
+            text = FAKE_RESPONSE
+        self._send(200, {
+            "id": "msg_fake",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(json.dumps(request)) // 4, "output_tokens": len(text) // 4},
+        })
+
+
+class NoRepairAnalyzer(ClaudeAnalyzer):
+    """Fails on malformed MACHINE CONTEXT JSON, like json.loads did before repairs."""
+
+    def _parse_machine_context(self, text: str, repaired: bool = False):
+        from models import MachineContext
+        return MachineContext(**json.loads(text))
+
+
+def make_analyzers(base_url: str, args: argparse.Namespace) -> Dict[str, ClaudeAnalyzer]:
+    """The client setups to compare."""
+    from anthropic import Anthropic, AsyncAnthropic
+
+    policy = dict(
+        max_attempts=3,
+        deadline=args.deadline,
+        attempt_timeout=args.attempt_timeout,
+        base_delay=0.05,
+        max_delay=1.0,
+        min_attempt_seconds=0.2
+    )
+    return {
+        "baseline": NoRepairAnalyzer(
+            "test", model=MAIN_MODEL,
+            client=Anthropic(api_key="test", base_url=base_url),
+            async_client=AsyncAnthropic(api_key="test", base_url=base_url),
+            policy=RetryPolicy(max_attempts=1, deadline=3600, attempt_timeout=600, breaker_failures=10 ** 9)
+        ),
+        "retry": ClaudeAnalyzer("test", model=MAIN_MODEL, policy=RetryPolicy(**policy)),
+        "retry_fallback": ClaudeAnalyzer(
+            "test", model=MAIN_MODEL, fast_model=FAST_MODEL, policy=RetryPolicy(**policy)
+        ),
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+def run(name: str, analyzer: ClaudeAnalyzer, server: FakeMessagesServer, logs, args) -> dict:
+    """Run every analysis through one setup and summarise."""
+    server.requests.clear()
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+    lock = threading.Lock()
+
+    def analyze(index: int) -> None:
+        log = logs[index % len(logs)]
+        history = logs[max(0, index % len(logs) - 7):index % len(logs)]
+        start = time.perf_counter()
+        try:
+            analyzer.analyze_workout(log, history, use_cache=False)
+            outcome = "ok"
+        except AIUnavailableError:
+            outcome = "unavailable"
+        except ValueError:
+            outcome = "parse_error"
+        except Exception as e:
+            outcome = type(e).__name__
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+            outcomes[outcome] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(analyze, range(args.calls)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "setup": name,
+        "calls": args.calls,
+        "seconds": round(elapsed, 2),
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": round(max(latencies), 1),
+        "mean_ms": round(statistics.mean(latencies), 1),
+        "error_rate": round(1 - outcomes["ok"] / args.calls, 4),
+        "outcomes": dict(outcomes),
+        "server_requests": dict(sorted(server.requests.items())),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300, help="Analyses per setup")
+    parser.add_argument("--concurrency", type=int, default=8, help="Analyses in flight")
+    parser.add_argument("--latency-ms", type=float, default=40, help="Median response time")
+    parser.add_argument("--tail-rate", type=float, default=0.02, help="Share of slow responses")
+    parser.add_argument("--tail-ms", type=float, default=3000, help="Extra delay of a slow response")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05, help="Share of 429 responses")
+    parser.add_argument("--overload-rate", type=float, default=0.1, help="Share of 529s from the main model")
+    parser.add_argument("--malformed-rate", type=float, default=0.1, help="Share of malformed MACHINE CONTEXTs")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="retry-after sent with 429s")
+    parser.add_argument("--attempt-timeout", type=float, default=1.0, help="Per-attempt timeout (retry setups)")
+    parser.add_argument("--deadline", type=float, default=10.0, help="Deadline per call (retry setups)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeMessagesServer(args)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["ANTHROPIC_BASE_URL"] = base_url
+
+    logs = list(generate_logs(400, args.seed))
+    try:
+        for name, analyzer in make_analyzers(base_url, args).items():
+            print(json.dumps(run(name, analyzer, server, logs, args)))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""JSON-files vs SQLite backend at 10k+ logs.
+
+Usage:
+    python benchmarks/bench_backends.py [--logs 10000] [--reads 1000]
+
+Each backend is timed on a bulk load, a cold open (date index), cold random
+reads, 90-day range scans, a full scan, a filtered query and a raw export.
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import create_backend  # noqa: E402
+from bench_writes import make_logs  # noqa: E402
+
+
+def timed(fn) -> float:
+    """Run fn once and return elapsed milliseconds."""
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench(kind: str, logs: list, reads: int) -> dict:
+    """Time one backend."""
+    rng = random.Random(0)
+    dates = [log.date for log in logs]
+    sample = rng.sample(dates, min(reads, len(dates)))
+    windows = [rng.choice(dates[:-90]) for _ in range(100)]
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        backend = create_backend(kind, Path(data_dir))
+        result = {"backend": kind, "logs": len(logs)}
+
+        result["bulk_load_ms"] = round(timed(
+            lambda: [backend.put_many(logs[i:i + 500]) for i in range(0, len(logs), 500)]
+        ))
+        backend.close()
+
+        # A fresh instance: nothing cached, index built from scratch
+        backend = create_backend(kind, Path(data_dir))
+        result["open_list_dates_ms"] = round(timed(backend.list_dates), 2)
+        result["cold_get_us"] = round(timed(lambda: [backend.get(d) for d in sample]) * 1000 / len(sample), 1)
+        result["range_90d_ms"] = round(timed(
+            lambda: [backend.get_range(d, d + timedelta(days=89)) for d in windows]
+        ) / len(windows), 2)
+        result["full_scan_ms"] = round(timed(lambda: backend.get_range(dates[0], dates[-1])))
+        result["filter_ms"] = round(timed(
+            lambda: backend.find_dates(workout_type="run", body_area="knee", min_fatigue=8)
+        ), 2)
+        result["export_raw_ms"] = round(timed(lambda: sum(1 for _ in backend.iter_raw())))
+        backend.close()
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=10000, help="Logs to load")
+    parser.add_argument("--reads", type=int, default=1000, help="Random single-log reads")
+    args = parser.parse_args()
+
+    logs = make_logs(args.logs)
+    for kind in ("json", "sqlite"):
+        print(json.dumps(bench(kind, logs, args.reads)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""GET /logs throughput: pre-serialised JSON vs response_model encoding.
+
+Usage:
+    python benchmarks/bench_list.py [--logs 365] [--days 90] [--requests 200]
+
+For each backend, a data directory of `--logs` logs is served through the
+app in-process. `GET /logs` for a `--days` window (sent as start_date/end_date)
+is compared with the previous implementation, mounted at a benchmark-only
+route that returns the parsed logs through `response_model=List[WorkoutLog]`.
+Both bodies are checked to decode to the same JSON. Reported per backend:
+the first (cold) request in ms and warm requests per second.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import WorkoutStorage  # noqa: E402
+from bench_writes import make_logs  # noqa: E402
+
+MODEL_ROUTE = "/bench/logs-model"
+
+
+def timed(fn) -> float:
+    """Run fn once and return elapsed milliseconds."""
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def get(client, path: str, params: dict) -> bytes:
+    """GET a path and return the body (raises if not 200)."""
+    response = client.get(path, params=params)
+    response.raise_for_status()
+    return response.content
+
+
+def use_storage(main, storage: WorkoutStorage) -> None:
+    """Serve requests from this storage instead of the default tenant's."""
+    main.app.dependency_overrides[main.tenant_storage] = lambda: storage
+
+
+def bench(main, client, kind: str, data_dir: str, params: dict, requests: int) -> dict:
+    """Time both routes on a freshly opened storage of one backend."""
+    result = {"backend": kind}
+
+    for label, path in (("model", MODEL_ROUTE), ("json", "/logs")):
+        storage = WorkoutStorage(data_dir=data_dir, backend=kind)
+        use_storage(main, storage)
+        result[f"{label}_cold_ms"] = round(timed(lambda: get(client, path, params)), 2)
+        elapsed = timed(lambda: [get(client, path, params) for _ in range(requests)])
+        result[f"{label}_rps"] = round(requests / elapsed * 1000)
+        storage.close()
+
+    result["speedup"] = round(result["json_rps"] / result["model_rps"], 2)
+    storage = WorkoutStorage(data_dir=data_dir, backend=kind)
+    use_storage(main, storage)
+    same = json.loads(get(client, "/logs", params)) == json.loads(get(client, MODEL_ROUTE, params))
+    storage.close()
+    if not same:
+        raise RuntimeError(f"{kind}: /logs body differs from the response_model encoding")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=365, help="Logs in the data directory")
+    parser.add_argument("--days", type=int, default=90, help="Days per GET /logs")
+    parser.add_argument("--requests", type=int, default=200, help="Warm requests per route")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ.update({"DATA_DIR": data_dir, "ANTHROPIC_FAKE": "1"})
+        import main as app_main
+        from fastapi import Depends
+        from fastapi.testclient import TestClient
+        from models import WorkoutLog
+
+        @app_main.app.get(MODEL_ROUTE, response_model=List[WorkoutLog])
+        def logs_through_model(
+            start_date: date, end_date: date, storage: WorkoutStorage = Depends(app_main.tenant_storage)
+        ):
+            return storage.get_logs_range(start_date, end_date)
+
+        logs = make_logs(args.logs)
+        end = logs[-1].date
+        params = {
+            "start_date": (end - timedelta(days=args.days - 1)).isoformat(),
+            "end_date": end.isoformat(),
+        }
+
+        for kind in ("json", "sqlite"):
+            storage = WorkoutStorage(data_dir=data_dir, backend=kind)
+            storage.save_logs(logs)
+            storage.close()
+
+        client = TestClient(app_main.app)
+        for kind in ("json", "sqlite"):
+            result = bench(app_main, client, kind, data_dir, params, args.requests)
+            print(json.dumps({"logs": args.logs, "days": args.days, **result}))
+
+
+if __name__ == "__main__":
+    main()
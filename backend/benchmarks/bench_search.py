@@ -0,0 +1,103 @@
+"""Search index: build, reload and query latency over years of logs.
+
+Usage:
+    python benchmarks/bench_search.py [--logs 3650] [--queries 200]
+
+Reflections are assembled from a small vocabulary so common and rare terms
+both occur; the baseline is a scan that reads and tokenises every log.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from search_index import SearchIndex, tokenize  # noqa: E402
+from bench_writes import make_logs  # noqa: E402
+
+WORDS = (
+    "knee pain tight calves hamstring sore shoulder stiff easy tempo long run felt strong tired "
+    "slept badly hill sprint recovery mobility squat deadlift grip back ankle foam roll warm cold"
+).split()
+AREAS = ["knee", "calves", "lower back", "shoulder", "hamstrings", "ankle", "hip flexors"]
+QUERIES = ["knee pain", "tight calves", "shoulder", "slept badly", "hill*", "stiff ankle", "grip"]
+
+
+def vary(logs: list) -> list:
+    """Give each log its own reflection, notes and body areas."""
+    rng = random.Random(0)
+    for log in logs:
+        log.free_text_reflection = " ".join(rng.choices(WORDS, k=rng.randint(8, 40)))
+        log.exercises[0].notes = " ".join(rng.choices(WORDS, k=4))
+        log.pain_or_tightness.body_areas = rng.sample(AREAS, rng.randint(0, 2))
+        log.pain_or_tightness.description = " ".join(rng.choices(WORDS, k=6))
+    return logs
+
+
+def scan(logs: list, query: str) -> int:
+    """Baseline: tokenise every log and check for all query terms."""
+    terms = set(tokenize(query.replace("*", "")))
+    hits = 0
+    for log in logs:
+        text = " ".join(filter(None, [
+            log.free_text_reflection,
+            log.pain_or_tightness.description,
+            *(ex.notes for ex in log.exercises),
+            *log.pain_or_tightness.body_areas,
+        ]))
+        hits += terms <= set(tokenize(text))
+    return hits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=3650, help="Logs to index (3650 = 10 years)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to time")
+    args = parser.parse_args()
+
+    logs = vary(make_logs(args.logs))
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = Path(data_dir) / "search_index.jsonl"
+
+        start = time.perf_counter()
+        SearchIndex(path).rebuild(logs)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        index = SearchIndex(path)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        timings = []
+        for _ in range(args.queries):
+            query = rng.choice(QUERIES)
+            area = rng.choice([None, None, rng.choice(AREAS)])
+            start = time.perf_counter()
+            index.search(query, body_area=area)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        scan(logs, "knee pain")
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        print(json.dumps({
+            "logs": args.logs,
+            "file_kb": round(path.stat().st_size / 1024),
+            "rebuild_ms": round(build_ms),
+            "load_ms": round(load_ms),
+            "query_median_ms": round(statistics.median(timings), 3),
+            "query_max_ms": round(max(timings), 3),
+            "scan_in_memory_ms": round(scan_ms),
+            **index.stats()
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""API cold start: import time and time to first response.
+
+Usage:
+    python benchmarks/bench_startup.py [--logs 365] [--runs 5]
+
+Each run starts a fresh interpreter. Import time is measured in-process for
+`import main`; time to first response spawns `python main.py --prod` and
+polls until GET / answers, then times the first GET /logs and
+GET /stats/summary. Runs with background warm-up on and off are reported
+separately (medians, in ms).
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from storage import WorkoutStorage  # noqa: E402
+from bench_writes import make_logs  # noqa: E402
+
+IMPORT_SNIPPET = (
+    "import sys, time, json; t = time.perf_counter(); import main; "
+    "print(json.dumps({'import_ms': (time.perf_counter() - t) * 1000, "
+    "'sdk_imported': 'anthropic' in sys.modules}))"
+)
+
+
+def free_port() -> int:
+    """Ask the OS for an unused port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(port: int, path: str) -> float:
+    """GET a path and return the elapsed milliseconds (raises if not 200)."""
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"{path}: HTTP {response.status}")
+    return (time.perf_counter() - start) * 1000
+
+
+def measure_import(env: dict) -> dict:
+    """Import main in a fresh interpreter."""
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure_server(env: dict) -> dict:
+    """Start the production server and time the first responses."""
+    port = free_port()
+    env = {**env, "PORT": str(port), "HOST": "127.0.0.1"}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py", "--prod"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                get(port, "/")
+                break
+            except (ConnectionError, OSError):
+                if proc.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                time.sleep(0.005)
+        result = {"first_response_ms": (time.perf_counter() - start) * 1000}
+        result["first_logs_ms"] = get(port, "/logs?days=30")
+        result["first_summary_ms"] = get(port, "/stats/summary")
+        return result
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def median(runs: list, key: str) -> float:
+    return round(statistics.median(run[key] for run in runs), 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=365, help="Logs in the data directory")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per configuration")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        storage = WorkoutStorage(data_dir=data_dir)
+        storage.save_logs(make_logs(args.logs))
+        storage.close()
+
+        base_env = {
+            **os.environ,
+            "DATA_DIR": data_dir,
+            "STORAGE_BACKEND": "json",
+            # Real (lazily created) SDK client; no request is made
+            "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", "bench"),
+        }
+        base_env.pop("ANTHROPIC_FAKE", None)
+
+        imports = [measure_import(base_env) for _ in range(args.runs)]
+        print(json.dumps({
+            "logs": args.logs,
+            "import_ms": median(imports, "import_ms"),
+            "sdk_imported_at_startup": imports[0]["sdk_imported"],
+        }))
+
+        for warmup in ("1", "0"):
+            env = {**base_env, "STARTUP_WARMUP": warmup}
+            runs = [measure_server(env) for _ in range(args.runs)]
+            print(json.dumps({
+                "warmup": warmup == "1",
+                "first_response_ms": median(runs, "first_response_ms"),
+                "first_logs_ms": median(runs, "first_logs_ms"),
+                "first_summary_ms": median(runs, "first_summary_ms"),
+            }))
+
+
+if __name__ == "__main__":
+    main()
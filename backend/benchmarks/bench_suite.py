@@ -0,0 +1,299 @@
+"""Benchmark suite over synthetic multi-year histories, with JSON results.
+
+Usage:
+    python benchmarks/bench_suite.py [--days 1000 10000] [--backends json sqlite] [--seed 0]
+                                     [--output results.json] [--baseline old.json --tolerance 0.25]
+
+For every history size and backend a deterministic history is generated
+(see synthetic.py) into a temporary data directory and measured:
+
+- storage: cold open, summary and search index build (no sidecars yet) and
+  load, warm summary stats, 7/30/90/365-day range reads on a cold then a
+  warm cache (as models and as JSON), single and batched save throughput
+- analysis: history selection and `_build_analysis_prompt` time
+- api: end-to-end latency through a test client in a fresh interpreter,
+  with Claude stubbed by fake_anthropic (no network): the first GET /logs,
+  then the median and p95 of each route
+
+Timings are in ms (`*_ms`), throughput in logs per second (`*_per_s`).
+With --baseline, metrics that got slower than the baseline by more than
+--tolerance are listed on stderr and the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from storage import WorkoutStorage  # noqa: E402
+from synthetic import write_history  # noqa: E402
+
+RANGE_DAYS = (7, 30, 90, 365)
+RANGE_SAMPLES = 20
+WARM_REPEATS = 20
+SINGLE_SAVES = 50
+BATCH_SAVE_SIZE = 200
+PROMPT_SAMPLES = 30
+API_REQUESTS = 50
+
+
+def timed(fn: Callable) -> float:
+    """Run fn once and return elapsed milliseconds."""
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def median(values: List[float]) -> float:
+    return round(statistics.median(values), 3)
+
+
+def p95(values: List[float]) -> float:
+    return round(statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0], 3)
+
+
+def bench_storage(data_dir: Path, backend: str, rng: random.Random) -> Dict[str, float]:
+    """Storage-layer timings; leaves the sidecars built."""
+    result: Dict[str, float] = {}
+    start = time.perf_counter()
+    storage = WorkoutStorage(data_dir=str(data_dir), backend=backend)
+    dates = storage.list_all_dates()
+    result["open_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    result["logs"] = len(dates)
+
+    # No sidecars yet: both are built from every log
+    result["summary_build_ms"] = round(timed(lambda: storage.get_summary().summary()), 3)
+    result["search_index_build_ms"] = round(timed(storage.get_search_index), 3)
+    storage.close()
+
+    storage = WorkoutStorage(data_dir=str(data_dir), backend=backend)
+    result["summary_load_ms"] = round(timed(lambda: storage.get_summary().summary()), 3)
+    result["search_index_load_ms"] = round(timed(storage.get_search_index), 3)
+    result["summary_warm_ms"] = median([timed(lambda: storage.get_summary().summary()) for _ in range(WARM_REPEATS)])
+    storage.close()
+
+    for days in RANGE_DAYS:
+        starts = [rng.choice(dates[:-1]) for _ in range(RANGE_SAMPLES)]
+        windows = [(d, d + timedelta(days=days - 1)) for d in starts]
+
+        for label, read in (("range", "get_logs_range"), ("range_json", "get_logs_range_json")):
+            # A fresh instance per window: nothing of it is cached yet
+            cold = []
+            for start_date, end_date in windows:
+                storage = WorkoutStorage(data_dir=str(data_dir), backend=backend)
+                cold.append(timed(lambda: getattr(storage, read)(start_date, end_date)))
+                storage.close()
+            result[f"{label}_{days}d_cold_ms"] = median(cold)
+
+            storage = WorkoutStorage(data_dir=str(data_dir), backend=backend)
+            start_date, end_date = windows[0]
+            getattr(storage, read)(start_date, end_date)
+            result[f"{label}_{days}d_warm_ms"] = median(
+                [timed(lambda: getattr(storage, read)(start_date, end_date)) for _ in range(WARM_REPEATS)]
+            )
+            storage.close()
+
+    storage = WorkoutStorage(data_dir=str(data_dir), backend=backend)
+    sample = [storage.get_log(d) for d in rng.sample(dates, min(len(dates), SINGLE_SAVES + BATCH_SAVE_SIZE))]
+    for log in sample:
+        log.free_text_reflection = (log.free_text_reflection or "") + " (edited)"
+
+    single, batch = sample[:SINGLE_SAVES], sample[SINGLE_SAVES:]
+    elapsed = timed(lambda: [storage.save_log(log) for log in single])
+    result["save_single_per_s"] = round(len(single) / elapsed * 1000, 1)
+    if batch:
+        elapsed = timed(lambda: storage.save_logs(batch))
+        result["save_batch_per_s"] = round(len(batch) / elapsed * 1000, 1)
+    storage.close()
+    return result
+
+
+def bench_analysis(data_dir: Path, backend: str, rng: random.Random) -> Dict[str, float]:
+    """History selection and prompt building for random logs."""
+    from ai_service import create_analyzer
+    from history_retrieval import HistoryRetriever
+
+    storage = WorkoutStorage(data_dir=str(data_dir), backend=backend)
+    analyzer = create_analyzer()
+    retriever = HistoryRetriever(storage)
+    dates = storage.list_all_dates()
+
+    select, build = [], []
+    for log_date in rng.sample(dates, min(len(dates), PROMPT_SAMPLES)):
+        log = storage.get_log(log_date)
+        start = time.perf_counter()
+        history, related = retriever.select(log, 7)
+        select.append((time.perf_counter() - start) * 1000)
+        build.append(timed(lambda: analyzer._build_analysis_prompt(log, history, related)))
+
+    storage.close()
+    return {"history_select_ms": median(select), "prompt_build_ms": median(build)}
+
+
+def bench_api(data_dir: Path) -> Dict[str, float]:
+    """End-to-end route latency; runs in the interpreter started by run_api()."""
+    from fastapi.testclient import TestClient
+    import main
+
+    result: Dict[str, float] = {}
+    rng = random.Random(0)
+
+    with TestClient(main.app) as client:
+        tenant = main.tenants.acquire(main.DEFAULT_TENANT)
+        dates = tenant.storage.list_all_dates()
+        tenant.release()
+        last = dates[-1]
+        window = {"start_date": (last - timedelta(days=89)).isoformat(), "end_date": last.isoformat()}
+
+        def get(path: str, **kwargs) -> None:
+            response = client.get(path, **kwargs)
+            if response.status_code not in (200, 304):
+                raise RuntimeError(f"{path}: HTTP {response.status_code}")
+
+        result["first_logs_90d_ms"] = round(timed(lambda: get("/logs", params=window)), 3)
+        etag = client.get("/logs", params=window).headers["etag"]
+
+        routes = {
+            "logs_90d": lambda: get("/logs", params=window),
+            "logs_90d_not_modified": lambda: get("/logs", params=window, headers={"If-None-Match": etag}),
+            "log": lambda: get(f"/logs/{rng.choice(dates).isoformat()}"),
+            "log_dates": lambda: get("/logs/dates"),
+            "stats_summary": lambda: get("/stats/summary"),
+            "stats_trends_1y": lambda: get(
+                "/stats/trends", params={"start_date": (last - timedelta(days=364)).isoformat(), "end_date": last.isoformat()}
+            ),
+            "search": lambda: get("/search", params={"q": "knee"}),
+        }
+        for name, request in routes.items():
+            request()
+            times = [timed(request) for _ in range(API_REQUESTS)]
+            result[f"api_{name}_ms"] = median(times)
+            result[f"api_{name}_p95_ms"] = p95(times)
+
+        def analyze() -> None:
+            response = client.post(f"/analysis/{rng.choice(dates).isoformat()}", params={"refresh": "true"})
+            if response.status_code != 200:
+                raise RuntimeError(f"/analysis: HTTP {response.status_code}")
+
+        times = [timed(analyze) for _ in range(min(API_REQUESTS, 20))]
+        result["api_analysis_ms"] = median(times)
+        result["api_analysis_p95_ms"] = p95(times)
+
+    return result
+
+
+def run_api(data_dir: Path, backend: str) -> Dict[str, float]:
+    """Run bench_api in a fresh interpreter, so the app starts cold on this data directory."""
+    env = {
+        **os.environ,
+        "DATA_DIR": str(data_dir),
+        "STORAGE_BACKEND": backend,
+        "ANTHROPIC_FAKE": "1",
+        "ANTHROPIC_FAKE_DELAY": "0",
+        "STARTUP_WARMUP": "0",
+    }
+    out = subprocess.run(
+        [sys.executable, __file__, "--api", str(data_dir)], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def git_commit() -> str:
+    """Commit the suite runs on, or "" outside a checkout."""
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """Metrics that regressed against a baseline run by more than `tolerance`."""
+    previous = {(r["days"], r["backend"]): r["metrics"] for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get((result["days"], result["backend"]), {})
+        for name, value in result["metrics"].items():
+            before = old.get(name)
+            if not before or not value:
+                continue
+            if name.endswith("_ms") and value > before * (1 + tolerance):
+                regressions.append(f"{result['backend']}/{result['days']}d {name}: {before} -> {value} ms")
+            elif name.endswith("_per_s") and value < before / (1 + tolerance):
+                regressions.append(f"{result['backend']}/{result['days']}d {name}: {before} -> {value} /s")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[1000, 10000], help="History sizes in days")
+    parser.add_argument("--backends", nargs="+", choices=["json", "sqlite"], default=["json", "sqlite"])
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the histories and samples")
+    parser.add_argument("--output", type=Path, help="Write the results here (default: stdout)")
+    parser.add_argument("--baseline", type=Path, help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs the baseline")
+    parser.add_argument("--api", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.api:
+        print(json.dumps(bench_api(args.api)))
+        return
+
+    # The analysis benchmark builds prompts with the canned client
+    os.environ["ANTHROPIC_FAKE"] = "1"
+
+    results = []
+    for days in args.days:
+        for backend in args.backends:
+            rng = random.Random(args.seed)
+            with tempfile.TemporaryDirectory() as data_dir:
+                data_path = Path(data_dir)
+                metrics: Dict[str, float] = {}
+                metrics["generate_ms"] = round(timed(lambda: write_history(data_path, days, args.seed, backend)), 1)
+                metrics.update(bench_storage(data_path, backend, rng))
+                metrics.update(bench_analysis(data_path, backend, rng))
+                metrics.update(run_api(data_path, backend))
+            results.append({"days": days, "backend": backend, "metrics": metrics})
+            print(f"{backend}/{days}d done", file=sys.stderr)
+
+    report = {
+        "suite": "bench_suite",
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
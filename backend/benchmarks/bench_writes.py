@@ -0,0 +1,107 @@
+"""Log write throughput: the original write path vs each durability mode.
+
+Usage:
+    python benchmarks/bench_writes.py [--logs 500] [--threads 1 8]
+
+Only the file write is timed (serialisation + disk), not the summary and
+rollup updates that save_log also performs.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import WorkoutLog  # noqa: E402
+from storage import WorkoutStorage  # noqa: E402
+
+
+def make_logs(count: int) -> list:
+    """Build `count` representative logs on consecutive days."""
+    start = date(2024, 1, 1)
+    return [
+        WorkoutLog(
+            date=start + timedelta(days=i),
+            workout_type="strength" if i % 2 else "run",
+            exercises=[
+                {"name": "Squats", "sets": 4, "reps": 8, "load": "80kg", "notes": "felt strong"},
+                {"name": "Romanian deadlift", "sets": 3, "reps": 10, "load": "60kg"},
+                {"name": "Calf raises", "sets": 3, "reps": 15, "load": "bodyweight"}
+            ],
+            running_data={"distance_km": 6.2, "duration_minutes": 34, "pace_min_per_km": 5.48},
+            fatigue_level=i % 10 + 1,
+            pain_or_tightness={"body_areas": ["calves", "knee"], "severity": "mild", "description": "tight after run"},
+            perceived_effort="moderate",
+            free_text_reflection="Tempo in the middle third, easy cool-down."
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_write(storage: WorkoutStorage, log_path: Path, log: WorkoutLog) -> None:
+    """The original write path: dump to JSON, parse it back, re-encode in place."""
+    log_dict = json.loads(log.model_dump_json())
+    with open(log_path, 'w', encoding='utf-8') as f:
+        json.dump(log_dict, f, indent=2, ensure_ascii=False)
+
+
+def new_write(storage: WorkoutStorage, log_path: Path, log: WorkoutLog) -> None:
+    """The current write path for the storage's durability mode."""
+    storage.backend.write_files([(log_path, log)])
+
+
+def run(label: str, durability: str, write, logs: list, threads: int) -> dict:
+    """Write every log once and report throughput."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        storage = WorkoutStorage(data_dir=data_dir, durability=durability)
+        jobs = [(storage.backend.get_log_path(log.date), log) for log in logs]
+
+        start = time.perf_counter()
+        if threads == 1:
+            for log_path, log in jobs:
+                write(storage, log_path, log)
+        else:
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(lambda job: write(storage, *job), jobs))
+        elapsed = time.perf_counter() - start
+
+        result = {
+            "path": label,
+            "threads": threads,
+            "writes_per_sec": round(len(jobs) / elapsed, 1),
+            "ms_per_write": round(elapsed * 1000 / len(jobs), 3)
+        }
+        if storage.backend.journal:
+            stats = storage.backend.journal.stats()
+            result["commits_per_fsync"] = round(stats["commits"] / max(1, stats["fsyncs"]), 1)
+        storage.close()
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=500, help="Logs written per run")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8], help="Writer thread counts")
+    args = parser.parse_args()
+
+    logs = make_logs(args.logs)
+    paths = [
+        ("before (triple serialise, in place)", "atomic", legacy_write),
+        ("atomic", "atomic", new_write),
+        ("fsync", "fsync", new_write),
+        ("journal", "journal", new_write)
+    ]
+
+    for threads in args.threads:
+        for label, durability, write in paths:
+            print(json.dumps(run(label, durability, write, logs, threads)))
+
+
+if __name__ == "__main__":
+    main()
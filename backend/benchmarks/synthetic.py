@@ -0,0 +1,261 @@
+"""Deterministic synthetic workout histories for benchmarks.
+
+Usage:
+    python benchmarks/synthetic.py --days 3650 --out /tmp/synthetic-data [--seed 0] [--backend json]
+
+Writes a data directory (`logs/*.json`, or `workouts.db` with --backend
+sqlite) covering `--days` days that end on END_DATE. The same seed always
+produces the same logs, byte for byte. The history follows a weekly plan of
+strength, run and recovery sessions in 12-week blocks with a deload week.
+It has rest days, occasional breaks of one to three weeks, injury episodes
+that linger for a few days and AI analyses on most logs. Derived sidecars
+(summary, search index, rollups) are not written; WorkoutStorage builds them
+on first use.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import (  # noqa: E402
+    AIAnalysis, Exercise, MachineContext, Metadata, PainOrTightness, RunningData, TokenUsage, WorkoutLog
+)
+from ai_service import PROMPT_VERSION  # noqa: E402
+from exercise_metrics import compute_metrics  # noqa: E402
+from storage import create_backend  # noqa: E402
+
+# Histories end here, so they don't depend on when they were generated
+END_DATE = date(2025, 12, 31)
+MODEL = "claude-sonnet-4-20250514"
+
+# Planned session per weekday (Monday first); None is a rest day
+WEEK_PLAN = ["strength", "run", "recovery", "strength", None, "run", "recovery"]
+BLOCK_WEEKS = 12
+
+# (name, starting kg, kg added per block, load format); format None means no load
+STRENGTH_POOL = [
+    ("Back squat", 60, 5, "{kg}kg"),
+    ("Romanian deadlift", 50, 5, "{kg}kg barbell"),
+    ("Bench press", 45, 2.5, "{kg}kg"),
+    ("Overhead press", 30, 2.5, "{kg}kg"),
+    ("Goblet squat", 16, 4, "{kg}kg KB"),
+    ("Dumbbell row", 18, 2, "2x{kg}kg DB"),
+    ("Split squat", 10, 2, "{kg}kg dumbbells"),
+    ("Lat pulldown", 45, 5, "{kg}kg machine"),
+    ("Pull-ups", 0, 2.5, "BW+{kg}kg"),
+    ("Calf raises", 0, 0, "bodyweight"),
+    ("Band pull-apart", 0, 0, "red band"),
+    ("Plank", 0, 0, None),
+]
+RECOVERY_POOL = ["Mobility flow", "Foam rolling", "Hip openers", "Easy cycling", "Yoga", "Walk"]
+ROUTES = ["river loop", "park laps", "hill route", "track", "trail", "treadmill", "canal path"]
+BODY_AREAS = ["knee", "calves", "lower back", "hamstrings", "shoulder", "hip", "achilles", "ankle", "neck"]
+PAIN_DESCRIPTIONS = [
+    "tight after the session", "sharp twinge on the stairs", "dull ache in the morning",
+    "stiff when warming up", "sore to the touch", "niggle that eased off during the run",
+]
+REFLECTIONS = [
+    "Felt strong today, good energy throughout.",
+    "Legs heavy from the last session, kept it controlled.",
+    "Slept badly, everything felt harder than it should.",
+    "Tempo in the middle third, easy cool-down.",
+    "Focused on form, slowed the eccentric down.",
+    "Short on time, cut the last block.",
+    "Great session, hit every target.",
+    "Windy and cold, pace suffered a bit.",
+]
+EXERCISE_NOTES = ["felt strong", "form broke on the last rep", "paused reps", "grip was the limit", "easy"]
+PHASES = ["base", "build", "peak", "deload"]
+RISKS = ["low", "low", "low", "moderate", "moderate", "high"]
+
+
+def _analysis(rng: random.Random, log: WorkoutLog, areas: List[str]) -> AIAnalysis:
+    """A plausible stored analysis for a log."""
+    fatigue = log.fatigue_level or 5
+    risk = rng.choice(RISKS) if not areas else rng.choice(["moderate", "high"])
+    focus = rng.sample(["sleep", "mobility", "easy volume", "technique", "hydration", "strength"], 2)
+    return AIAnalysis(
+        human_insight=(
+            f"Fatigue {fatigue}/10 after a {log.workout_type.value} session. "
+            + (f"Keep an eye on the {', '.join(areas)}. " if areas else "No warning signs. ")
+            + f"Focus next on {focus[0]} and {focus[1]}."
+        ),
+        machine_context=MachineContext(
+            training_phase=rng.choice(PHASES),
+            overall_fatigue="high" if fatigue >= 7 else "moderate" if fatigue >= 4 else "low",
+            injury_risk=risk,
+            problem_areas=list(areas),
+            movement_quality=rng.choice(["good", "fair", "compensating"]),
+            recommended_focus=focus,
+            load_adjustment=rng.choice(["maintain", "reduce 10%", "increase 5%"]),
+            confidence_score=round(rng.uniform(0.55, 0.95), 2),
+        ),
+        analyzed_at=datetime.combine(log.date, dt_time(20, 30)),
+        model=MODEL,
+        prompt_version=PROMPT_VERSION,
+        usage=TokenUsage(
+            input_tokens=rng.randint(300, 900),
+            cache_read_input_tokens=1200,
+            output_tokens=rng.randint(250, 450),
+        ),
+        log_version=1,
+    )
+
+
+def generate_logs(
+    days: int,
+    seed: int = 0,
+    end_date: date = END_DATE,
+    rest_rate: float = 0.12,
+    break_rate: float = 0.004,
+    pain_rate: float = 0.03,
+    analysis_rate: float = 0.7
+) -> Iterator[WorkoutLog]:
+    """
+    Yield the logs of a `days`-day history ending on `end_date`, oldest first.
+
+    Besides the planned rest days, `rest_rate` of sessions are skipped and
+    `break_rate` is the daily chance of a 7-21 day break. `pain_rate` is the
+    daily chance that an injury episode starts; it lasts 2-10 days.
+    """
+    rng = random.Random(seed)
+    start = end_date - timedelta(days=days - 1)
+
+    break_left = 0
+    pain_left = 0
+    pain_areas: List[str] = []
+    fatigue = 3.0
+
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        week = offset // 7
+        block, week_in_block = divmod(week, BLOCK_WEEKS)
+        deload = week_in_block == BLOCK_WEEKS - 1
+        fatigue = max(1.0, fatigue * 0.8)
+
+        if break_left:
+            break_left -= 1
+            continue
+        if rng.random() < break_rate:
+            break_left = rng.randint(7, 21)
+            continue
+
+        workout_type = WEEK_PLAN[day.weekday()]
+        if workout_type is None or rng.random() < rest_rate:
+            continue
+
+        if pain_left:
+            pain_left -= 1
+        elif rng.random() < pain_rate:
+            pain_left = rng.randint(2, 10)
+            pain_areas = sorted(rng.sample(BODY_AREAS, rng.choice([1, 1, 2])))
+        areas = pain_areas if pain_left else []
+
+        exercises: List[Exercise] = []
+        running: Optional[RunningData] = None
+
+        if workout_type == "strength":
+            for name, base, step, load in rng.sample(STRENGTH_POOL, rng.randint(3, 6)):
+                kg = base + step * (block % 8) + step * min(week_in_block, 8) / 4
+                if deload:
+                    kg *= 0.8
+                kg = round(kg / 2.5) * 2.5 if kg >= 20 else round(kg)
+                exercises.append(Exercise(
+                    name=name,
+                    sets=rng.randint(2, 5),
+                    reps=rng.choice([3, 5, 6, 8, 10, 12, 15]),
+                    load=load.format(kg=f"{kg:g}") if load else None,
+                    notes=rng.choice(EXERCISE_NOTES) if rng.random() < 0.25 else None,
+                ))
+            fatigue += 3 if not deload else 1.5
+        elif workout_type == "run":
+            long_run = day.weekday() == 5
+            distance = round(rng.uniform(12, 24) if long_run else rng.uniform(4, 10), 1)
+            pace = round(rng.uniform(4.6, 6.4) + (0.3 if areas else 0), 2)
+            running = RunningData(
+                distance_km=distance,
+                duration_minutes=round(distance * pace, 1),
+                pace_min_per_km=pace,
+                route=rng.choice(ROUTES),
+            )
+            fatigue += distance / 4
+        else:
+            exercises = [
+                Exercise(name=name, sets=1, reps=None, load=None)
+                for name in rng.sample(RECOVERY_POOL, rng.randint(1, 3))
+            ]
+
+        fatigue_level = min(10, max(1, round(fatigue + rng.uniform(-1, 1))))
+        effort = "easy" if workout_type == "recovery" or deload else rng.choice(["moderate", "moderate", "hard"])
+        written = datetime.combine(day, dt_time(19, 0))
+
+        log = WorkoutLog(
+            date=day,
+            workout_type=workout_type,
+            exercises=exercises,
+            running_data=running,
+            perceived_effort=effort,
+            fatigue_level=fatigue_level,
+            pain_or_tightness=PainOrTightness(
+                body_areas=list(areas),
+                description=rng.choice(PAIN_DESCRIPTIONS),
+                severity=rng.choice(["mild", "mild", "moderate", "severe"]),
+            ) if areas else None,
+            free_text_reflection=rng.choice(REFLECTIONS) if rng.random() < 0.8 else None,
+            metadata=Metadata(created_at=written, updated_at=written, version=1),
+        )
+        log.metrics = compute_metrics(log)
+        if rng.random() < analysis_rate:
+            log.ai_analysis = _analysis(rng, log, areas)
+        yield log
+
+
+def write_history(data_dir: Path, days: int, seed: int = 0, backend: str = "json", batch_size: int = 500) -> int:
+    """Write a synthetic history into a data directory; returns the number of logs."""
+    store = create_backend(backend, Path(data_dir))
+    count = 0
+    batch: List[WorkoutLog] = []
+    try:
+        for log in generate_logs(days, seed):
+            batch.append(log)
+            if len(batch) >= batch_size:
+                store.put_many(batch)
+                count += len(batch)
+                batch = []
+        store.put_many(batch)
+        count += len(batch)
+    finally:
+        store.close()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=3650, help="Days of history (1k-100k)")
+    parser.add_argument("--out", type=Path, required=True, help="Data directory to write")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json", help="Storage backend")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = write_history(args.out, args.days, args.seed, args.backend)
+    print(json.dumps({
+        "days": args.days,
+        "logs": count,
+        "seed": args.seed,
+        "backend": args.backend,
+        "first_date": (END_DATE - timedelta(days=args.days - 1)).isoformat(),
+        "last_date": END_DATE.isoformat(),
+        "seconds": round(time.perf_counter() - start, 2),
+    }))
+
+
+if __name__ == "__main__":
+    main()
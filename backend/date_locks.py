@@ -0,0 +1,96 @@
+"""Per-date and per-file locks shared by threads and, where fcntl exists, processes."""
+
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks are per process only
+    fcntl = None
+
+# Dates are hashed onto a fixed set of locks so memory and lock files stay
+# bounded; two dates sharing a stripe just serialise with each other.
+LOCK_STRIPES = 64
+
+
+class FileLock:
+    """A reentrant thread lock paired with a lock file."""
+
+    def __init__(self, path: Path):
+        self.lock = threading.RLock()
+        self.path = path
+        self.depth = 0
+        self.fd = None
+
+    def acquire(self) -> None:
+        self.lock.acquire()
+        if self.depth == 0 and fcntl:
+            # flock is per open file, so only the outermost holder takes it
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        self.depth += 1
+
+    def release(self) -> None:
+        self.depth -= 1
+        if self.depth == 0 and fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def close(self) -> None:
+        """Close the lock file (it is reopened if the lock is used again)."""
+        with self.lock:
+            if self.fd is not None and self.depth == 0:
+                os.close(self.fd)
+                self.fd = None
+
+
+class DateLocks:
+    """
+    Serialises read-modify-write cycles on the same log date.
+
+    Locks are reentrant within a thread. With fcntl available they also hold
+    across processes (e.g. several uvicorn workers) using lock files in
+    `lock_dir`.
+    """
+
+    def __init__(self, lock_dir: Path, stripes: int = LOCK_STRIPES):
+        """Initialize the stripes; lock files are created on first use."""
+        self.lock_dir = Path(lock_dir)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self._stripes = [FileLock(self.lock_dir / f"stripe-{i:02d}.lock") for i in range(stripes)]
+
+    @contextmanager
+    def hold(self, dates: Iterable[date]) -> Iterator[None]:
+        """Hold the locks for several dates (acquired in a fixed order to avoid deadlocks)."""
+        stripes = self._stripes_for(dates)
+        acquired: List[FileLock] = []
+        try:
+            for stripe in stripes:
+                stripe.acquire()
+                acquired.append(stripe)
+            yield
+        finally:
+            for stripe in reversed(acquired):
+                stripe.release()
+
+    def close(self) -> None:
+        """Close the lock files opened so far."""
+        for stripe in self._stripes:
+            stripe.close()
+
+    def _stripes_for(self, dates: Iterable[date]) -> List[FileLock]:
+        """Distinct stripes for a set of dates, in index order."""
+        indexes = sorted({d.toordinal() % len(self._stripes) for d in dates})
+        return [self._stripes[i] for i in indexes]
@@ -0,0 +1,176 @@
+"""Change feed behind GET /events: log writes, file edits and analysis results as server-sent events."""
+
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque
+from datetime import date
+from typing import AsyncIterator, Deque, Dict, List, NamedTuple, Optional, Set
+
+from models import WorkoutLog
+from storage import ChangeListener, SAVED, DELETED
+from instrumentation import counter, gauge
+
+# Recent events kept (across tenants) for clients resuming with Last-Event-ID
+HISTORY_SIZE = 1000
+
+# Events a subscriber may fall behind by before it is sent `reset` instead
+QUEUE_SIZE = 1000
+
+# A comment is sent on idle streams so proxies keep them open and dead
+# clients are noticed
+KEEPALIVE_SECONDS = 15.0
+
+# Reconnect delay suggested to EventSource clients, in milliseconds
+RETRY_MS = 3000
+
+PUBLISHED = counter("workout_events_published", "Change events published by type", ["type"])
+SUBSCRIBERS = gauge("workout_events_subscribers", "Open GET /events streams")
+
+
+class Event(NamedTuple):
+    seq: int
+    tenant_id: str
+    type: str
+    data: str
+
+    def encode(self, epoch: str) -> str:
+        return f"id: {epoch}-{self.seq}\nevent: {self.type}\ndata: {self.data}\n\n"
+
+
+class Subscription:
+    """One client's queue of events; filled from any thread, read on the event loop."""
+
+    def __init__(self, tenant_id: str, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.tenant_id = tenant_id
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(queue_size)
+        self._loop = loop
+
+    def put(self, event: Event) -> None:
+        """Queue an event (thread-safe)."""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Event loop closed: the server is shutting down
+            pass
+
+    def _put(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind to catch up event by event: have the client reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(event._replace(type="reset", data="{}"))
+
+
+class EventBroker:
+    """
+    Fans events out to the GET /events streams of their tenant.
+
+    Events can be published from any thread (request handlers, the log
+    watcher, analysis workers). Ids are `<boot>-<sequence>`: a client
+    reconnecting with a Last-Event-ID from this process is sent what it
+    missed, if still in the history; otherwise (a restart, or too long
+    away) it gets a `reset` event and should reload.
+    """
+
+    def __init__(self, history_size: int = HISTORY_SIZE, queue_size: int = QUEUE_SIZE):
+        """Initialize an empty broker (streams need `start` to have run)."""
+        self.queue_size = queue_size
+        self.epoch = uuid.uuid4().hex[:8]
+
+        self._seq = itertools.count(1)
+        self._history: Deque[Event] = deque(maxlen=history_size)
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """Bind to the running event loop."""
+        self._loop = asyncio.get_running_loop()
+
+    def publish(self, tenant_id: str, event_type: str, data: dict) -> None:
+        """Send an event to a tenant's subscribers (thread-safe)."""
+        with self._lock:
+            event = Event(next(self._seq), tenant_id, event_type, json.dumps(data, separators=(",", ":")))
+            self._history.append(event)
+            subscribers = list(self._subscribers.get(tenant_id, ()))
+
+        PUBLISHED.inc(type=event_type)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def storage_listener(self, tenant_id: str) -> ChangeListener:
+        """A WorkoutStorage listener publishing `log` and `deleted` events for a tenant."""
+        def listener(kind: str, log_date: date, log: Optional[WorkoutLog]) -> None:
+            source = "api" if kind in (SAVED, DELETED) else "file"
+            if log is None:
+                self.publish(tenant_id, "deleted", {"date": log_date.isoformat(), "source": source})
+            else:
+                version = log.metadata.version if log.metadata else None
+                self.publish(tenant_id, "log", {"date": log_date.isoformat(), "version": version, "source": source})
+
+        return listener
+
+    def subscribe(self, tenant_id: str, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Start receiving a tenant's events, first replaying those after
+        `last_event_id`. Call from the event loop.
+        """
+        if self._loop is None:
+            raise RuntimeError("Event broker is not running")
+
+        subscription = Subscription(tenant_id, self._loop, self.queue_size)
+        with self._lock:
+            missed = self._missed(tenant_id, last_event_id) if last_event_id else []
+            self._subscribers.setdefault(tenant_id, set()).add(subscription)
+            SUBSCRIBERS.set(self._count())
+
+        for event in missed:
+            subscription._put(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.tenant_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.tenant_id]
+            SUBSCRIBERS.set(self._count())
+
+    def _count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _missed(self, tenant_id: str, last_event_id: str) -> List[Event]:
+        """A tenant's events after `last_event_id`, or a single reset if some are gone."""
+        epoch, _, seq = last_event_id.partition("-")
+        last_seq = int(seq) if seq.isdigit() else -1
+        latest = self._history[-1].seq if self._history else 0
+        oldest = self._history[0].seq if self._history else 1
+
+        if epoch != self.epoch or last_seq < 0 or last_seq > latest or last_seq < oldest - 1:
+            return [Event(latest, tenant_id, "reset", "{}")]
+        return [event for event in self._history if event.seq > last_seq and event.tenant_id == tenant_id]
+
+    async def stream(self, tenant_id: str, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Server-sent events for a tenant (see subscribe) until the client disconnects."""
+        subscription = self.subscribe(tenant_id, last_event_id)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield event.encode(self.epoch)
+        finally:
+            self.unsubscribe(subscription)
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"subscribers": self._count(), "history": len(self._history)}
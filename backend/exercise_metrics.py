@@ -0,0 +1,122 @@
+"""Strength metrics derived from parsed exercise loads."""
+
+from typing import List, Optional
+
+from models import WorkoutLog, LogMetrics, ExerciseMetrics, ExerciseProgression, ProgressionPoint
+from load_parser import parse_load, PARSER_VERSION
+
+# Above this many reps a one-rep max estimate says little
+MAX_1RM_REPS = 12
+
+
+def _singular(word: str) -> str:
+    """Drop a plural "s" so "Squats" and "squat" are the same exercise."""
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def normalize_exercise_name(name: str) -> str:
+    """Normalise an exercise name for matching ("Romanian Deadlifts " -> "romanian deadlift")."""
+    words = name.casefold().split()
+    return " ".join(words[:-1] + [_singular(words[-1])]) if words else ""
+
+
+def estimate_1rm(kg: float, reps: int) -> Optional[float]:
+    """Epley one-rep max estimate, None for no load or too many reps."""
+    if kg <= 0 or not 1 <= reps <= MAX_1RM_REPS:
+        return None
+    return round(kg if reps == 1 else kg * (1 + reps / 30), 1)
+
+
+def compute_metrics(log: WorkoutLog) -> Optional[LogMetrics]:
+    """Parse every exercise load of a log into volume, top set and 1RM (None without exercises)."""
+    if not log.exercises:
+        return None
+
+    exercises = []
+    for ex in log.exercises:
+        parsed = parse_load(ex.load, ex.name)
+        metrics = ExerciseMetrics(name=ex.name)
+
+        if parsed:
+            metrics.implement = parsed.implement
+            metrics.bodyweight = parsed.bodyweight
+            metrics.top_set_kg = parsed.kg
+
+            # Volume counts external load only (bodyweight and assistance add nothing)
+            if parsed.avg_kg is not None and ex.reps:
+                metrics.volume_kg = round((ex.sets or 1) * ex.reps * max(parsed.avg_kg, 0.0), 1)
+            if parsed.kg is not None and ex.reps and not parsed.bodyweight:
+                metrics.estimated_1rm_kg = estimate_1rm(parsed.kg, ex.reps)
+
+        exercises.append(metrics)
+
+    return LogMetrics(
+        version=PARSER_VERSION,
+        total_volume_kg=round(sum(m.volume_kg or 0 for m in exercises), 1),
+        exercises=exercises
+    )
+
+
+def log_metrics(log: WorkoutLog) -> Optional[LogMetrics]:
+    """
+    A log's stored metrics, recomputed if missing, from an older parser or
+    out of line with its exercises (a hand-edited file keeps the metrics of
+    exercises it removed or reordered).
+    """
+    metrics = log.metrics
+    if (
+        metrics and metrics.version == PARSER_VERSION
+        and [m.name for m in metrics.exercises] == [ex.name for ex in log.exercises or []]
+    ):
+        return metrics
+    return compute_metrics(log)
+
+
+def _max(values: List[Optional[float]]) -> Optional[float]:
+    """Largest non-missing value."""
+    present = [v for v in values if v is not None]
+    return max(present) if present else None
+
+
+def exercise_progression(exercise: str, logs: List[WorkoutLog]) -> ExerciseProgression:
+    """
+    Build the per-session series of an exercise from logs' stored metrics.
+
+    An exercise logged more than once on a day becomes one point: volumes
+    and sets add up, top set and 1RM take the best entry.
+    """
+    key = normalize_exercise_name(exercise)
+    points = []
+
+    for log in logs:
+        metrics = log_metrics(log)
+        if not metrics:
+            continue
+
+        entries = [
+            (ex, m) for ex, m in zip(log.exercises, metrics.exercises)
+            if normalize_exercise_name(ex.name) == key
+        ]
+        if not entries:
+            continue
+
+        heaviest, heaviest_metrics = max(entries, key=lambda entry: entry[1].top_set_kg or 0)
+        volumes = [m.volume_kg for _, m in entries if m.volume_kg is not None]
+        points.append(ProgressionPoint(
+            date=log.date,
+            sets=sum(ex.sets or 0 for ex, _ in entries) or None,
+            reps=heaviest.reps,
+            load=heaviest.load,
+            implement=heaviest_metrics.implement,
+            top_set_kg=_max([m.top_set_kg for _, m in entries]),
+            volume_kg=round(sum(volumes), 1) if volumes else None,
+            estimated_1rm_kg=_max([m.estimated_1rm_kg for _, m in entries])
+        ))
+
+    return ExerciseProgression(
+        exercise=key,
+        sessions=len(points),
+        best_top_set_kg=_max([p.top_set_kg for p in points]),
+        best_estimated_1rm_kg=_max([p.estimated_1rm_kg for p in points]),
+        points=points
+    )
@@ -0,0 +1,123 @@
+"""Local stand-in for the Anthropic client, for tests and offline development."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import AsyncIterator, List
+
+FAKE_RESPONSE = """### HUMAN INSIGHT
+Solid, consistent session. Keep the effort easy for the next day or two and give the tight areas some mobility work.
+
+### MACHINE CONTEXT
+```json
+{
+  "training_phase": "early_adaptation",
+  "overall_fatigue": "moderate",
+  "injury_risk": "low_to_moderate",
+  "problem_areas": ["calves"],
+  "movement_quality": "acceptable",
+  "recommended_focus": ["mobility", "easy_aerobic_base"],
+  "load_adjustment": "maintain_or_slightly_reduce",
+  "confidence_score": 0.7
+}
+```
+"""
+
+
+def _tokens(value) -> int:
+    """Rough token estimate (4 characters per token)."""
+    return len(str(value)) // 4
+
+
+class _Messages:
+    """Synchronous messages resource."""
+
+    def __init__(self, text: str, delay: float):
+        self.text = text
+        self.delay = delay
+        self.calls: List[dict] = []
+        self._cached_system = set()
+
+    def create(self, **kwargs) -> SimpleNamespace:
+        """Record the request and return the canned response after `delay` seconds."""
+        self.calls.append(kwargs)
+        time.sleep(self.delay)
+        return self._message(kwargs)
+
+    def _message(self, kwargs: dict) -> SimpleNamespace:
+        """Build an object shaped like an Anthropic Message, mimicking prompt caching."""
+        system = str(kwargs.get("system", ""))
+        cached = "cache_control" in system and system in self._cached_system
+        created = "cache_control" in system and not cached
+        self._cached_system.add(system)
+
+        return SimpleNamespace(
+            model=kwargs.get("model", ""),
+            stop_reason="end_turn",
+            content=[SimpleNamespace(type="text", text=self.text)],
+            usage=SimpleNamespace(
+                input_tokens=_tokens(kwargs.get("messages", "")) + (0 if cached or created else _tokens(system)),
+                cache_creation_input_tokens=_tokens(system) if created else 0,
+                cache_read_input_tokens=_tokens(system) if cached else 0,
+                output_tokens=_tokens(self.text)
+            )
+        )
+
+
+class _AsyncStream:
+    """Stub of anthropic's AsyncMessageStream that emits the text in small chunks."""
+
+    def __init__(self, message: SimpleNamespace, delay: float, chunk_size: int = 16):
+        self._message = message
+        self._delay = delay
+        self._chunk_size = chunk_size
+
+    async def __aenter__(self) -> "_AsyncStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> bool:
+        return False
+
+    @property
+    def text_stream(self) -> AsyncIterator[str]:
+        """Yield the response text, spreading `delay` across the chunks."""
+        return self._chunks()
+
+    async def _chunks(self) -> AsyncIterator[str]:
+        text = self._message.content[0].text
+        count = max(1, -(-len(text) // self._chunk_size))
+        for i in range(0, len(text), self._chunk_size):
+            await asyncio.sleep(self._delay / count)
+            yield text[i:i + self._chunk_size]
+
+    async def get_final_message(self) -> SimpleNamespace:
+        return self._message
+
+
+class _AsyncMessages(_Messages):
+    """Asynchronous messages resource."""
+
+    async def create(self, **kwargs) -> SimpleNamespace:
+        """Record the request and return the canned response after `delay` seconds."""
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+        return self._message(kwargs)
+
+    def stream(self, **kwargs) -> _AsyncStream:
+        """Record the request and stream the canned response over `delay` seconds."""
+        self.calls.append(kwargs)
+        return _AsyncStream(self._message(kwargs), self.delay)
+
+
+class FakeAnthropic:
+    """Drop-in for anthropic.Anthropic that answers every request with `text`."""
+
+    def __init__(self, text: str = FAKE_RESPONSE, delay: float = 0.0):
+        self.messages = _Messages(text, delay)
+
+
+class FakeAsyncAnthropic:
+    """Drop-in for anthropic.AsyncAnthropic that answers every request with `text`."""
+
+    def __init__(self, text: str = FAKE_RESPONSE, delay: float = 0.0):
+        self.messages = _AsyncMessages(text, delay)
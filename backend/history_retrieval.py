@@ -0,0 +1,103 @@
+"""Choose which earlier logs to send as context with an analysis."""
+
+from bisect import bisect_left
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from models import WorkoutLog, WorkoutType
+from storage import WorkoutStorage
+from summary_store import WORKOUT_TYPES
+from ai_service import history_row_tokens
+
+# How much sharing each kind of key with the analysed log counts
+MATCH_WEIGHTS = {"area": 3.0, "exercise": 2.0, "type": 0.5}
+
+# Per key only its latest occurrences before the recent window count, each
+# worth half as much as the one after it
+OCCURRENCES_PER_KEY = 3
+
+
+class HistoryRetriever:
+    """
+    Selects the history sent with an analysis.
+
+    The recent window (`include_history_days`) is kept. On top of it, older
+    logs relevant to the analysed one - the last times the same body area
+    hurt, the same exercise was done or the same workout type was trained -
+    are ranked across the whole history from the search index (body areas,
+    exercise names) and the summary (workout types), so only logs that are
+    actually sent get read. Both fit into a token budget, recent logs first.
+    """
+
+    def __init__(self, storage: WorkoutStorage, max_related: int = 8, token_budget: int = 1500):
+        """Initialize with storage, the number of older logs to add and the history token budget."""
+        self.storage = storage
+        self.max_related = max_related
+        self.token_budget = token_budget
+
+    def select(
+        self,
+        log: WorkoutLog,
+        days: int,
+        history_logs: Optional[List[WorkoutLog]] = None
+    ) -> Tuple[List[WorkoutLog], List[WorkoutLog]]:
+        """
+        Return (history_logs, related_logs) for a log, both oldest first.
+
+        Pass `history_logs` if the recent window is already in memory. When
+        the budget runs out the oldest recent logs are dropped first.
+        """
+        if history_logs is None:
+            history_logs = self.storage.get_history(log.date, days)
+
+        budget = self.token_budget
+        recent = []
+        for prior in reversed(history_logs):
+            cost = history_row_tokens(prior)
+            if cost > budget:
+                break
+            budget -= cost
+            recent.append(prior)
+        recent.reverse()
+
+        related = []
+        if self.max_related > 0:
+            for related_date in self.rank(log, log.date - timedelta(days=days)):
+                prior = self.storage.get_log(related_date)
+                if not prior:
+                    continue
+                cost = history_row_tokens(prior)
+                if cost > budget:
+                    break
+                budget -= cost
+                related.append(prior)
+                if len(related) == self.max_related:
+                    break
+
+        related.sort(key=lambda prior: prior.date)
+        return recent, related
+
+    def rank(self, log: WorkoutLog, before: date) -> List[date]:
+        """Dates of logs before `before`, most relevant to `log` first."""
+        pain = log.pain_or_tightness
+        occurrences = self.storage.get_search_index().occurrences(
+            body_areas=(pain.body_areas or []) if pain else [],
+            exercises=[ex.name for ex in log.exercises or []]
+        )
+        occurrences[("type", log.workout_type.value)] = self._dates_of_type(log.workout_type, before)
+
+        scores: Dict[date, float] = {}
+        for (kind, _), dates in occurrences.items():
+            end = bisect_left(dates, before)
+            latest = dates[max(0, end - OCCURRENCES_PER_KEY):end]
+            for age, prior_date in enumerate(reversed(latest)):
+                scores[prior_date] = scores.get(prior_date, 0.0) + MATCH_WEIGHTS[kind] / 2 ** age
+
+        # Ties go to the more recent log
+        return sorted(scores, key=lambda d: (scores[d], d), reverse=True)
+
+    def _dates_of_type(self, workout_type: WorkoutType, before: date) -> List[date]:
+        """Latest dates of a workout type before a date, from the summary."""
+        columns = self.storage.get_summary().columns(end_date=before - timedelta(days=1))
+        dates = columns["date"][columns["workout_type"] == WORKOUT_TYPES.index(workout_type) + 1]
+        return [d.item() for d in dates[-OCCURRENCES_PER_KEY:]]
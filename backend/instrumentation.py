@@ -0,0 +1,352 @@
+"""In-process metrics in Prometheus text format, and opt-in per-request traces."""
+
+import contextvars
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Histogram bucket bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+SLOW_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# Request header that asks for a trace (when profiling is enabled)
+PROFILE_HEADER = "x-profile"
+
+_registry: Dict[str, "Metric"] = {}
+_registry_lock = threading.Lock()
+
+# Trace of the current request, if it is being profiled
+_current_trace: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("trace", default=None)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    """`{a="1",b="2"}`, or "" without labels."""
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    """A sample value (integers without a fraction)."""
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Trace:
+    """Timed spans and counter totals collected while one request runs."""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = datetime.utcnow()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[dict] = []
+        self.counts: Dict[str, float] = {}
+
+    def add_span(self, name: str, start: float, duration: float, labels: Dict[str, str]) -> None:
+        """Record a finished span (start is a perf_counter reading)."""
+        span = {
+            "name": name,
+            "start_ms": round((start - self._start) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+            "thread": threading.current_thread().name,
+        }
+        if labels:
+            span["labels"] = labels
+        with self._lock:
+            self.spans.append(span)
+
+    def add_count(self, key: str, amount: float) -> None:
+        """Add to a counter total."""
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + amount
+
+    def to_dict(self, route: Optional[str], status: Optional[int]) -> dict:
+        """The trace as written to disk."""
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": route,
+            "status": status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"]),
+            "counts": self.counts,
+        }
+
+
+class Metric:
+    """A named metric with one child per combination of label values."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: str):
+        """The child for a set of label values (create it once, keep it for hot paths)."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child(key)
+        return child
+
+    def _new_child(self, key: Tuple[str, ...]):
+        raise NotImplementedError
+
+    def _trace_key(self, key: Tuple[str, ...]) -> str:
+        """Name of a child in traces."""
+        return self.name + _format_labels(list(zip(self.labelnames, key)))
+
+    def render(self) -> List[str]:
+        """Text-format lines for this metric."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(child.samples(list(zip(self.labelnames, key))))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self, name: str, trace_key: str):
+        self.name = name
+        self.trace_key = trace_key
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_count(self.trace_key, amount)
+
+    def samples(self, labels) -> List[str]:
+        return [f"{self.name}_total{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Counter(Metric):
+    """A monotonically increasing count; exported as `<name>_total`."""
+
+    type = "counter"
+
+    def _new_child(self, key):
+        return _CounterChild(self.name, self._trace_key(key))
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        self.labels(**labels).inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def samples(self, labels) -> List[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Gauge(Metric):
+    """A value that is set, e.g. from a snapshot taken when metrics are scraped."""
+
+    type = "gauge"
+
+    def _new_child(self, key):
+        return _GaugeChild(self.name)
+
+    def set(self, value: float, **labels: str) -> None:
+        self.labels(**labels).set(value)
+
+
+class _HistogramChild:
+    def __init__(self, name: str, labels: Dict[str, str], buckets: Sequence[float]):
+        self.name = name
+        self.trace_labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of a block, and add it to the trace as a span."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(elapsed)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.add_span(self.name, start, elapsed, self.trace_labels)
+
+    def samples(self, labels) -> List[str]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + [float("inf")], counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self, key):
+        labels = dict(zip(self.labelnames, key))
+        return _HistogramChild(self.name, labels, self.buckets)
+
+    def observe(self, value: float, **labels: str) -> None:
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels: str):
+        return self.labels(**labels).time()
+
+
+def _register(metric: Metric) -> Metric:
+    """Add a metric to the registry (an existing one of the same name is returned)."""
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Register a counter."""
+    return _register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """Register a gauge."""
+    return _register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    """Register a histogram."""
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUESTS = counter(
+    "workout_http_requests", "HTTP requests by route and status", ["method", "route", "status"]
+)
+HTTP_DURATION = histogram(
+    "workout_http_request_duration_seconds", "Time from request to the last response byte",
+    ["method", "route"]
+)
+
+
+class InstrumentationMiddleware:
+    """
+    Times every request by route template and status.
+
+    With a profile directory set, a request carrying an `X-Profile: 1`
+    header is traced: the spans and counters recorded while it runs are
+    written to a JSON file there, named in the `X-Profile-Trace` response
+    header.
+    """
+
+    def __init__(self, app: ASGIApp, profile_dir: Optional[Path] = None):
+        self.app = app
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        if self.profile_dir:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        trace = None
+        trace_file = None
+
+        if self.profile_dir and Headers(scope=scope).get(PROFILE_HEADER, "") not in ("", "0"):
+            trace = Trace(scope["method"], scope["path"])
+            name = re.sub(r"[^A-Za-z0-9_.-]+", "_", scope["path"].strip("/")) or "root"
+            trace_file = f"{trace.started_at.strftime('%Y%m%dT%H%M%S%f')}-{scope['method']}-{name}.json"
+        token = _current_trace.set(trace)
+
+        async def send_timed(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace_file:
+                    MutableHeaders(raw=message.setdefault("headers", []))["X-Profile-Trace"] = trace_file
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _current_trace.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            labels = {"method": scope["method"], "route": route or "unmatched"}
+            HTTP_DURATION.observe(time.perf_counter() - start, **labels)
+            HTTP_REQUESTS.inc(**labels, status=str(status))
+            if trace is not None:
+                (self.profile_dir / trace_file).write_text(
+                    json.dumps(trace.to_dict(route, status), indent=2), encoding="utf-8"
+                )
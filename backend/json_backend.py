@@ -0,0 +1,322 @@
+"""One JSON file per day in data/logs/."""
+
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from models import WorkoutLog
+from log_backend import LogBackend, FILE_STATS, READS, BYTES_READ, CACHE_LOOKUPS, PARSE_SECONDS, ENCODE_SECONDS
+from summary_store import normalize_body_area
+from write_journal import WriteJournal, atomic_write
+
+# How log writes reach disk:
+#   atomic  - temp file + rename; a crash never leaves a truncated log
+#   fsync   - as atomic, and each write is flushed before save_log returns
+#   journal - writes go through a group-commit journal so concurrent saves
+#             share one fsync; replayed on startup after a crash
+DURABILITY_MODES = ("atomic", "fsync", "journal")
+JOURNAL_FILE = "journal.wal"
+
+# A directory modified this recently may change again within the same mtime
+# tick, so an index built from it is not trusted until it settles.
+INDEX_MTIME_SLACK_NS = 2_000_000_000
+
+# Metric children for this backend, looked up once
+_STATS = FILE_STATS.labels(backend="json")
+_READS = READS.labels(backend="json")
+_BYTES_READ = BYTES_READ.labels(backend="json")
+_CACHE_HITS = CACHE_LOOKUPS.labels(backend="json", result="hit")
+_CACHE_MISSES = CACHE_LOOKUPS.labels(backend="json", result="miss")
+_PARSE = PARSE_SECONDS.labels(backend="json")
+_ENCODE = ENCODE_SECONDS.labels(backend="json")
+
+# (file key, parsed log, compact JSON or None until first requested)
+CacheEntry = Tuple[Tuple[int, int], WorkoutLog, Optional[bytes]]
+
+
+def log_file_date(name: str) -> Optional[date]:
+    """The date of a `YYYY-MM-DD.json` log file name; None for example, temp and other files."""
+    if not name.endswith(".json") or "example" in name:
+        return None
+    try:
+        return date.fromisoformat(name[:-5])
+    except ValueError:
+        return None
+
+
+class JsonFileBackend(LogBackend):
+    """Stores each log as a pretty-printed, hand-editable `YYYY-MM-DD.json`."""
+
+    name = "json"
+
+    def __init__(self, data_dir: Path, cache_size: int = 256, durability: str = "atomic"):
+        """Initialize with the data directory, parsed-log cache size and durability mode."""
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+
+        self.data_dir = Path(data_dir)
+        self.logs_dir = self.data_dir / "logs"
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+
+        # Replay writes a crash left in the journal, whatever the current mode
+        self.durability = durability
+        journal_path = self.data_dir / JOURNAL_FILE
+        if durability == "journal":
+            self.journal: Optional[WriteJournal] = WriteJournal(journal_path, self.data_dir)
+        else:
+            self.journal = None
+            WriteJournal.recover(journal_path, self.data_dir)
+
+        # Sorted dates that have a log file, rebuilt when the logs
+        # directory mtime changes (files added, removed or renamed)
+        self._date_index: List[date] = []
+        self._index_mtime_ns: Optional[int] = None
+
+        # LRU of parsed logs keyed by date, each entry tagged with the
+        # (mtime_ns, size) of the file it was read from and holding the
+        # log's compact JSON once it has been asked for
+        self._cache: "OrderedDict[date, CacheEntry]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def get_log_path(self, log_date: date) -> Path:
+        """Get file path for a specific date."""
+        return self.logs_dir / f"{log_date.isoformat()}.json"
+
+    def get(self, log_date: date) -> Optional[WorkoutLog]:
+        """
+        Retrieve a workout log for a specific date.
+
+        Logs are served from the cache while the file's mtime and size are
+        unchanged. The returned object is a shallow copy: top-level fields can
+        be reassigned freely, nested models should be replaced, not mutated.
+        """
+        entry = self._load(log_date)
+        return entry[1].model_copy() if entry else None
+
+    def get_json(self, log_date: date) -> Optional[bytes]:
+        """
+        Compact JSON of a validated log, serialised once and kept with the
+        cached log until its file changes.
+        """
+        entry = self._load(log_date)
+        if entry is None:
+            return None
+
+        file_key, log, encoded = entry
+        if encoded is None:
+            with _ENCODE.time():
+                encoded = log.model_dump_json().encode("utf-8")
+            with self._cache_lock:
+                # Only if the file wasn't re-read or evicted meanwhile
+                if self._cache.get(log_date) is entry:
+                    self._cache[log_date] = (file_key, log, encoded)
+        return encoded
+
+    def iter_raw(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Iterator[Tuple[date, bytes]]:
+        """
+        Yield (date, file contents) for each log in a range, one file at a time.
+
+        Files are not parsed or cached, so exporting a long history neither
+        holds it in memory nor evicts recently used logs.
+        """
+        dates = self.list_dates()
+        lo = bisect_left(dates, start_date) if start_date else 0
+        hi = bisect_right(dates, end_date) if end_date else len(dates)
+
+        for log_date in dates[lo:hi]:
+            try:
+                with open(self.get_log_path(log_date), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                # Deleted since the index was read
+                continue
+            _READS.inc()
+            _BYTES_READ.inc(len(data))
+            yield log_date, data
+
+    def put_many(self, logs: List[WorkoutLog]) -> None:
+        """Write log files, sharing one journal commit, and cache them."""
+        writes = [(self.get_log_path(log.date), log) for log in logs]
+        self.write_files(writes)
+
+        for log_path, log in writes:
+            self._cache_put(log.date, (self._file_key(log_path), log.model_copy(), None))
+
+    def write_files(self, writes: List[Tuple[Path, WorkoutLog]]) -> None:
+        """Write log files according to the durability mode."""
+        # Serialise once, straight to pretty-printed UTF-8 bytes
+        encoded = [(log_path, log.model_dump_json(indent=2).encode("utf-8")) for log_path, log in writes]
+
+        if self.journal:
+            self.journal.commit([(self._journal_name(log_path), data) for log_path, data in encoded])
+        else:
+            for log_path, data in encoded:
+                atomic_write(log_path, data, fsync=self.durability == "fsync")
+
+    def delete(self, log_date: date) -> bool:
+        """Delete a log file."""
+        log_path = self.get_log_path(log_date)
+
+        self._cache_discard(log_date)
+
+        if not log_path.exists():
+            return False
+
+        if self.journal:
+            self.journal.commit([(self._journal_name(log_path), None)])
+        else:
+            log_path.unlink()
+        return True
+
+    def find_dates(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        workout_type: Optional[str] = None,
+        body_area: Optional[str] = None,
+        min_fatigue: Optional[int] = None
+    ) -> List[date]:
+        """Filter logs by reading each one in the range (there is no index)."""
+        dates = self.list_dates()
+        lo = bisect_left(dates, start_date) if start_date else 0
+        hi = bisect_right(dates, end_date) if end_date else len(dates)
+        area = normalize_body_area(body_area) if body_area else None
+
+        matches = []
+        for log_date in dates[lo:hi]:
+            log = self.get(log_date)
+            if not log:
+                continue
+            if workout_type and log.workout_type != workout_type:
+                continue
+            if min_fatigue is not None and (log.fatigue_level or 0) < min_fatigue:
+                continue
+            if area:
+                pain = log.pain_or_tightness
+                if not pain or area not in {normalize_body_area(a) for a in pain.body_areas or []}:
+                    continue
+            matches.append(log_date)
+        return matches
+
+    def cache_info(self) -> dict:
+        """Report parsed-log cache size and hit/miss counters."""
+        with self._cache_lock:
+            lookups = self._cache_hits + self._cache_misses
+            return {
+                "size": len(self._cache),
+                "max_size": self._cache_size,
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "hit_rate": self._cache_hits / lookups if lookups else 0.0
+            }
+
+    def close(self) -> None:
+        """Checkpoint the write journal, if one is in use."""
+        if self.journal:
+            self.journal.close()
+
+    def list_dates(self) -> List[date]:
+        """Sorted dates with a log file, rescanned when the directory changes."""
+        self._refresh_index()
+        return self._date_index
+
+    def _journal_name(self, path: Path) -> str:
+        """Path of a file relative to the data directory, as recorded in the journal."""
+        return path.relative_to(self.data_dir).as_posix()
+
+    @staticmethod
+    def _file_key(path: Path) -> Optional[Tuple[int, int]]:
+        """Return (mtime_ns, size) for a file, or None if it doesn't exist."""
+        _STATS.inc()
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, log_date: date) -> Optional[CacheEntry]:
+        """The cache entry for a date, reading and validating the file on a miss."""
+        log_path = self.get_log_path(log_date)
+        file_key = self._file_key(log_path)
+
+        if file_key is None:
+            self._cache_discard(log_date)
+            return None
+
+        with self._cache_lock:
+            entry = self._cache.get(log_date)
+            if entry and entry[0] == file_key:
+                self._cache.move_to_end(log_date)
+                self._cache_hits += 1
+                _CACHE_HITS.inc()
+                return entry
+            self._cache_misses += 1
+        _CACHE_MISSES.inc()
+
+        with open(log_path, 'rb') as f:
+            data = f.read()
+        _READS.inc()
+        _BYTES_READ.inc(len(data))
+
+        with _PARSE.time():
+            log = WorkoutLog.model_validate_json(data)
+
+        entry = (file_key, log, None)
+        self._cache_put(log_date, entry)
+        return entry
+
+    def _cache_put(self, log_date: date, entry: CacheEntry) -> None:
+        """Insert an entry into the cache, evicting the least recently used."""
+        if entry[0] is None or self._cache_size <= 0:
+            return
+
+        with self._cache_lock:
+            self._cache[log_date] = entry
+            self._cache.move_to_end(log_date)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_discard(self, log_date: date) -> None:
+        """Drop a date from the cache."""
+        with self._cache_lock:
+            self._cache.pop(log_date, None)
+
+    def _refresh_index(self) -> None:
+        """Rebuild the date index if the logs directory changed since the last scan."""
+        mtime_ns = self.logs_dir.stat().st_mtime_ns
+        _STATS.inc()
+        if mtime_ns == self._index_mtime_ns:
+            return
+
+        dates = self._scan_dates()
+        if dates != self._date_index:
+            self._date_index = dates
+
+        # Leave a freshly modified directory marked stale so the next call rescans
+        recent = time.time_ns() - mtime_ns < INDEX_MTIME_SLACK_NS
+        self._index_mtime_ns = None if recent else mtime_ns
+
+    def _scan_dates(self) -> List[date]:
+        """Scan the logs directory for dated log files."""
+        dates = []
+
+        with os.scandir(self.logs_dir) as entries:
+            for entry in entries:
+                log_date = log_file_date(entry.name)
+                if log_date:
+                    dates.append(log_date)
+
+        dates.sort()
+        return dates
@@ -0,0 +1,109 @@
+"""Repair of the almost-JSON objects models sometimes write into their responses."""
+
+import re
+from typing import Optional
+
+# Quotes and literals models sometimes write instead of JSON's
+SMART_QUOTES = {"[“”]": '"', "[‘’]": "'"}
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+TRAILING_COMMA = r",(\s*[}\]])"
+COMMENT = r"//[^\n]*"
+DANGLING_KEY = re.compile(r'"(?:[^"\\]|\\.)*"\s*:?\s*$')
+SINGLE_QUOTED = r"'((?:[^'\\\n]|\\.)*)'"
+BARE_KEY = r"([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)(\s*:)"
+
+
+def extract_object(text: str) -> Optional[str]:
+    """The text from the first `{` to its matching `}` (or to the end if it is never closed)."""
+    start = text.find("{")
+    if start < 0:
+        return None
+
+    depth = 0
+    in_string: Optional[str] = None
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == in_string:
+                in_string = None
+        elif char in "\"'":
+            in_string = char
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def _close(text: str) -> str:
+    """Close strings, arrays and objects left open by a truncated response."""
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        text += '"'
+    text = text.rstrip()
+
+    # A key without a value can't be completed; drop it with its comma
+    if stack and stack[-1] == "}":
+        match = DANGLING_KEY.search(text)
+        if match and text[:match.start()].rstrip().endswith((",", "{")):
+            text = text[:match.start()].rstrip()
+    text = text.rstrip(",:").rstrip()
+    return text + "".join(reversed(stack))
+
+
+def _outside_strings(text: str, pattern: str, new: str) -> str:
+    """re.sub everywhere except inside double-quoted strings."""
+    parts = re.split(r'("(?:\\.|[^"\\])*")', text)
+    regex = re.compile(pattern)
+    return "".join(part if part.startswith('"') else regex.sub(new, part) for part in parts)
+
+
+def repair(text: str) -> str:
+    """
+    Rewrite almost-JSON into JSON.
+
+    Handles what shows up in model output: surrounding prose or code fences,
+    // comments, trailing commas, single or typographic quotes, unquoted
+    keys, Python literals and a response cut off mid-object. Text inside
+    double-quoted strings is left as written.
+    """
+    for pattern, quote in SMART_QUOTES.items():
+        text = _outside_strings(text, pattern, quote)
+    candidate = extract_object(text)
+    if candidate is None:
+        raise ValueError("No JSON object found")
+
+    candidate = _outside_strings(candidate, SINGLE_QUOTED, r'"\1"')
+    candidate = _outside_strings(candidate, COMMENT, "")
+    candidate = _outside_strings(candidate, BARE_KEY, r'\1"\2"\3')
+    for old, new in PYTHON_LITERALS.items():
+        candidate = _outside_strings(candidate, rf"\b{old}\b", new)
+
+    candidate = _close(candidate)
+    return _outside_strings(candidate, TRAILING_COMMA, r"\1")
+
@@ -0,0 +1,143 @@
+"""Parse free-text exercise loads ("20kg", "bodyweight", "2x12kg DB") into numbers."""
+
+import re
+from typing import List, NamedTuple, Optional
+
+from models import ImplementType
+
+# Bump whenever parsing changes, so stored metrics are recomputed
+PARSER_VERSION = 3
+
+LB_TO_KG = 0.45359237
+
+# Word patterns per implement, checked in order against the load, then the exercise name
+IMPLEMENT_PATTERNS = [
+    (ImplementType.DUMBBELL, r"dumb+bells?|dbs?"),
+    (ImplementType.KETTLEBELL, r"kettlebells?|kbs?"),
+    (ImplementType.BARBELL, r"barbells?|bb|bar|trap bar|ez bar"),
+    (ImplementType.MACHINE, r"machines?|smith|leg press|stack|sled"),
+    (ImplementType.CABLE, r"cables?|pulley"),
+    (ImplementType.BAND, r"bands?|resistance band|tubing"),
+]
+IMPLEMENTS = [(implement, re.compile(rf"\b(?:{words})\b")) for implement, words in IMPLEMENT_PATTERNS]
+
+# Plural implement words: "10kg dumbbells" means one in each hand
+PAIRED = re.compile(r"\b(?:dumb+bells|dbs|kettlebells|kbs|pairs? of)\b")
+
+# Implements held one per hand, so "2x12kg" can mean two of them
+HANDHELD = (ImplementType.DUMBBELL, ImplementType.KETTLEBELL)
+
+BODYWEIGHT = re.compile(r"\b(?:body ?weight|bw)\b")
+ASSISTED = re.compile(r"\b(?:body ?weight|bw)\s*-\s*\d|\bassist")
+
+UNIT = r"(kg|kgs|kilos?|kilograms?|lbs?|pounds?)"
+NUMBER = r"(\d+(?:[.,]\d+)?)"
+
+# "2x12kg DB", "2 x 16 kg kettlebells": a count of implements times the weight of each
+MULTIPLE = re.compile(rf"\b([1-4])\s*[x×*]\s*{NUMBER}\s*{UNIT}?")
+# "3x10", "4 x 8": sets x reps, when no unit follows
+SETS_REPS = re.compile(rf"\b\d+\s*[x×*]\s*\d+\b(?!\s*{UNIT})")
+# "60/70/80kg", "20-24kg": values across sets, the unit given once
+SERIES = re.compile(rf"\d+(?:[.,]\d+)?(?:\s*[/-]\s*\d+(?:[.,]\d+)?)+\s*{UNIT}?")
+WEIGHT = re.compile(rf"{NUMBER}\s*{UNIT}?")
+
+
+class ParsedLoad(NamedTuple):
+    """A load in kg per rep, summed over every implement used."""
+    kg: Optional[float]             # heaviest value given (e.g. 24 for "20/22/24kg")
+    avg_kg: Optional[float]         # mean of the values given, for volume
+    implement: Optional[ImplementType]
+    count: int                      # implements used at once (2 for a pair of dumbbells)
+    bodyweight: bool                # kg is then weight added to (negative: assistance) bodyweight
+
+
+def _implement(text: str) -> Optional[ImplementType]:
+    """First implement named in a text."""
+    for implement, pattern in IMPLEMENTS:
+        if pattern.search(text):
+            return implement
+    return None
+
+
+def _to_kg(value: str, unit: Optional[str]) -> float:
+    """Convert a number and optional unit (kg when missing) to kg."""
+    number = float(value.replace(",", "."))
+    return number * LB_TO_KG if unit and unit.startswith(("lb", "pound")) else number
+
+
+def _implement_count(
+    text: str,
+    named: Optional[ImplementType],
+    implement: Optional[ImplementType]
+) -> Optional[re.Match]:
+    """
+    The first "NxW" in a load that counts implements rather than sets.
+
+    Only dumbbells and kettlebells (from the load or the exercise name) or a
+    load naming a pair are counted: "3x100kg" on a squat is three sets of
+    100kg, not 300kg.
+    """
+    if implement not in HANDHELD and not PAIRED.search(text):
+        return None
+    for multiple in MULTIPLE.finditer(text):
+        if multiple.group(3):
+            return multiple
+        rest = text[:multiple.start()] + " " + text[multiple.end():]
+        if named in HANDHELD and not WEIGHT.search(rest):
+            return multiple
+    return None
+
+
+def parse_load(load: Optional[str], exercise_name: Optional[str] = None) -> Optional[ParsedLoad]:
+    """
+    Parse a load string.
+
+    Handles units (kg, lb), bodyweight with added or assisting load
+    ("BW+10kg", "bw-20kg", "assisted 20kg"), implement counts ("2x12kg DB", "16kg kettlebells",
+    "pair of 24s") and values across sets ("60/70/80kg", "20-24kg"). The implement is taken from the load
+    or, failing that, the exercise name. Returns None for an empty load.
+
+    "NxW" is sets ("3x100kg" squat, "3x10 @ 20kg DB", "3 x 12") unless the
+    implement is a dumbbell or kettlebell or the load names a pair; without a
+    unit it also needs the load itself to name the implement and give no
+    other weight ("2x16 KB").
+    """
+    if not load or not load.strip():
+        return None
+
+    text = " ".join(load.casefold().split())
+    named = _implement(text)
+    implement = named or (_implement(exercise_name.casefold()) if exercise_name else None)
+    assisted = bool(ASSISTED.search(text))
+    bodyweight = assisted or bool(BODYWEIGHT.search(text))
+
+    count = 1
+    values: List[float] = []
+    multiple = _implement_count(text, named, implement)
+    if multiple:
+        count = int(multiple.group(1))
+        values = [_to_kg(multiple.group(2), multiple.group(3))]
+    else:
+        text = SETS_REPS.sub(" ", text)
+        series = SERIES.search(text)
+        if series:
+            values = [_to_kg(value, series.group(1)) for value in re.findall(NUMBER, series.group(0))]
+        else:
+            matches = WEIGHT.findall(text)
+            # Prefer numbers with a unit ("3x10 @ 50kg"); band levels have no weight
+            with_unit = [(value, unit) for value, unit in matches if unit]
+            if with_unit or implement != ImplementType.BAND:
+                values = [_to_kg(value, unit) for value, unit in with_unit or matches]
+        if PAIRED.search(text):
+            count = 2
+
+    if bodyweight and implement is None:
+        implement = ImplementType.BODYWEIGHT
+    if not values:
+        return ParsedLoad(0.0 if bodyweight else None, 0.0 if bodyweight else None, implement, count, bodyweight)
+
+    if assisted:
+        values = [-v for v in values]
+
+    values = [round(v * count, 2) for v in values]
+    return ParsedLoad(max(values), round(sum(values) / len(values), 2), implement, count, bodyweight)
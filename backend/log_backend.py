@@ -0,0 +1,107 @@
+"""Interface for the places workout logs are persisted."""
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Iterator, List, Optional, Tuple
+
+from models import WorkoutLog
+from instrumentation import counter, histogram, FAST_BUCKETS
+
+# I/O counters shared by the backends, labelled with the backend name
+FILE_STATS = counter("workout_storage_file_stats", "stat() calls on log files and the logs directory", ["backend"])
+READS = counter("workout_storage_reads", "Log files opened or rows fetched", ["backend"])
+BYTES_READ = counter("workout_storage_read_bytes", "Bytes of stored log JSON read", ["backend"])
+CACHE_LOOKUPS = counter("workout_storage_cache_lookups", "Backend cache lookups by result", ["backend", "result"])
+PARSE_SECONDS = histogram(
+    "workout_storage_parse_seconds", "Validating stored JSON into a WorkoutLog", ["backend"], FAST_BUCKETS
+)
+ENCODE_SECONDS = histogram(
+    "workout_storage_encode_seconds", "Serialising a validated log to compact JSON", ["backend"], FAST_BUCKETS
+)
+
+
+class LogBackend(ABC):
+    """
+    Reads and writes workout logs by date.
+
+    `WorkoutStorage` layers the summary sidecar and rollups on top of a
+    backend; backends only deal with the logs themselves.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def list_dates(self) -> List[date]:
+        """
+        Sorted dates that have a log.
+
+        Returns the same list object for as long as the set of dates is
+        unchanged, so callers can detect changes by identity. Don't mutate it.
+        """
+
+    @abstractmethod
+    def get(self, log_date: date) -> Optional[WorkoutLog]:
+        """The log for a date, or None. The caller may reassign its fields."""
+
+    @abstractmethod
+    def iter_raw(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Iterator[Tuple[date, bytes]]:
+        """Yield (date, JSON bytes) for each log in a range without building models."""
+
+    @abstractmethod
+    def put_many(self, logs: List[WorkoutLog]) -> None:
+        """Create or replace several logs."""
+
+    @abstractmethod
+    def delete(self, log_date: date) -> bool:
+        """Delete a log; returns False if there was none."""
+
+    @abstractmethod
+    def find_dates(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        workout_type: Optional[str] = None,
+        body_area: Optional[str] = None,
+        min_fatigue: Optional[int] = None
+    ) -> List[date]:
+        """Dates of logs matching every given filter (body_area is normalised)."""
+
+    def list_dates_between(self, start_date: date, end_date: date) -> List[date]:
+        """Dates that have a log within a range (inclusive)."""
+        dates = self.list_dates()
+        return dates[bisect_left(dates, start_date):bisect_right(dates, end_date)]
+
+    def get_range(self, start_date: date, end_date: date) -> List[WorkoutLog]:
+        """All logs within a date range (inclusive)."""
+        logs = []
+        for log_date in self.list_dates_between(start_date, end_date):
+            log = self.get(log_date)
+            if log:
+                logs.append(log)
+        return logs
+
+    def get_json(self, log_date: date) -> Optional[bytes]:
+        """Compact JSON of a validated log, or None; backends may serve it from a cache."""
+        log = self.get(log_date)
+        return log.model_dump_json().encode("utf-8") if log else None
+
+    def get_range_json(self, start_date: date, end_date: date) -> List[bytes]:
+        """Compact JSON of every log within a date range (inclusive)."""
+        encoded = []
+        for log_date in self.list_dates_between(start_date, end_date):
+            data = self.get_json(log_date)
+            if data:
+                encoded.append(data)
+        return encoded
+
+    def cache_info(self) -> dict:
+        """Backend-specific cache counters."""
+        return {}
+
+    def close(self) -> None:
+        """Flush and release any resources."""
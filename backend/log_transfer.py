@@ -0,0 +1,173 @@
+"""Bulk export and import of workout logs as NDJSON."""
+
+import asyncio
+import json
+from datetime import date
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+try:
+    import orjson
+except ImportError:  # optional; export falls back to the json module
+    orjson = None
+
+from models import WorkoutLog, ImportResult, ImportLineError
+from storage import WorkoutStorage
+
+# Export responses are sent in chunks of roughly this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Import lines validated and written per storage call
+IMPORT_BATCH_SIZE = 200
+
+# Per-line errors listed in an import result (all are counted)
+MAX_REPORTED_ERRORS = 1000
+
+
+def compact_json(raw: bytes) -> bytes:
+    """Re-encode a JSON document without whitespace (raises ValueError if unreadable)."""
+    if orjson is not None:
+        return orjson.dumps(orjson.loads(raw))
+    return json.dumps(json.loads(raw), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def export_ndjson(
+    storage: WorkoutStorage,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> Iterator[bytes]:
+    """
+    Yield the logs in a range as NDJSON, one compact log per line.
+
+    Log files are read one at a time and re-encoded without building models
+    (with orjson when it is installed), so memory use doesn't grow with the
+    size of the history.
+    """
+    buffer: List[bytes] = []
+    size = 0
+
+    for log_date, raw in storage.iter_raw_logs(start_date, end_date):
+        try:
+            line = compact_json(raw) + b"\n"
+        except ValueError as e:
+            # Keep the line so the gap is visible (and rejected on import)
+            record = {"date": log_date.isoformat(), "error": f"Unreadable log file: {e}"}
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+        buffer.append(line)
+        size += len(line)
+
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+
+    if buffer:
+        yield b"".join(buffer)
+
+
+class LogImporter:
+    """
+    Validates and writes an NDJSON stream of logs in batches.
+
+    Lines are collected into batches of `batch_size`; each batch is validated
+    and saved in a worker thread with a single `save_logs` call. Invalid lines
+    are reported by line number and don't stop the import. Unless `overwrite`
+    is set, dates that already have a log (or appeared earlier in the stream)
+    are skipped.
+    """
+
+    def __init__(
+        self,
+        storage: WorkoutStorage,
+        dry_run: bool = False,
+        overwrite: bool = False,
+        batch_size: int = IMPORT_BATCH_SIZE
+    ):
+        """Initialize an import into `storage`."""
+        self.storage = storage
+        self.overwrite = overwrite
+        self.batch_size = batch_size
+        self.result = ImportResult(dry_run=dry_run)
+        self._seen_dates: set = set()
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> ImportResult:
+        """Consume the request body and return counts and per-line errors."""
+        if not self.overwrite:
+            self._seen_dates = set(await asyncio.to_thread(self.storage.list_all_dates))
+
+        batch: List[Tuple[int, bytes]] = []
+        line_no = 0
+
+        async for line in _split_lines(chunks):
+            line_no += 1
+            if not line.strip():
+                continue
+
+            batch.append((line_no, line))
+            if len(batch) >= self.batch_size:
+                await asyncio.to_thread(self._process, batch)
+                batch = []
+
+        if batch:
+            await asyncio.to_thread(self._process, batch)
+
+        return self.result
+
+    def _process(self, batch: List[Tuple[int, bytes]]) -> None:
+        """Validate a batch of lines and save the accepted logs."""
+        logs = []
+
+        for line_no, line in batch:
+            try:
+                log = WorkoutLog.model_validate_json(line)
+            except ValidationError as e:
+                self._reject(line_no, _describe(e), _peek_date(line))
+                continue
+
+            if not self.overwrite:
+                if log.date in self._seen_dates:
+                    self.result.skipped += 1
+                    continue
+                self._seen_dates.add(log.date)
+
+            logs.append(log)
+
+        if logs and not self.result.dry_run:
+            self.storage.save_logs(logs)
+        self.result.imported += len(logs)
+
+    def _reject(self, line_no: int, error: str, log_date: Optional[date]) -> None:
+        """Count a failed line, listing it while under the error limit."""
+        self.result.failed += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append(ImportLineError(line=line_no, date=log_date, error=error))
+
+
+async def _split_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Re-split a stream of byte chunks into lines."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+
+    if pending:
+        yield pending
+
+
+def _describe(error: ValidationError) -> str:
+    """One-line summary of a validation error."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'line'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+def _peek_date(line: bytes) -> Optional[date]:
+    """Best-effort date of a rejected line, for the error report."""
+    try:
+        return date.fromisoformat(json.loads(line)["date"])
+    except (ValueError, TypeError, KeyError):
+        return None
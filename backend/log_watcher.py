@@ -0,0 +1,282 @@
+"""Watches data/logs/ for log files changed outside the API."""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from storage import WorkoutStorage, DELETED
+from json_backend import JsonFileBackend, log_file_date
+from instrumentation import counter
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+# struct inotify_event header: wd, mask, cookie, len (the name follows)
+EVENT_HEADER = struct.Struct("iIII")
+
+CHANGES = counter("workout_watcher_changes", "Log files changed outside the API", ["kind"])
+
+FileKey = Tuple[int, int]
+
+
+class Inotify:
+    """The few inotify calls the watcher needs, through ctypes (Linux only)."""
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: Path, mask: int = WATCH_MASK) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout: float) -> List[Tuple[int, int, str]]:
+        """(wd, mask, name) of the events queued within `timeout` seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _Watched:
+    """A storage's logs directory and the file keys last seen in it."""
+
+    def __init__(self, storage: WorkoutStorage):
+        self.storage = storage
+        self.backend: JsonFileBackend = storage.backend
+        self.logs_dir = self.backend.logs_dir
+        self.files: Optional[Dict[date, FileKey]] = None
+        self.pending: Set[date] = set()
+        self.rescan = False
+        self.wd: Optional[int] = None
+
+    def file_key(self, log_date: date) -> Optional[FileKey]:
+        return self.backend._file_key(self.backend.get_log_path(log_date))
+
+    def on_change(self, kind: str, log_date: date, log) -> None:
+        """Storage listener: remember the files the storage writes itself, so they aren't reported back."""
+        if self.files is None:
+            return
+        file_key = None if kind == DELETED else self.file_key(log_date)
+        if file_key:
+            self.files[log_date] = file_key
+        else:
+            self.files.pop(log_date, None)
+
+    def scan(self) -> Dict[date, FileKey]:
+        """(mtime_ns, size) of every log file."""
+        files = {}
+        with os.scandir(self.logs_dir) as entries:
+            for entry in entries:
+                log_date = log_file_date(entry.name)
+                if not log_date:
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files[log_date] = (st.st_mtime_ns, st.st_size)
+        return files
+
+
+class LogWatcher:
+    """
+    Notices log files added, edited or removed outside the API (by hand, by
+    storage_sync.py or by another process) and has their storage reload them,
+    so its caches, summary, search index and rollups stay current and its
+    listeners hear about the change.
+
+    One background thread serves every watched storage. On Linux it waits
+    for inotify events on the logs directories; elsewhere, or if inotify
+    can't be set up, it stats every log file each `interval` seconds. Only
+    JSON file storages are watched; SQLite has no files to edit.
+    """
+
+    def __init__(self, interval: float = 2.0, use_inotify: bool = True):
+        """Initialize (the thread starts with `start`)."""
+        self.interval = interval
+        self._inotify: Optional[Inotify] = None
+        if use_inotify:
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                logger.info("inotify unavailable, polling log files every %ss: %s", interval, e)
+
+        self._watched: Dict[int, _Watched] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify else "polling"
+
+    def watch(self, storage: WorkoutStorage) -> None:
+        """Start watching a storage's logs directory."""
+        if not isinstance(storage.backend, JsonFileBackend):
+            return
+
+        watched = _Watched(storage)
+        with self._lock:
+            if self._inotify:
+                try:
+                    watched.wd = self._inotify.add_watch(watched.logs_dir)
+                except OSError as e:
+                    # e.g. out of watches (fs.inotify.max_user_watches): poll this one
+                    logger.warning("Polling %s: %s", watched.logs_dir, e)
+            storage.add_listener(watched.on_change)
+            self._watched[id(storage)] = watched
+
+    def unwatch(self, storage: WorkoutStorage) -> None:
+        """Stop watching a storage (waits for a check in progress)."""
+        with self._lock:
+            watched = self._watched.pop(id(storage), None)
+            if watched is None:
+                return
+            storage.remove_listener(watched.on_change)
+            if watched.wd is not None:
+                self._inotify.rm_watch(watched.wd)
+
+    def start(self) -> None:
+        """Start the watcher thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the watcher thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, "watched": len(self._watched), "interval": self.interval}
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            polling = True
+            if self._inotify:
+                self._read_events()
+                # Directories without an inotify watch are polled at the usual interval
+                polling = any(watched.wd is None for watched in list(self._watched.values()))
+            else:
+                self._stop.wait(self.interval)
+
+            for key in list(self._watched):
+                with self._lock:
+                    watched = self._watched.get(key)
+                    if watched is None:
+                        continue
+                    try:
+                        self.check(watched, polling)
+                    except Exception:
+                        logger.exception("Checking %s for changes failed", watched.logs_dir)
+
+    def _read_events(self) -> None:
+        """Wait up to `interval` for inotify events and queue the dates they name."""
+        events = self._inotify.read(self.interval)
+        while events:
+            by_wd = {watched.wd: watched for watched in list(self._watched.values()) if watched.wd is not None}
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost: compare every file
+                    for watched in by_wd.values():
+                        watched.rescan = True
+                    continue
+                watched = by_wd.get(wd)
+                log_date = log_file_date(name)
+                if watched and log_date:
+                    watched.pending.add(log_date)
+
+            # Collect a burst (e.g. a sync writing many files) into one reload
+            events = self._inotify.read(0)
+
+    def check(self, watched: _Watched, polling: bool = True) -> List[Tuple[str, date]]:
+        """
+        Reload the logs whose files changed since the last check. The first
+        check only records the files.
+        """
+        if watched.files is None:
+            watched.files = watched.scan()
+            watched.pending.clear()
+            return []
+
+        if (polling and watched.wd is None) or watched.rescan:
+            files = watched.scan()
+            candidates = {d for d, file_key in files.items() if watched.files.get(d) != file_key}
+            candidates.update(set(watched.files) - set(files))
+            watched.rescan = False
+        else:
+            candidates = watched.pending
+        watched.pending = set()
+        if not candidates:
+            return []
+
+        # Compared under the dates' locks, so writes through the storage
+        # (which update `files` while holding them) are never mistaken for edits
+        storage = watched.storage
+        with storage.locks.hold(candidates):
+            changed = []
+            for log_date in sorted(candidates):
+                file_key = watched.file_key(log_date)
+                if watched.files.get(log_date) == file_key:
+                    continue
+                if file_key:
+                    watched.files[log_date] = file_key
+                else:
+                    watched.files.pop(log_date, None)
+                changed.append(log_date)
+
+            changes = storage.reload(changed) if changed else []
+
+        for kind, _ in changes:
+            CHANGES.inc(kind=kind)
+        return changes
@@ -1,24 +1,200 @@
 """FastAPI backend for workout tracking application."""
 
+import asyncio
+import hashlib
+import json
+import logging
+import math
 import os
+from contextlib import aclosing, asynccontextmanager
 from datetime import date, timedelta
+from functools import partial
+from pathlib import Path as FilePath
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, Header, HTTPException, Path, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 
-from models import WorkoutLog, WorkoutLogCreate, AnalysisRequest
-from storage import WorkoutStorage
-from ai_service import ClaudeAnalyzer
+from models import (
+    WorkoutLog, WorkoutLogCreate, WorkoutType, AnalysisRequest, AnalysisJob, BatchAnalysisRequest, ImportResult,
+    SearchHit, SearchResult, ExerciseProgression, JobStatus
+)
+from storage import WorkoutStorage, VersionConflict
+from ai_service import create_analyzer
+from ai_client import AIUnavailableError
+from analysis_cache import AnalysisCache
+from analysis_jobs import AnalysisJobQueue
+from batch_analysis import BatchAnalyzer
+from trends import compute_trends, LOAD_METRICS
+from rollups import AUTO_MONTHLY_AFTER_DAYS, MONTHLY, WEEKLY
+from log_transfer import export_ndjson, LogImporter
+from history_retrieval import HistoryRetriever
+from exercise_metrics import exercise_progression
+from compression import CompressionMiddleware
+from instrumentation import InstrumentationMiddleware, gauge, render as render_metrics
+from tenants import DEFAULT_TENANT, Tenant, TenantMiddleware, TenantRegistry
+from events import EventBroker
+from log_watcher import LogWatcher
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Snapshots taken when /metrics is scraped
+LOG_COUNT = gauge("workout_storage_logs", "Stored logs of the open tenants")
+LOG_CACHE_ENTRIES = gauge("workout_storage_cache_entries", "Entries in the open tenants' log caches")
+OPEN_TENANTS = gauge("workout_tenants_open", "Tenants with their storage open")
+
+DATA_DIR = FilePath(os.getenv("DATA_DIR", "../data"))
+
+# Initialize services
+ai_analyzer = create_analyzer(
+    cache=AnalysisCache(
+        DATA_DIR / "analysis" / "cache",
+        max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 1000)),
+        max_age_days=float(os.getenv("ANALYSIS_CACHE_MAX_AGE_DAYS", 90))
+    )
+)
+
+# Log changes, file edits and finished analyses, streamed by GET /events
+events = EventBroker()
+
+# Picks up log files edited, added or removed outside the API (LOG_WATCH=0 disables)
+log_watcher = LogWatcher(
+    interval=float(os.getenv("LOG_WATCH_INTERVAL", 2))
+) if os.getenv("LOG_WATCH", "1") == "1" else None
+
+
+def open_tenant(tenant_id: str, data_dir: FilePath) -> Tenant:
+    """Open a tenant's storage and the services built on it."""
+    storage = WorkoutStorage(
+        data_dir=data_dir,
+        cache_size=int(os.getenv("LOG_CACHE_SIZE", 256)),
+        durability=os.getenv("STORAGE_DURABILITY", "atomic"),
+        backend=os.getenv("STORAGE_BACKEND", "json")
+    )
+    storage.add_listener(events.storage_listener(tenant_id))
+    if log_watcher:
+        log_watcher.watch(storage)
+
+    # Recent window plus older logs relevant to the analysed one, within a token budget
+    history_retriever = HistoryRetriever(
+        storage,
+        max_related=int(os.getenv("ANALYSIS_RELATED_LOGS", 8)),
+        token_budget=int(os.getenv("ANALYSIS_HISTORY_TOKENS", 1500))
+    )
+
+    batch_analyzer = BatchAnalyzer(
+        storage,
+        ai_analyzer,
+        concurrency=int(os.getenv("BATCH_CONCURRENCY", 4)),
+        requests_per_minute=float(os.getenv("BATCH_REQUESTS_PER_MINUTE", 50)),
+        retriever=history_retriever
+    )
+
+    return Tenant(
+        tenant_id,
+        storage,
+        history_retriever,
+        batch_analyzer,
+        on_close=partial(log_watcher.unwatch, storage) if log_watcher else None
+    )
+
+
+# Requests pick a tenant with X-Tenant-ID (MULTI_TENANT=1); without it they
+# use the default tenant, stored directly in DATA_DIR
+tenants = TenantRegistry(
+    DATA_DIR,
+    open_tenant,
+    max_open=int(os.getenv("TENANT_MAX_OPEN", 64)),
+    idle_seconds=float(os.getenv("TENANT_IDLE_SECONDS", 900)),
+    multi_tenant=os.getenv("MULTI_TENANT") == "1"
+)
+
+
+def publish_analysis(tenant_id: str, log_date: date, status: JobStatus, **fields) -> None:
+    """Announce a finished analysis on the tenant's change feed."""
+    events.publish(tenant_id, "analysis", {"date": log_date.isoformat(), "status": status.value, **fields})
+
+
+def _job_finished(tenant_id: str, job: AnalysisJob) -> None:
+    fields = {"model": job.result.model} if job.result else {"error": job.error}
+    publish_analysis(tenant_id, job.log_date, job.status, job_id=job.id, **fields)
+
+
+analysis_jobs = AnalysisJobQueue(
+    ai_analyzer,
+    concurrency=int(os.getenv("ANALYSIS_CONCURRENCY", 2)),
+    on_finished=_job_finished
+)
+
+
+def current_tenant(
+    request: Request,
+    x_tenant_id: Optional[str] = Header(None, description="Tenant (athlete) the request is for")
+) -> Tenant:
+    """The tenant named by X-Tenant-ID, held open until the response has been sent."""
+    tenant = getattr(request.state, "tenant", None)
+    if tenant is None:
+        try:
+            tenant_id = tenants.validate(x_tenant_id)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        tenant = request.state.tenant = tenants.acquire(tenant_id)
+    return tenant
+
+
+async def tenant_storage(tenant: Tenant = Depends(current_tenant)) -> WorkoutStorage:
+    """Storage of the request's tenant."""
+    return tenant.storage
+
+
+async def warm_up() -> None:
+    """Load indexes, recent logs and the Claude SDK without holding up startup."""
+    try:
+        tenant = await asyncio.to_thread(tenants.acquire, DEFAULT_TENANT)
+        try:
+            await asyncio.to_thread(tenant.storage.warm_up)
+        finally:
+            tenant.release()
+        await asyncio.to_thread(ai_analyzer.warm_up)
+    except Exception:
+        # Whatever failed here is retried by the first request that needs it
+        logger.exception("Warm-up failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers with the app."""
+    events.start()
+    await analysis_jobs.start()
+    if log_watcher:
+        log_watcher.start()
+
+    # Runs while the server already accepts requests
+    warm_up_task = asyncio.create_task(warm_up()) if os.getenv("STARTUP_WARMUP", "1") == "1" else None
+
+    yield
+
+    if warm_up_task:
+        await warm_up_task
+    await analysis_jobs.stop()
+    if log_watcher:
+        log_watcher.stop()
+    tenants.close()
+    if log_watcher:
+        log_watcher.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Workout Tracker API",
     description="Simple workout tracking with AI analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend
@@ -28,16 +204,78 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-# Initialize services
-storage = WorkoutStorage(data_dir=os.getenv("DATA_DIR", "../data"))
-ai_analyzer = ClaudeAnalyzer(
-    api_key=os.getenv("ANTHROPIC_API_KEY"),
-    model=os.getenv("CLAUDE_MODEL", "claude-sonnet-4-20250514")
+# Compress large (non-streamed) responses
+app.add_middleware(CompressionMiddleware)
+
+# Release each request's tenant after its response, streamed or not
+app.add_middleware(TenantMiddleware)
+
+# Per-route timings for /metrics; with PROFILE_REQUESTS=1, requests sent with
+# `X-Profile: 1` also write a trace to data/profiles/
+app.add_middleware(
+    InstrumentationMiddleware,
+    profile_dir=DATA_DIR / "profiles" if os.getenv("PROFILE_REQUESTS") == "1" else None
 )
 
 
+def _content_hash(body: bytes) -> str:
+    """Short hash of a response body."""
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def _etag(log: WorkoutLog, body: Optional[bytes] = None) -> str:
+    """Strong ETag for a log: a hash of its JSON, so hand edits change it too."""
+    if body is None:
+        body = log.model_dump_json().encode("utf-8")
+    return f'"{_content_hash(body)}"'
+
+
+def _entity_tags(header: str) -> Optional[List[str]]:
+    """Unquoted tags listed in an If-Match/If-None-Match header (None for `*`, i.e. any)."""
+    if header.strip() == "*":
+        return None
+    return [tag.strip().removeprefix("W/").strip('"') for tag in header.split(",") if tag.strip()]
+
+
+def _if_match(if_match: str, log: WorkoutLog, etag: str) -> bool:
+    """Whether an If-Match header matches a log's current ETag (or, bare, its version)."""
+    tags = _entity_tags(if_match)
+    return tags is None or etag.strip('"') in tags or str(log.metadata.version) in tags
+
+
+def _json_response(request: Request, body: bytes, etag: Optional[str] = None) -> Response:
+    """
+    A JSON body with a strong ETag (its hash unless given), or an empty 304
+    if the client's If-None-Match already names it.
+    """
+    etag = etag or f'"{_content_hash(body)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = _entity_tags(if_none_match)
+        if tags is None or etag.strip('"') in tags:
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _ai_unavailable(error: AIUnavailableError) -> HTTPException:
+    """503 for an analysis Claude couldn't answer within its retry budget."""
+    headers = {"Retry-After": str(math.ceil(error.retry_after))} if error.retry_after is not None else None
+    return HTTPException(503, f"AI analysis unavailable: {error}", headers=headers)
+
+
+def _encode(data) -> bytes:
+    """Encode a response value the way FastAPI's JSONResponse would."""
+    return json.dumps(
+        jsonable_encoder(data), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
 @app.get("/")
 def root():
     """Health check endpoint."""
@@ -49,74 +287,163 @@ def root():
 
 
 @app.post("/logs", response_model=WorkoutLog, status_code=201)
-def create_log(log_data: WorkoutLogCreate):
+def create_log(log_data: WorkoutLogCreate, response: Response, storage: WorkoutStorage = Depends(tenant_storage)):
     """Create a new workout log."""
-    # Check if log already exists for this date
-    existing_log = storage.get_log(log_data.date)
-    if existing_log:
+    log = WorkoutLog(**log_data.model_dump())
+
+    # Only written if no log exists for this date (checked under the date's lock)
+    try:
+        storage.save_log(log, expected_version=0)
+    except VersionConflict:
         raise HTTPException(
             status_code=409,
             detail=f"Log already exists for {log_data.date}. Use PUT to update."
         )
 
-    # Create new log
-    log = WorkoutLog(**log_data.model_dump())
-    storage.save_log(log)
-
+    response.headers["ETag"] = _etag(log)
     return log
 
 
 @app.get("/logs", response_model=List[WorkoutLog])
 def get_logs(
+    request: Request,
     start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
-    days: Optional[int] = Query(7, ge=1, le=90, description="Recent days to fetch")
+    days: Optional[int] = Query(7, ge=1, le=90, description="Recent days to fetch"),
+    workout_type: Optional[WorkoutType] = Query(None, description="Only this workout type"),
+    body_area: Optional[str] = Query(None, description="Only logs with pain/tightness in this area"),
+    min_fatigue: Optional[int] = Query(None, ge=1, le=10, description="Only logs with at least this fatigue"),
+    storage: WorkoutStorage = Depends(tenant_storage)
 ):
     """
     Get workout logs.
 
     - If start_date and end_date provided: return logs in range
     - Otherwise: return recent N days
+    - Optional filters narrow either selection
+
+    The ETag is a hash of the body; send it back as `If-None-Match` to get
+    an empty 304 while nothing in the selection has changed.
     """
     if start_date and end_date:
         if start_date > end_date:
             raise HTTPException(400, "start_date must be before end_date")
-        logs = storage.get_logs_range(start_date, end_date)
     else:
-        logs = storage.get_recent_logs(days)
+        end_date = date.today()
+        start_date = end_date - timedelta(days=days - 1)
 
-    return logs
+    # Logs are already validated; send their cached JSON as the body instead
+    # of re-validating and re-encoding every log through response_model
+    if workout_type or body_area or min_fatigue is not None:
+        content = storage.find_logs_json(start_date, end_date, workout_type, body_area, min_fatigue)
+    else:
+        content = storage.get_logs_range_json(start_date, end_date)
 
+    return _json_response(request, content)
 
-@app.get("/logs/{log_date}", response_model=WorkoutLog)
-def get_log(log_date: date):
-    """Get a specific workout log by date."""
-    log = storage.get_log(log_date)
 
-    if not log:
-        raise HTTPException(404, f"No log found for {log_date}")
+@app.get("/logs/dates", response_model=List[date])
+def list_log_dates(request: Request, storage: WorkoutStorage = Depends(tenant_storage)):
+    """List all dates that have logs (304 for a matching If-None-Match)."""
+    return _json_response(request, _encode(storage.list_all_dates()))
 
-    return log
 
+@app.get("/logs/export")
+def export_logs(
+    start_date: Optional[date] = Query(None, description="First date (default: first log)"),
+    end_date: Optional[date] = Query(None, description="Last date (default: last log)"),
+    storage: WorkoutStorage = Depends(tenant_storage)
+):
+    """
+    Export logs as NDJSON, one log per line.
 
-@app.put("/logs/{log_date}", response_model=WorkoutLog)
-def update_log(log_date: date, log_data: WorkoutLogCreate):
-    """Update an existing workout log."""
-    existing_log = storage.get_log(log_date)
+    The response is streamed straight from the log files, so any length of
+    history can be exported. The output can be fed back to POST /logs/import.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(400, "start_date must be before end_date")
+
+    return StreamingResponse(
+        export_ndjson(storage, start_date, end_date),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="workout-logs.ndjson"'}
+    )
+
+
+@app.post("/logs/import", response_model=ImportResult)
+async def import_logs(
+    request: Request,
+    dry_run: bool = Query(False, description="Validate only, don't write anything"),
+    overwrite: bool = Query(False, description="Replace logs that already exist"),
+    storage: WorkoutStorage = Depends(tenant_storage)
+):
+    """
+    Import logs from an NDJSON request body (one log per line).
+
+    Lines are validated and written in batches as the body arrives. Invalid
+    lines are reported by line number and the rest are still imported.
+    """
+    importer = LogImporter(storage, dry_run=dry_run, overwrite=overwrite)
+    return await importer.run(request.stream())
 
-    if not existing_log:
+
+@app.get("/logs/{log_date}", response_model=WorkoutLog)
+def get_log(log_date: date, request: Request, storage: WorkoutStorage = Depends(tenant_storage)):
+    """
+    Get a specific workout log by date.
+
+    The ETag can be sent back as `If-None-Match` (304 while unchanged) or as
+    `If-Match` on PUT.
+    """
+    body = storage.get_log_json(log_date)
+
+    if body is None:
         raise HTTPException(404, f"No log found for {log_date}")
 
-    # Update with new data
-    updated_log = WorkoutLog(**log_data.model_dump())
-    updated_log.metadata = existing_log.metadata  # Preserve original metadata
-    storage.save_log(updated_log)
+    return _json_response(request, body)
+
+
+@app.put("/logs/{log_date}", response_model=WorkoutLog)
+def update_log(
+    log_date: date,
+    log_data: WorkoutLogCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag the update is based on"),
+    storage: WorkoutStorage = Depends(tenant_storage)
+):
+    """
+    Update an existing workout log.
 
+    Send the ETag from GET /logs/{date} as `If-Match` to make the update
+    conditional: if the log has changed since, nothing is written and 412 is
+    returned with the current ETag.
+    """
+    with storage.lock(log_date):
+        existing_log = storage.get_log(log_date)
+
+        if not existing_log:
+            raise HTTPException(404, f"No log found for {log_date}")
+
+        if if_match is not None:
+            etag = _etag(existing_log, storage.get_log_json(log_date))
+            if not _if_match(if_match, existing_log, etag):
+                raise HTTPException(
+                    status_code=412,
+                    detail=f"Log for {log_date} has changed (now version {existing_log.metadata.version})",
+                    headers={"ETag": etag}
+                )
+
+        # Update with new data
+        updated_log = WorkoutLog(**log_data.model_dump())
+        updated_log.metadata = existing_log.metadata  # Preserve original metadata
+        storage.save_log(updated_log)
+
+    response.headers["ETag"] = _etag(updated_log)
     return updated_log
 
 
 @app.delete("/logs/{log_date}", status_code=204)
-def delete_log(log_date: date):
+def delete_log(log_date: date, storage: WorkoutStorage = Depends(tenant_storage)):
     """Delete a workout log."""
     deleted = storage.delete_log(log_date)
 
@@ -126,82 +453,414 @@ def delete_log(log_date: date):
     return None
 
 
-@app.get("/logs/dates", response_model=List[date])
-def list_log_dates():
-    """List all dates that have logs."""
-    return storage.list_all_dates()
+@app.get("/analysis/jobs/{job_id}", response_model=AnalysisJob)
+def get_analysis_job(job_id: str, tenant: Tenant = Depends(current_tenant)):
+    """Get the status (and result, once finished) of a background analysis."""
+    job = analysis_jobs.get(job_id, tenant.id)
+
+    if not job:
+        raise HTTPException(404, f"No analysis job {job_id}")
+
+    return job
+
+
+@app.post("/analysis/batch")
+async def analyze_batch(request: BatchAnalysisRequest, tenant: Tenant = Depends(current_tenant)):
+    """
+    Re-analyse a range of logs, streaming one NDJSON line per date.
+
+    By default only logs with a missing analysis, or one produced by another
+    model or prompt version, are analysed. An interrupted batch resumes where
+    it left off when re-run with the same parameters.
+    """
+    if request.start_date and request.end_date and request.start_date > request.end_date:
+        raise HTTPException(400, "start_date must be before end_date")
+
+    async def results():
+        # Closed even if the client disconnects mid-batch, so its analyses are cancelled
+        async with aclosing(tenant.batch_analyzer.run(
+            start_date=request.start_date,
+            end_date=request.end_date,
+            include_history_days=request.include_history_days,
+            only_outdated=request.only_outdated,
+            refresh=request.refresh
+        )) as batch:
+            async for result in batch:
+                yield json.dumps(result) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _sse(event: str, data) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/analysis/{log_date}/stream")
+async def analyze_workout_stream(
+    log_date: date,
+    include_history_days: int = Query(7, ge=1, le=30),
+    refresh: bool = Query(False, description="Bypass the analysis cache and always call Claude"),
+    tenant: Tenant = Depends(current_tenant)
+):
+    """
+    Analyze a workout log, streaming the result as server-sent events.
+
+    Events:
+    - `insight`: `{"text": ...}` human insight text as Claude writes it
+    - `context`: machine context fields as soon as their values are complete
+    - `done`: the saved WorkoutLog once the full response has been validated
+    - `error`: `{"detail": ...}` if the analysis failed
+    """
+    storage = tenant.storage
+    log = await asyncio.to_thread(storage.get_log, log_date)
+    if not log:
+        raise HTTPException(404, f"No log found for {log_date}")
+
+    history_logs, related_logs = await asyncio.to_thread(
+        tenant.history_retriever.select, log, include_history_days
+    )
+
+    async def events():
+        try:
+            async for kind, payload in ai_analyzer.stream_analysis(
+                log, history_logs, use_cache=not refresh, related_logs=related_logs
+            ):
+                if kind == "insight":
+                    yield _sse("insight", {"text": payload})
+                elif kind == "context":
+                    yield _sse("context", payload)
+                else:
+                    saved = await asyncio.to_thread(
+                        storage.attach_analysis, log_date, payload, log.metadata.version
+                    )
+                    if not saved:
+                        yield _sse("error", {"detail": f"Log for {log_date} was deleted during analysis"})
+                        return
+                    publish_analysis(tenant.id, log_date, JobStatus.SUCCEEDED, model=payload.model)
+                    yield _sse("done", saved.model_dump(mode="json"))
+
+        except Exception as e:
+            publish_analysis(tenant.id, log_date, JobStatus.FAILED, error=str(e))
+            yield _sse("error", {"detail": f"AI analysis failed: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.post("/analysis/{log_date}", response_model=WorkoutLog)
-def analyze_workout(log_date: date, include_history_days: int = Query(7, ge=1, le=30)):
+def analyze_workout(
+    log_date: date,
+    include_history_days: int = Query(7, ge=1, le=30),
+    background: bool = Query(False, description="Queue the analysis and return a job instead of waiting"),
+    refresh: bool = Query(False, description="Bypass the analysis cache and always call Claude"),
+    tenant: Tenant = Depends(current_tenant)
+):
     """
     Analyze a workout log using Claude AI.
 
     This will:
     1. Get the specified log
-    2. Get recent history for context
+    2. Get recent history and older related logs for context
     3. Send to Claude for analysis
     4. Save the analysis back to the log
+
+    With `background=true` the analysis is queued and a 202 response with the
+    job is returned immediately; poll GET /analysis/jobs/{job_id} for the result.
+
+    Identical requests (same log, history, model and prompt) are answered from
+    the analysis cache unless `refresh=true`.
     """
     # Get the target log
+    storage = tenant.storage
     log = storage.get_log(log_date)
     if not log:
         raise HTTPException(404, f"No log found for {log_date}")
 
+    if background:
+        job = analysis_jobs.submit(tenant, log_date, include_history_days, refresh)
+        return JSONResponse(status_code=202, content=job.model_dump(mode="json"))
+
     # Get historical context
-    end_date = log_date - timedelta(days=1)  # Exclude current day
-    start_date = end_date - timedelta(days=include_history_days - 1)
-    history_logs = storage.get_logs_range(start_date, end_date)
+    history_logs, related_logs = tenant.history_retriever.select(log, include_history_days)
 
     # Analyze with Claude
     try:
-        analysis = ai_analyzer.analyze_workout(log, history_logs)
-        log.ai_analysis = analysis
+        analysis = ai_analyzer.analyze_workout(
+            log, history_logs, use_cache=not refresh, related_logs=related_logs
+        )
+
+        # Merge onto the latest version of the log
+        saved = storage.attach_analysis(log_date, analysis, log.metadata.version)
+        if not saved:
+            raise HTTPException(404, f"Log for {log_date} was deleted during analysis")
+
+        publish_analysis(tenant.id, log_date, JobStatus.SUCCEEDED, model=analysis.model)
+        return saved
 
-        # Save updated log
-        storage.save_log(log)
+    except HTTPException:
+        raise
 
-        return log
+    except AIUnavailableError as e:
+        publish_analysis(tenant.id, log_date, JobStatus.FAILED, error=str(e))
+        raise _ai_unavailable(e)
 
     except Exception as e:
+        publish_analysis(tenant.id, log_date, JobStatus.FAILED, error=str(e))
         raise HTTPException(500, f"AI analysis failed: {str(e)}")
 
 
+@app.get("/events")
+async def change_events(
+    request: Request,
+    tenant_id: Optional[str] = Query(
+        None, alias="tenant", description="Tenant, for clients that can't send X-Tenant-ID (EventSource)"
+    ),
+    x_tenant_id: Optional[str] = Header(None, description="Tenant (athlete) the request is for"),
+    last_event_id: Optional[str] = Header(None, description="Resume after this event (sent by EventSource on reconnect)")
+):
+    """
+    Stream changes to the tenant's logs as server-sent events.
+
+    Events:
+    - `log`: `{"date", "version", "source"}` a log was created or updated,
+      through the API (`source: "api"`) or by editing its file (`"file"`)
+    - `deleted`: `{"date", "source"}` a log was deleted
+    - `analysis`: `{"date", "status", ...}` an analysis finished
+      (`succeeded` with its `model`, or `failed` with an `error`)
+    - `reset`: events were missed; reload everything
+
+    Events carry ids; EventSource sends the last one back as
+    `Last-Event-ID` when it reconnects and receives what it missed. The
+    tenant stays open while a stream is connected.
+    """
+    # Opening a tenant reads from disk, so not on the event loop
+    tenant = await asyncio.to_thread(current_tenant, request, x_tenant_id or tenant_id)
+
+    return StreamingResponse(
+        events.stream(tenant.id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/search", response_model=SearchResult)
+def search_logs(
+    q: Optional[str] = Query(None, description="Words to find; `word*` matches a prefix"),
+    body_area: Optional[str] = Query(None, description="Only logs with this area in pain_or_tightness.body_areas"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    limit: int = Query(20, ge=1, le=200, description="Maximum logs to return"),
+    storage: WorkoutStorage = Depends(tenant_storage)
+):
+    """
+    Search reflections, exercise notes, pain descriptions, body areas and AI
+    problem areas.
+
+    Logs must contain every word of `q` and are ranked by relevance, body
+    areas weighing most. With only `body_area`, matches are returned newest
+    first.
+    """
+    if not q and not body_area:
+        raise HTTPException(400, "q or body_area is required")
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(400, "start_date must be before end_date")
+
+    total, hits = storage.get_search_index().search(q or None, body_area, start_date, end_date, limit)
+    return SearchResult(
+        total=total,
+        hits=[
+            SearchHit(date=log_date, score=score, fields=fields, log=storage.get_log(log_date))
+            for log_date, score, fields in hits
+        ]
+    )
+
+
+@app.get("/progression")
+def list_progression_exercises(storage: WorkoutStorage = Depends(tenant_storage)):
+    """List logged exercises (normalised names) with their session count and last date."""
+    counts = storage.get_search_index().exercise_counts()
+    return [
+        {"exercise": name, "sessions": sessions, "last_date": last_date}
+        for name, (sessions, last_date) in sorted(counts.items(), key=lambda item: -item[1][0])
+    ]
+
+
+@app.get("/progression/{exercise}", response_model=ExerciseProgression)
+def get_exercise_progression(
+    exercise: str,
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    storage: WorkoutStorage = Depends(tenant_storage)
+):
+    """
+    Get the per-session progression of an exercise: top set, volume and
+    estimated 1RM in kg.
+
+    Values come from the metrics stored with each log when it was saved, and
+    only logs containing the exercise are read.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(400, "start_date must be before end_date")
+
+    progression = exercise_progression(exercise, storage.find_exercise_logs(exercise, start_date, end_date))
+    if not progression.sessions:
+        raise HTTPException(404, f"No sessions found for {exercise}")
+    return progression
+
+
 @app.get("/stats/summary")
-def get_summary_stats():
-    """Get summary statistics across all logs."""
-    all_dates = storage.list_all_dates()
+def get_summary_stats(request: Request, storage: WorkoutStorage = Depends(tenant_storage)):
+    """Get summary statistics across all logs (304 for a matching If-None-Match)."""
+    return _json_response(request, _encode(storage.get_summary().summary()))
+
 
-    if not all_dates:
-        return {
-            "total_logs": 0,
-            "date_range": None,
-            "workout_types": {}
-        }
+@app.get("/stats/trends")
+def get_trends(
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD), defaults to first log"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD), defaults to today"),
+    load_metric: str = Query("effort", pattern=f"^({'|'.join(LOAD_METRICS)})$", description="Per-session load used for ACWR"),
+    storage: WorkoutStorage = Depends(tenant_storage)
+):
+    """
+    Get training trends over a date range.
+
+    Returns weekly/monthly volume and running totals, pace per run with a
+    rolling average and linear trend, daily load with 7/28-day acute:chronic
+    workload ratio, a 7-day fatigue moving average and pain frequency per
+    body area.
+    """
+    summary = storage.get_summary()
+    end_date = end_date or date.today()
+    if start_date is None:
+        date_range = summary.summary()["date_range"]
+        start_date = date_range["first"] if date_range else end_date
+
+    if start_date > end_date:
+        raise HTTPException(400, "start_date must be before end_date")
+
+    return compute_trends(summary, start_date, end_date, load_metric)
+
+
+@app.get("/rollups")
+def get_rollups(
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD), defaults to first log"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD), defaults to today"),
+    period: str = Query("auto", pattern="^(auto|weekly|monthly)$", description="Rollup granularity"),
+    storage: WorkoutStorage = Depends(tenant_storage)
+):
+    """
+    Get weekly or monthly rollups over a date range.
+
+    Long ranges are cheaper to answer from rollups than from daily logs. With
+    `period=auto`, ranges up to ~3 months return weekly rollups and longer
+    ranges return monthly ones.
+    """
+    end_date = end_date or date.today()
+    if start_date is None:
+        date_range = storage.get_summary().summary()["date_range"]
+        start_date = date_range["first"] if date_range else end_date
 
-    # Get all logs
-    logs = storage.get_logs_range(min(all_dates), max(all_dates))
+    if start_date > end_date:
+        raise HTTPException(400, "start_date must be before end_date")
 
-    # Calculate stats
-    workout_types = {}
-    for log in logs:
-        workout_types[log.workout_type] = workout_types.get(log.workout_type, 0) + 1
+    if period == "auto":
+        period = MONTHLY if (end_date - start_date).days > AUTO_MONTHLY_AFTER_DAYS else WEEKLY
 
+    return storage.rollups.get_range(period, start_date, end_date)
+
+
+@app.get("/rollups/{kind}/{period}")
+def get_rollup(
+    kind: str = Path(..., pattern="^(weekly|monthly)$"),
+    period: str = Path(..., pattern=r"^\d{4}-(W\d{2}|\d{2})$", description="YYYY-WNN or YYYY-MM"),
+    storage: WorkoutStorage = Depends(tenant_storage)
+):
+    """Get a single weekly or monthly rollup."""
+    try:
+        rollup = storage.rollups.get(kind, period)
+    except ValueError:
+        raise HTTPException(400, f"Invalid {kind} period {period}")
+
+    if not rollup:
+        raise HTTPException(404, f"No logs in {kind} period {period}")
+
+    return rollup
+
+
+@app.post("/rollups/{kind}/{period}/analysis")
+def analyze_rollup(
+    kind: str = Path(..., pattern="^(weekly|monthly)$"),
+    period: str = Path(..., pattern=r"^\d{4}-(W\d{2}|\d{2})$", description="YYYY-WNN or YYYY-MM"),
+    refresh: bool = Query(False, description="Bypass the analysis cache and always call Claude"),
+    storage: WorkoutStorage = Depends(tenant_storage)
+):
+    """Summarise a weekly or monthly rollup with Claude and store it with the rollup."""
+    rollup = get_rollup(kind, period, storage)
+    logs = storage.get_logs_range(
+        date.fromisoformat(rollup["start_date"]),
+        date.fromisoformat(rollup["end_date"])
+    )
+
+    try:
+        analysis = ai_analyzer.analyze_period(rollup, logs, use_cache=not refresh)
+    except AIUnavailableError as e:
+        raise _ai_unavailable(e)
+    except Exception as e:
+        raise HTTPException(500, f"AI analysis failed: {str(e)}")
+
+    return storage.rollups.attach_analysis(kind, period, analysis)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Request timings, storage I/O and Claude call metrics in the Prometheus text format."""
+    open_tenants = tenants.open_tenants()
+    OPEN_TENANTS.set(len(open_tenants))
+    LOG_COUNT.set(sum(len(tenant.storage.list_all_dates()) for tenant in open_tenants))
+    LOG_CACHE_ENTRIES.set(sum(tenant.storage.cache_info().get("size", 0) for tenant in open_tenants))
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/stats/cache")
+def get_cache_stats(storage: WorkoutStorage = Depends(tenant_storage)):
+    """Get the tenant's parsed-log cache size and hit/miss counters, open tenants, and the change feed."""
     return {
-        "total_logs": len(logs),
-        "date_range": {
-            "first": min(all_dates),
-            "last": max(all_dates)
-        },
-        "workout_types": workout_types
+        **storage.cache_info(),
+        "tenants": tenants.info(),
+        "watcher": log_watcher.info() if log_watcher else None,
+        "events": events.info(),
     }
 
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run(
-        "main:app",
-        host=os.getenv("HOST", "0.0.0.0"),
-        port=int(os.getenv("PORT", 8000)),
-        reload=True
+
+    parser = argparse.ArgumentParser(description="Run the Workout Tracker API")
+    parser.add_argument(
+        "--prod",
+        action="store_true",
+        help="Production mode: no reloader or access log (also APP_ENV=production)"
     )
+    args = parser.parse_args()
+
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", 8000))
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+
+    if args.prod or os.getenv("APP_ENV") == "production":
+        # A single worker serves this already-imported app instead of importing main again
+        uvicorn.run(
+            app if workers == 1 else "main:app",
+            host=host,
+            port=port,
+            workers=workers,
+            access_log=False,
+            proxy_headers=True
+        )
+    else:
+        uvicorn.run("main:app", host=host, port=port, reload=True)
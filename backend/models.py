@@ -1,5 +1,6 @@
 """Pydantic models for workout tracking."""
 
+import datetime as dt
 from datetime import date, datetime
 from enum import Enum
 from typing import Optional, List
@@ -27,6 +28,17 @@ class PainSeverity(str, Enum):
     SEVERE = "severe"
 
 
+class ImplementType(str, Enum):
+    """Equipment an exercise load refers to."""
+    BARBELL = "barbell"
+    DUMBBELL = "dumbbell"
+    KETTLEBELL = "kettlebell"
+    MACHINE = "machine"
+    CABLE = "cable"
+    BAND = "band"
+    BODYWEIGHT = "bodyweight"
+
+
 class Exercise(BaseModel):
     """Individual exercise within a workout."""
     name: str = Field(..., description="Exercise name")
@@ -63,22 +75,53 @@ class MachineContext(BaseModel):
     confidence_score: Optional[float] = Field(None, ge=0, le=1, description="AI confidence (0-1)")
 
 
+class TokenUsage(BaseModel):
+    """Token counts reported by Claude for one analysis call."""
+    input_tokens: int = Field(0, description="Uncached input tokens")
+    cache_creation_input_tokens: int = Field(0, description="Input tokens written to the prompt cache")
+    cache_read_input_tokens: int = Field(0, description="Input tokens served from the prompt cache")
+    output_tokens: int = Field(0, description="Generated tokens")
+
+
 class AIAnalysis(BaseModel):
     """AI-generated analysis results."""
     human_insight: str = Field(..., description="Natural language feedback")
     machine_context: MachineContext = Field(..., description="Structured context")
     analyzed_at: datetime = Field(default_factory=datetime.utcnow, description="Analysis timestamp")
+    model: Optional[str] = Field(None, description="Claude model that produced the analysis")
+    prompt_version: Optional[str] = Field(None, description="Analysis prompt version")
+    usage: Optional[TokenUsage] = Field(None, description="Token counts of the call that produced it")
+    log_version: Optional[int] = Field(None, description="Log version the analysis reflects")
+
+
+class ExerciseMetrics(BaseModel):
+    """Numbers derived from one exercise's free-text load."""
+    name: str = Field(..., description="Exercise name as logged")
+    implement: Optional[ImplementType] = Field(None, description="Equipment, if the load or name says")
+    bodyweight: bool = Field(False, description="Load is bodyweight (top_set_kg is then the added load)")
+    top_set_kg: Optional[float] = Field(None, description="Heaviest load lifted per rep, all implements together")
+    volume_kg: Optional[float] = Field(None, description="Sets x reps x load")
+    estimated_1rm_kg: Optional[float] = Field(None, description="Epley one-rep max estimate (up to 12 reps)")
+
+
+class LogMetrics(BaseModel):
+    """Strength metrics computed when a log is saved."""
+    version: int = Field(..., description="Load parser version that produced them")
+    total_volume_kg: float = Field(0, description="Sum of exercise volumes")
+    exercises: List[ExerciseMetrics] = Field(default_factory=list, description="Per exercise, in log order")
 
 
 class Metadata(BaseModel):
     """Log metadata."""
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Creation timestamp")
     updated_at: datetime = Field(default_factory=datetime.utcnow, description="Update timestamp")
+    version: int = Field(1, ge=1, description="Incremented on every save (used as the ETag)")
 
 
 class WorkoutLog(BaseModel):
     """Complete daily workout log."""
-    date: date = Field(..., description="Workout date (YYYY-MM-DD)")
+    # dt.date: a bare `date` annotation would resolve to this field's own default
+    date: dt.date = Field(..., description="Workout date (YYYY-MM-DD)")
     workout_type: WorkoutType = Field(..., description="Type of workout")
     exercises: Optional[List[Exercise]] = Field(default_factory=list, description="Exercises performed")
     running_data: Optional[RunningData] = Field(None, description="Running metrics")
@@ -87,6 +130,7 @@ class WorkoutLog(BaseModel):
     pain_or_tightness: Optional[PainOrTightness] = Field(None, description="Physical discomfort")
     free_text_reflection: Optional[str] = Field(None, description="User's raw thoughts")
     ai_analysis: Optional[AIAnalysis] = Field(None, description="AI analysis results")
+    metrics: Optional[LogMetrics] = Field(None, description="Derived from exercises on save")
     metadata: Metadata = Field(default_factory=Metadata, description="Log metadata")
 
     class Config:
@@ -110,5 +154,87 @@ class WorkoutLogCreate(BaseModel):
 
 class AnalysisRequest(BaseModel):
     """Request for AI analysis."""
-    date: date = Field(..., description="Date to analyze")
+    date: dt.date = Field(..., description="Date to analyze")
+    include_history_days: int = Field(7, ge=1, le=30, description="Days of history to include")
+
+
+class BatchAnalysisRequest(BaseModel):
+    """Request for re-analysing a range of logs."""
+    start_date: Optional[date] = Field(None, description="First date to analyze (default: first log)")
+    end_date: Optional[date] = Field(None, description="Last date to analyze (default: last log)")
+    include_history_days: int = Field(7, ge=1, le=30, description="Days of history to include")
+    only_outdated: bool = Field(True, description="Skip logs already analyzed with the current model and prompt")
+    refresh: bool = Field(False, description="Bypass the analysis cache")
+
+
+class JobStatus(str, Enum):
+    """Lifecycle of a background analysis job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class AnalysisJob(BaseModel):
+    """Background AI analysis job."""
+    id: str = Field(..., description="Job identifier")
+    log_date: date = Field(..., description="Date of the log being analyzed")
     include_history_days: int = Field(7, ge=1, le=30, description="Days of history to include")
+    refresh: bool = Field(False, description="Bypass the analysis cache")
+    status: JobStatus = Field(JobStatus.QUEUED, description="Current job status")
+    created_at: datetime = Field(default_factory=datetime.utcnow, description="Submission timestamp")
+    started_at: Optional[datetime] = Field(None, description="When a worker picked the job up")
+    finished_at: Optional[datetime] = Field(None, description="When the job succeeded or failed")
+    error: Optional[str] = Field(None, description="Failure reason")
+    result: Optional[AIAnalysis] = Field(None, description="Analysis saved to the log")
+
+
+class ImportLineError(BaseModel):
+    """A rejected line in an NDJSON import."""
+    line: int = Field(..., description="1-based line number")
+    date: Optional[dt.date] = Field(None, description="Log date, if it could be read")
+    error: str = Field(..., description="Why the line was rejected")
+
+
+class ImportResult(BaseModel):
+    """Outcome of an NDJSON import."""
+    dry_run: bool = Field(..., description="Whether logs were only validated, not written")
+    imported: int = Field(0, description="Logs written (or that would be, in a dry run)")
+    skipped: int = Field(0, description="Logs not written because the date already has one")
+    failed: int = Field(0, description="Lines that could not be parsed or validated")
+    errors: List[ImportLineError] = Field(default_factory=list, description="Per-line errors (first 1000)")
+
+
+class SearchHit(BaseModel):
+    """A log matching a search."""
+    date: dt.date = Field(..., description="Log date")
+    score: float = Field(..., description="Relevance (BM25); 0 for searches without a query")
+    fields: List[str] = Field(default_factory=list, description="Fields the query matched")
+    log: Optional[WorkoutLog] = Field(None, description="The matching log")
+
+
+class SearchResult(BaseModel):
+    """Result of a full-text / body-area search."""
+    total: int = Field(..., description="Number of matching logs")
+    hits: List[SearchHit] = Field(default_factory=list, description="Best matches, best first")
+
+
+class ProgressionPoint(BaseModel):
+    """One session of an exercise."""
+    date: dt.date = Field(..., description="Session date")
+    sets: Optional[int] = Field(None, description="Sets (summed if logged more than once)")
+    reps: Optional[int] = Field(None, description="Reps per set of the heaviest entry")
+    load: Optional[str] = Field(None, description="Load as logged for the heaviest entry")
+    implement: Optional[ImplementType] = Field(None, description="Equipment")
+    top_set_kg: Optional[float] = Field(None, description="Heaviest load per rep")
+    volume_kg: Optional[float] = Field(None, description="Total volume")
+    estimated_1rm_kg: Optional[float] = Field(None, description="Best one-rep max estimate")
+
+
+class ExerciseProgression(BaseModel):
+    """Per-session series for one exercise."""
+    exercise: str = Field(..., description="Normalised exercise name")
+    sessions: int = Field(0, description="Number of sessions in the range")
+    best_top_set_kg: Optional[float] = Field(None, description="Heaviest load in the range")
+    best_estimated_1rm_kg: Optional[float] = Field(None, description="Best one-rep max estimate in the range")
+    points: List[ProgressionPoint] = Field(default_factory=list, description="Sessions, oldest first")
@@ -0,0 +1,240 @@
+"""Weekly and monthly rollups materialised in data/analysis/."""
+
+import hashlib
+import json
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from date_locks import FileLock
+from models import AIAnalysis
+from write_journal import atomic_write
+from summary_store import SummaryStore, WORKOUT_TYPES, EFFORTS
+from trends import pain_area_counts
+
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+KINDS = (WEEKLY, MONTHLY)
+
+# Ranges longer than this are answered with monthly rollups in "auto" mode
+AUTO_MONTHLY_AFTER_DAYS = 91
+
+
+def period_bounds(kind: str, day: date) -> Tuple[str, date, date]:
+    """Return (label, first day, last day) of the week or month containing a date."""
+    if kind == WEEKLY:
+        iso_year, iso_week, _ = day.isocalendar()
+        start = day - timedelta(days=day.weekday())
+        return f"{iso_year}-W{iso_week:02d}", start, start + timedelta(days=6)
+
+    start = day.replace(day=1)
+    end = day.replace(day=monthrange(day.year, day.month)[1])
+    return f"{day.year}-{day.month:02d}", start, end
+
+
+def parse_period(kind: str, label: str) -> Tuple[date, date]:
+    """Return the first and last day of a period label (YYYY-WNN or YYYY-MM)."""
+    if kind == WEEKLY:
+        year, week = label.split("-W")
+        start = date.fromisocalendar(int(year), int(week), 1)
+    else:
+        year, month = label.split("-")
+        start = date(int(year), int(month), 1)
+    return period_bounds(kind, start)[1:]
+
+
+class RollupEngine:
+    """
+    Builds weekly and monthly aggregates from the summary columns.
+
+    Each period is stored as `weekly-YYYY-WNN.json` / `monthly-YYYY-MM.json`.
+    Saving or deleting a log recomputes only its week and month; periods that
+    were never written are built the first time they are read. An optional
+    Claude analysis is kept with the rollup and flagged stale when the
+    underlying logs change.
+
+    Rollups are read, rebuilt and written under a file lock, so several
+    processes (e.g. uvicorn workers) saving logs of the same period don't
+    interleave their updates.
+    """
+
+    def __init__(self, analysis_dir: Path, get_summary: Callable[[], SummaryStore]):
+        """Initialize with the output directory and a provider of the current summary."""
+        self.analysis_dir = Path(analysis_dir)
+        self.get_summary = get_summary
+        self._lock = FileLock(self.analysis_dir / "rollups.lock")
+
+    def close(self) -> None:
+        """Release the lock file."""
+        self._lock.close()
+
+    def refresh(self, *log_dates: date, summary: Optional[SummaryStore] = None) -> None:
+        """Recompute the weeks and months containing changed logs (each period once)."""
+        periods = {
+            (kind, *period_bounds(kind, log_date))
+            for log_date in log_dates for kind in KINDS
+        }
+        summary = summary or self.get_summary()
+        for kind, label, start, end in sorted(periods):
+            self._build(kind, label, start, end, summary)
+
+    def invalidate(self, summary: Optional[SummaryStore] = None) -> None:
+        """Recompute every stored rollup, e.g. after the summary was rebuilt from the logs."""
+        summary = summary or self.get_summary()
+        for path in sorted(self.analysis_dir.glob("*-*.json")):
+            kind, _, label = path.stem.partition("-")
+            if kind not in KINDS:
+                continue
+            try:
+                start, end = parse_period(kind, label)
+            except ValueError:
+                continue
+            self._build(kind, label, start, end, summary)
+
+    def get_range(self, kind: str, start_date: date, end_date: date) -> List[dict]:
+        """Return the rollups overlapping a date range, building any that are missing."""
+        summary = self.get_summary()
+        dates = summary.columns(start_date, end_date)["date"]
+        if len(dates) == 0:
+            return []
+
+        # Only periods that actually contain logs
+        labels = {}
+        for day in np.unique(dates.astype("datetime64[D]")).tolist():
+            label, start, end = period_bounds(kind, day)
+            labels[label] = (start, end)
+
+        rollups = []
+        for label, (start, end) in sorted(labels.items()):
+            rollup = self.read(kind, label)
+            if rollup is None:
+                rollup = self._build(kind, label, start, end, summary)
+            if rollup is not None:
+                rollups.append(rollup)
+        return rollups
+
+    def get(self, kind: str, label: str) -> Optional[dict]:
+        """Return one rollup, building it if it hasn't been written yet."""
+        rollup = self.read(kind, label)
+        if rollup is None:
+            rollup = self._build(kind, label, *parse_period(kind, label))
+        return rollup
+
+    def read(self, kind: str, label: str) -> Optional[dict]:
+        """Read a stored rollup."""
+        try:
+            with open(self._path(kind, label), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def attach_analysis(self, kind: str, label: str, analysis: AIAnalysis) -> Optional[dict]:
+        """Store a Claude analysis with a rollup."""
+        with self._lock:
+            rollup = self.read(kind, label)
+            if rollup is None:
+                return None
+            rollup["ai_analysis"] = analysis.model_dump(mode="json")
+            rollup["ai_analysis"]["source_hash"] = rollup["source_hash"]
+            rollup["ai_analysis"]["stale"] = False
+            self._write(kind, label, rollup)
+            return rollup
+
+    def _build(
+        self,
+        kind: str,
+        label: str,
+        start: date,
+        end: date,
+        summary: Optional[SummaryStore] = None
+    ) -> Optional[dict]:
+        """Recompute one period from the summary columns and persist it."""
+        summary = summary or self.get_summary()
+        columns = summary.columns(start, end)
+
+        with self._lock:
+            previous = self.read(kind, label)
+
+            if len(columns["date"]) == 0:
+                # No logs left in this period
+                self._path(kind, label).unlink(missing_ok=True)
+                return None
+
+            rollup = {
+                "kind": kind,
+                "period": label,
+                "start_date": start.isoformat(),
+                "end_date": end.isoformat(),
+                **self._aggregate(columns, summary.body_areas),
+                "generated_at": datetime.utcnow().isoformat()
+            }
+
+            # Keep an earlier AI analysis, flagged stale if the logs changed
+            if previous and previous.get("ai_analysis"):
+                analysis = previous["ai_analysis"]
+                analysis["stale"] = analysis.get("source_hash") != rollup["source_hash"]
+                rollup["ai_analysis"] = analysis
+
+            self._write(kind, label, rollup)
+            return rollup
+
+    @staticmethod
+    def _aggregate(columns: dict, body_areas: List[str]) -> dict:
+        """Aggregate one period's summary columns."""
+        type_counts = np.bincount(columns["workout_type"], minlength=len(WORKOUT_TYPES) + 1)
+        effort_counts = np.bincount(columns["perceived_effort"], minlength=len(EFFORTS) + 1)
+
+        fatigue = columns["fatigue_level"]
+        fatigue = fatigue[fatigue > 0]
+        pace = columns["pace_min_per_km"].astype(float)
+        pace = pace[~np.isnan(pace)]
+
+        # Identifies the exact rows behind this rollup. Pain areas are hashed by
+        # name: their bit positions change when the summary is rebuilt.
+        source = np.stack([
+            columns[name].astype(float) for name in sorted(columns) if name not in ("date", "pain_areas")
+        ])
+        areas = [
+            [area for bit, area in enumerate(body_areas) if int(mask) >> bit & 1]
+            for mask in columns["pain_areas"]
+        ]
+        source_hash = hashlib.sha256(
+            columns["date"].astype(np.int64).tobytes()
+            + np.nan_to_num(source, nan=-1).tobytes()
+            + json.dumps([sorted(row) for row in areas]).encode("utf-8")
+        ).hexdigest()[:16]
+
+        return {
+            "total_logs": int(len(columns["date"])),
+            "dates": [str(d) for d in columns["date"]],
+            "workout_types": {
+                WORKOUT_TYPES[code - 1].value: int(count)
+                for code, count in enumerate(type_counts) if code and count
+            },
+            "perceived_effort": {
+                EFFORTS[code - 1].value: int(count)
+                for code, count in enumerate(effort_counts) if code and count
+            },
+            "total_sets": int(columns["total_sets"].sum()),
+            "total_reps": int(columns["total_reps"].sum()),
+            "running_km": round(float(np.nansum(columns["distance_km"])), 2),
+            "running_minutes": round(float(np.nansum(columns["duration_minutes"])), 1),
+            "avg_pace_min_per_km": round(float(pace.mean()), 2) if len(pace) else None,
+            "avg_fatigue": round(float(fatigue.mean()), 1) if len(fatigue) else None,
+            "max_fatigue": int(fatigue.max()) if len(fatigue) else None,
+            "pain_days": int(np.count_nonzero(columns["pain_severity"] | (columns["pain_areas"] > 0))),
+            "pain_areas": pain_area_counts(columns["pain_areas"], body_areas),
+            "source_hash": source_hash
+        }
+
+    def _path(self, kind: str, label: str) -> Path:
+        """File path for a rollup."""
+        return self.analysis_dir / f"{kind}-{label}.json"
+
+    def _write(self, kind: str, label: str, rollup: dict) -> None:
+        """Atomically write a rollup file."""
+        data = json.dumps(rollup, indent=2, ensure_ascii=False).encode("utf-8")
+        atomic_write(self._path(kind, label), data)
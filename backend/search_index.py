@@ -0,0 +1,394 @@
+"""Persistent inverted index over the free-text fields of workout logs."""
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models import WorkoutLog
+from date_locks import FileLock
+from summary_store import normalize_body_area, sidecar_key
+from exercise_metrics import normalize_exercise_name
+
+# First line of the index file; bump it whenever tokenising or the record
+# layout changes so old indexes are discarded and rebuilt from the logs.
+FORMAT = "WTSEARCH3"
+
+# Indexed fields and their weight in ranking (a term in a body area counts
+# double a term in the reflection). Field order defines the match bitmask.
+FIELD_WEIGHTS = {
+    "free_text_reflection": 1.0,
+    "exercise_notes": 1.0,
+    "pain_description": 1.5,
+    "body_areas": 2.0,
+    "problem_areas": 1.5,
+}
+FIELDS = list(FIELD_WEIGHTS)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Compact the file once it holds this many more records than live documents
+COMPACT_SLACK = 256
+
+WORD = re.compile(r"\w+")
+QUERY_WORD = re.compile(r"(\w+)(\*?)")
+
+
+def _stem(word: str) -> str:
+    """Fold simple plurals so "knees" finds "knee" (and "injuries" finds "injury")."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lower-cased, plural-folded terms."""
+    return [_stem(word) for word in WORD.findall(text.casefold())] if text else []
+
+
+def _document(log: WorkoutLog) -> dict:
+    """Terms per field, normalised body areas and exercise names of a log."""
+    pain = log.pain_or_tightness
+    analysis = log.ai_analysis
+    body_areas = (pain.body_areas or []) if pain else []
+    problem_areas = (analysis.machine_context.problem_areas or []) if analysis else []
+
+    fields = {
+        "free_text_reflection": tokenize(log.free_text_reflection),
+        "exercise_notes": [t for ex in log.exercises or [] for t in tokenize(ex.notes)],
+        "pain_description": tokenize(pain.description if pain else None),
+        "body_areas": [t for area in body_areas for t in tokenize(area)],
+        "problem_areas": [t for area in problem_areas for t in tokenize(area)],
+    }
+    return {
+        "fields": {name: terms for name, terms in fields.items() if terms},
+        "areas": sorted({normalize_body_area(area) for area in body_areas}),
+        "exercises": sorted({normalize_exercise_name(ex.name) for ex in log.exercises or []}),
+    }
+
+
+class SearchIndex:
+    """
+    Inverted index for full-text and body-area search.
+
+    Like the summary sidecar, every save/delete appends one record (the
+    log's terms, or a tombstone) to a file and the latest record per date
+    wins, so the index is kept up to date incrementally and loaded on
+    startup without reading any logs. Results are ranked with BM25, with
+    field weights from FIELD_WEIGHTS. As with the summary, processes
+    sharing the file write it under a file lock and `refresh` reloads it
+    once another process has written it.
+    """
+
+    def __init__(self, path: Path):
+        """Load the index from disk (a missing or outdated file loads empty)."""
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(self.path.with_suffix(".lock"))
+        self._file_key: Optional[tuple] = None
+        self._record_count = 0
+        self._reset()
+        with self._file_lock:
+            self._load()
+
+    def refresh(self) -> bool:
+        """Reload the index if another process wrote it since; True if it did."""
+        if sidecar_key(self.path) == self._file_key:
+            return False
+        with self._file_lock, self._lock:
+            return self._refresh()
+
+    def close(self) -> None:
+        self._file_lock.close()
+
+    def upsert_many(self, logs: List[WorkoutLog]) -> None:
+        """Index the current state of several logs with a single append."""
+        records = [(log.date, _document(log)) for log in logs]
+        if not records:
+            return
+        with self._file_lock, self._lock:
+            self._refresh()
+            for log_date, doc in records:
+                self._apply(log_date.toordinal(), doc)
+            self._append(records)
+
+    def remove(self, log_date: date) -> None:
+        """Drop a deleted log from the index."""
+        with self._file_lock, self._lock:
+            self._refresh()
+            self._apply(log_date.toordinal(), None)
+            self._append([(log_date, None)])
+
+    def rebuild(self, logs: Iterable[Optional[WorkoutLog]]) -> None:
+        """Replace the whole index with the given logs."""
+        with self._file_lock, self._lock:
+            self._reset()
+            for log in logs:
+                if log is not None:
+                    self._apply(log.date.toordinal(), _document(log))
+            self._write_all()
+
+    def matches(self, dates: List[date]) -> bool:
+        """Check whether the index covers exactly the given sorted dates."""
+        with self._lock:
+            return len(dates) == len(self._dates) and all(
+                d.toordinal() == ordinal for d, ordinal in zip(dates, self._dates)
+            )
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        body_area: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: int = 20
+    ) -> Tuple[int, List[Tuple[date, float, List[str]]]]:
+        """
+        Find logs containing every query term.
+
+        A term ending in `*` matches any term with that prefix. `body_area`
+        keeps only logs with that area in pain_or_tightness.body_areas.
+        Returns the total number of matches and the best `limit` of them as
+        (date, score, matched fields), best first; without a query, matches
+        are ordered newest first.
+        """
+        terms = [(_stem(word.casefold()), bool(star)) for word, star in QUERY_WORD.findall(query or "")]
+        if query is not None and not terms:
+            return 0, []
+
+        with self._lock:
+            lo = start_date.toordinal() if start_date else None
+            hi = end_date.toordinal() if end_date else None
+            candidates = self._date_range(lo, hi)
+
+            if body_area is not None:
+                candidates &= self._areas.get(normalize_body_area(body_area), set())
+
+            # Per query term, the postings of every index term it matches
+            matched: List[List[Dict[int, Tuple[float, int]]]] = []
+            for term, prefix in terms:
+                postings = [
+                    self._postings[t] for t in (self._expand(term) if prefix else [term])
+                    if t in self._postings
+                ]
+                docs = set().union(*postings) if postings else set()
+                candidates &= docs
+                matched.append(postings)
+                if not candidates:
+                    break
+
+            weighted = self._idf(matched)
+            hits = [self._score(ordinal, weighted, bool(terms)) for ordinal in candidates]
+
+        best = heapq.nlargest(limit, hits, key=lambda hit: (hit[1], hit[0]))
+        return len(hits), [
+            (date.fromordinal(ordinal), round(score, 4), [FIELDS[i] for i in range(len(FIELDS)) if mask >> i & 1])
+            for ordinal, score, mask in best
+        ]
+
+    def occurrences(self, body_areas: Iterable[str] = (), exercises: Iterable[str] = ()) -> Dict[Tuple[str, str], List[date]]:
+        """
+        Dates on which each body area hurt and each exercise was done.
+
+        Keyed by ("area", name) / ("exercise", name) with names normalised,
+        dates sorted oldest first.
+        """
+        keys = [("area", normalize_body_area(a)) for a in body_areas]
+        keys += [("exercise", normalize_exercise_name(e)) for e in exercises]
+
+        with self._lock:
+            return {
+                (kind, name): [
+                    date.fromordinal(o)
+                    for o in sorted((self._areas if kind == "area" else self._exercises).get(name, ()))
+                ]
+                for kind, name in keys
+            }
+
+    def exercise_counts(self) -> Dict[str, Tuple[int, date]]:
+        """Number of logs and latest date per normalised exercise name."""
+        with self._lock:
+            return {
+                name: (len(ordinals), date.fromordinal(max(ordinals)))
+                for name, ordinals in self._exercises.items()
+            }
+
+    def stats(self) -> dict:
+        """Document and term counts."""
+        with self._lock:
+            return {"documents": len(self._dates), "terms": len(self._postings), "records": self._record_count}
+
+    def _reset(self) -> None:
+        """Empty the in-memory index."""
+        # term -> {date ordinal: (weighted term frequency, field bitmask)}
+        self._postings: Dict[str, Dict[int, Tuple[float, int]]] = {}
+        # date ordinal -> record as stored (terms per field, body areas, exercises)
+        self._docs: Dict[int, dict] = {}
+        self._doc_len: Dict[int, float] = {}
+        self._total_len = 0.0
+        self._areas: Dict[str, Set[int]] = {}
+        self._exercises: Dict[str, Set[int]] = {}
+        self._dates: List[int] = []
+
+    def _apply(self, ordinal: int, doc: Optional[dict]) -> None:
+        """Replace (or with None, remove) the document for a date in memory."""
+        old = self._docs.pop(ordinal, None)
+        if old:
+            for term in {t for terms in old["fields"].values() for t in terms}:
+                postings = self._postings[term]
+                del postings[ordinal]
+                if not postings:
+                    del self._postings[term]
+            for names, postings in ((old["areas"], self._areas), (old["exercises"], self._exercises)):
+                for name in names:
+                    postings[name].discard(ordinal)
+                    if not postings[name]:
+                        del postings[name]
+            self._total_len -= self._doc_len.pop(ordinal)
+
+        i = bisect_left(self._dates, ordinal)
+        exists = i < len(self._dates) and self._dates[i] == ordinal
+        if doc is None:
+            if exists:
+                del self._dates[i]
+            return
+        if not exists:
+            insort(self._dates, ordinal)
+
+        weighted: Dict[str, Tuple[float, int]] = {}
+        length = 0.0
+        for name, terms in doc["fields"].items():
+            weight, bit = FIELD_WEIGHTS[name], 1 << FIELDS.index(name)
+            length += weight * len(terms)
+            for term in terms:
+                tf, mask = weighted.get(term, (0.0, 0))
+                weighted[term] = (tf + weight, mask | bit)
+
+        for term, posting in weighted.items():
+            self._postings.setdefault(term, {})[ordinal] = posting
+        self._docs[ordinal] = {"fields": doc["fields"], "areas": doc["areas"], "exercises": doc["exercises"]}
+        self._doc_len[ordinal] = length
+        self._total_len += length
+
+        for area in doc["areas"]:
+            self._areas.setdefault(area, set()).add(ordinal)
+        for name in doc["exercises"]:
+            self._exercises.setdefault(name, set()).add(ordinal)
+
+    def _date_range(self, lo: Optional[int], hi: Optional[int]) -> Set[int]:
+        """Indexed date ordinals between lo and hi (inclusive, either open)."""
+        start = bisect_left(self._dates, lo) if lo is not None else 0
+        end = bisect_right(self._dates, hi) if hi is not None else len(self._dates)
+        return set(self._dates[start:end])
+
+    def _expand(self, prefix: str) -> List[str]:
+        """Indexed terms starting with a prefix."""
+        return [term for term in self._postings if term.startswith(prefix)]
+
+    def _idf(self, matched: List[List[Dict[int, Tuple[float, int]]]]) -> List[Tuple[Dict[int, Tuple[float, int]], float]]:
+        """Pair every matched postings list with its term's BM25 idf."""
+        n = len(self._dates)
+        return [
+            (posting, math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5)))
+            for postings in matched for posting in postings
+        ]
+
+    def _score(self, ordinal: int, weighted: list, has_query: bool) -> Tuple[int, float, int]:
+        """BM25 score and matched-field bitmask of one document."""
+        if not has_query:
+            # Area/date-only searches: tag the body_areas field
+            return ordinal, 0.0, 1 << FIELDS.index("body_areas")
+
+        avg_len = self._total_len / len(self._dates)
+        norm = K1 * (1 - B + B * self._doc_len[ordinal] / (avg_len or 1.0))
+
+        score, mask = 0.0, 0
+        for posting, idf in weighted:
+            hit = posting.get(ordinal)
+            if hit:
+                tf, fields = hit
+                score += idf * tf * (K1 + 1) / (tf + norm)
+                mask |= fields
+        return ordinal, score, mask
+
+    def _append(self, records: List[Tuple[date, Optional[dict]]]) -> None:
+        """Append records to the index file (caller holds the lock)."""
+        if self._record_count == 0:
+            self._write_all()
+            return
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(self._encode(log_date, doc) for log_date, doc in records))
+        self._record_count += len(records)
+        self._file_key = sidecar_key(self.path)
+
+        # Replaced and deleted documents pile up; compact occasionally
+        if self._record_count > len(self._dates) * 2 + COMPACT_SLACK:
+            self._write_all()
+
+    def _refresh(self) -> bool:
+        """Reload the index file if it changed on disk (caller holds both locks)."""
+        if sidecar_key(self.path) == self._file_key:
+            return False
+        self._record_count = 0
+        self._reset()
+        self._load()
+        return True
+
+    def _load(self) -> None:
+        """Replay the index file (with the file lock held)."""
+        self._file_key = sidecar_key(self.path)
+        try:
+            with open(self.path, 'rb') as f:
+                lines = f.read().split(b"\n")
+        except FileNotFoundError:
+            return
+
+        if lines[0] != FORMAT.encode():
+            return
+
+        # A crash mid-append can leave a partial last line; cut it off so
+        # later appends start on a fresh line
+        valid_size = len(lines[0]) + 1
+        count = 0
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+                ordinal = date.fromisoformat(record["date"]).toordinal()
+            except (ValueError, KeyError, TypeError):
+                break
+            self._apply(ordinal, None if record.get("deleted") else record)
+            valid_size += len(line) + 1
+            count += 1
+
+        if os.path.getsize(self.path) != valid_size:
+            os.truncate(self.path, valid_size)
+            self._file_key = sidecar_key(self.path)
+        self._record_count = count
+
+    def _write_all(self) -> None:
+        """Atomically replace the index file with the live documents."""
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(FORMAT + "\n")
+            for ordinal in self._dates:
+                f.write(self._encode(date.fromordinal(ordinal), self._docs[ordinal]))
+        os.replace(tmp_path, self.path)
+        self._record_count = len(self._dates)
+        self._file_key = sidecar_key(self.path)
+
+    @staticmethod
+    def _encode(log_date: date, doc: Optional[dict]) -> str:
+        """One JSON line per record."""
+        record = {"date": log_date.isoformat(), **(doc or {"deleted": True})}
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
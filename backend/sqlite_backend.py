@@ -0,0 +1,315 @@
+"""Embedded SQLite storage for workout logs."""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models import WorkoutLog
+from log_backend import LogBackend, READS, BYTES_READ, CACHE_LOOKUPS, PARSE_SECONDS, ENCODE_SECONDS
+from summary_store import normalize_body_area
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    date TEXT PRIMARY KEY,
+    workout_type TEXT NOT NULL,
+    fatigue_level INTEGER,
+    updated_at TEXT,
+    rev INTEGER NOT NULL DEFAULT 1,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS logs_workout_type ON logs (workout_type, date);
+CREATE INDEX IF NOT EXISTS logs_fatigue_level ON logs (fatigue_level, date);
+
+CREATE TABLE IF NOT EXISTS log_body_areas (
+    area TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (area, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS log_body_areas_date ON log_body_areas (date);
+"""
+
+UPSERT_LOG = """
+INSERT INTO logs (date, workout_type, fatigue_level, updated_at, data)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (date) DO UPDATE SET
+    workout_type = excluded.workout_type,
+    fatigue_level = excluded.fatigue_level,
+    updated_at = excluded.updated_at,
+    data = excluded.data,
+    rev = logs.rev + 1
+"""
+
+# Rows fetched per query when streaming a range
+PAGE_SIZE = 500
+
+# Metric children for this backend, looked up once
+_READS = READS.labels(backend="sqlite")
+_BYTES_READ = BYTES_READ.labels(backend="sqlite")
+_CACHE_HITS = CACHE_LOOKUPS.labels(backend="sqlite", result="hit")
+_CACHE_MISSES = CACHE_LOOKUPS.labels(backend="sqlite", result="miss")
+_PARSE = PARSE_SECONDS.labels(backend="sqlite")
+_ENCODE = ENCODE_SECONDS.labels(backend="sqlite")
+
+
+def _count_read(*data: str) -> None:
+    """Count fetched rows of log JSON."""
+    _READS.inc(len(data))
+    _BYTES_READ.inc(sum(map(len, data)))
+
+
+def _parse(data: str) -> WorkoutLog:
+    """Validate a stored row."""
+    with _PARSE.time():
+        return WorkoutLog.model_validate_json(data)
+
+
+class SQLiteBackend(LogBackend):
+    """
+    Stores logs in a SQLite database in WAL mode.
+
+    Each row holds the log's JSON plus indexed columns (date, workout type,
+    fatigue) and a `log_body_areas` table of normalised pain areas, so range
+    scans and filters are index lookups. `rev` increases on every write and
+    is used by the file sync tool to detect changes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Path, durability: str = "atomic", cache_size: int = 256):
+        """
+        Open (creating if needed) the database; durability "fsync" syncs every
+        commit, cache_size bounds the re-serialised JSON kept for list responses.
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # WAL with synchronous=NORMAL is already atomic; FULL also fsyncs each commit
+        self.synchronous = "FULL" if durability == "fsync" else "NORMAL"
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        # Date list, reloaded when any connection commits (PRAGMA data_version)
+        self._index_conn = self._open()
+        self._index_lock = threading.Lock()
+        self._data_version: Optional[int] = None
+        self._dates: List[date] = []
+
+        # LRU of date -> (stored JSON, validated compact JSON), so rows are
+        # only re-validated for list responses after they change
+        self._json_cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._json_cache_size = cache_size
+        self._json_cache_lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        """This thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    def list_dates(self) -> List[date]:
+        """Sorted dates with a log, reloaded only after a commit."""
+        with self._index_lock:
+            version = self._index_conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                rows = self._index_conn.execute("SELECT date FROM logs ORDER BY date").fetchall()
+                dates = [date.fromisoformat(row[0]) for row in rows]
+                if dates != self._dates:
+                    self._dates = dates
+                self._data_version = version
+            return self._dates
+
+    def get(self, log_date: date) -> Optional[WorkoutLog]:
+        """Fetch one log by date."""
+        row = self.connect().execute(
+            "SELECT data FROM logs WHERE date = ?", (log_date.isoformat(),)
+        ).fetchone()
+        if row is None:
+            return None
+        _count_read(row[0])
+        return _parse(row[0])
+
+    def get_range(self, start_date: date, end_date: date) -> List[WorkoutLog]:
+        """Fetch a date range with one indexed query."""
+        rows = self.connect().execute(
+            "SELECT data FROM logs WHERE date BETWEEN ? AND ? ORDER BY date",
+            (start_date.isoformat(), end_date.isoformat())
+        ).fetchall()
+        _count_read(*(row[0] for row in rows))
+        return [_parse(row[0]) for row in rows]
+
+    def get_json(self, log_date: date) -> Optional[bytes]:
+        """Compact JSON of one validated log."""
+        day = log_date.isoformat()
+        row = self.connect().execute("SELECT data FROM logs WHERE date = ?", (day,)).fetchone()
+        if row is None:
+            return None
+        _count_read(row[0])
+        return self._encode(day, row[0])
+
+    def get_range_json(self, start_date: date, end_date: date) -> List[bytes]:
+        """Compact JSON of a date range, from one indexed query."""
+        rows = self.connect().execute(
+            "SELECT date, data FROM logs WHERE date BETWEEN ? AND ? ORDER BY date",
+            (start_date.isoformat(), end_date.isoformat())
+        ).fetchall()
+        _count_read(*(data for _, data in rows))
+        return [self._encode(day, data) for day, data in rows]
+
+    def iter_raw(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Iterator[Tuple[date, bytes]]:
+        """
+        Yield (date, JSON bytes) page by page.
+
+        Each page is a separate query on the calling thread's connection, so
+        the generator can be advanced from different threads.
+        """
+        lower = start_date.isoformat() if start_date else ""
+        upper = end_date.isoformat() if end_date else "9999-12-31"
+        inclusive = True
+
+        while True:
+            op = ">=" if inclusive else ">"
+            rows = self.connect().execute(
+                f"SELECT date, data FROM logs WHERE date {op} ? AND date <= ? ORDER BY date LIMIT ?",
+                (lower, upper, PAGE_SIZE)
+            ).fetchall()
+            _count_read(*(data for _, data in rows))
+            for log_date, data in rows:
+                yield date.fromisoformat(log_date), data.encode("utf-8")
+
+            if len(rows) < PAGE_SIZE:
+                return
+            lower, inclusive = rows[-1][0], False
+
+    def put_many(self, logs: List[WorkoutLog]) -> None:
+        """Upsert logs and their body areas in one transaction."""
+        if not logs:
+            return
+
+        rows = []
+        areas = []
+        for log in logs:
+            day = log.date.isoformat()
+            updated_at = log.metadata.updated_at.isoformat() if log.metadata else None
+            rows.append((day, log.workout_type.value, log.fatigue_level, updated_at, log.model_dump_json()))
+
+            pain = log.pain_or_tightness
+            if pain:
+                areas.extend((area, day) for area in {normalize_body_area(a) for a in pain.body_areas or []})
+
+        with self.connect() as conn:
+            conn.executemany(UPSERT_LOG, rows)
+            conn.executemany("DELETE FROM log_body_areas WHERE date = ?", [(row[0],) for row in rows])
+            conn.executemany("INSERT INTO log_body_areas (area, date) VALUES (?, ?)", areas)
+
+    def delete(self, log_date: date) -> bool:
+        """Delete a log and its body areas."""
+        day = log_date.isoformat()
+        with self.connect() as conn:
+            deleted = conn.execute("DELETE FROM logs WHERE date = ?", (day,)).rowcount
+            conn.execute("DELETE FROM log_body_areas WHERE date = ?", (day,))
+        return deleted > 0
+
+    def find_dates(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        workout_type: Optional[str] = None,
+        body_area: Optional[str] = None,
+        min_fatigue: Optional[int] = None
+    ) -> List[date]:
+        """Filter with the indexed columns."""
+        sql = "SELECT logs.date FROM logs"
+        conditions: List[str] = []
+        params: list = []
+
+        if body_area:
+            sql += " JOIN log_body_areas AS b ON b.date = logs.date AND b.area = ?"
+            params.append(normalize_body_area(body_area))
+        if start_date:
+            conditions.append("logs.date >= ?")
+            params.append(start_date.isoformat())
+        if end_date:
+            conditions.append("logs.date <= ?")
+            params.append(end_date.isoformat())
+        if workout_type:
+            conditions.append("logs.workout_type = ?")
+            params.append(str(getattr(workout_type, "value", workout_type)))
+        if min_fatigue is not None:
+            conditions.append("logs.fatigue_level >= ?")
+            params.append(min_fatigue)
+
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY logs.date"
+
+        return [date.fromisoformat(row[0]) for row in self.connect().execute(sql, params)]
+
+    def cache_info(self) -> dict:
+        """Report the size of the serialised-log cache."""
+        with self._json_cache_lock:
+            return {"size": len(self._json_cache), "max_size": self._json_cache_size}
+
+    def revisions(self) -> Dict[date, int]:
+        """Current `rev` of every log (for change detection)."""
+        rows = self.connect().execute("SELECT date, rev FROM logs")
+        return {date.fromisoformat(day): rev for day, rev in rows}
+
+    def close(self) -> None:
+        """Checkpoint the WAL into the database file and close all connections."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error:
+                pass
+            conn.close()
+        self._local = threading.local()
+
+    def _encode(self, day: str, data: str) -> bytes:
+        """
+        Validate a stored row and re-serialise it with the current model.
+
+        Rows written by an older model may lack newer fields, so they aren't
+        served as stored; the result is cached until the row's JSON changes.
+        """
+        with self._json_cache_lock:
+            entry = self._json_cache.get(day)
+            if entry and entry[0] == data:
+                self._json_cache.move_to_end(day)
+                _CACHE_HITS.inc()
+                return entry[1]
+        _CACHE_MISSES.inc()
+
+        log = _parse(data)
+        with _ENCODE.time():
+            encoded = log.model_dump_json().encode("utf-8")
+
+        if self._json_cache_size > 0:
+            with self._json_cache_lock:
+                self._json_cache[day] = (data, encoded)
+                self._json_cache.move_to_end(day)
+                while len(self._json_cache) > self._json_cache_size:
+                    self._json_cache.popitem(last=False)
+        return encoded
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a connection with the backend's pragmas."""
+        conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
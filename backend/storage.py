@@ -1,73 +1,310 @@
-"""JSON file storage utilities."""
+"""Workout log storage."""
 
-import json
-from datetime import date, datetime
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Optional, List
-from models import WorkoutLog
+from typing import Callable, Iterator, Optional, List, Tuple
+from models import WorkoutLog, AIAnalysis
+from date_locks import DateLocks
+from log_backend import LogBackend
+from json_backend import JsonFileBackend, DURABILITY_MODES
+from sqlite_backend import SQLiteBackend
+from summary_store import SummaryStore
+from search_index import SearchIndex
+from rollups import RollupEngine
+from exercise_metrics import compute_metrics
+from instrumentation import histogram
+
+OPERATION_SECONDS = histogram(
+    "workout_storage_operation_seconds", "Time spent in WorkoutStorage operations", ["operation"]
+)
+
+BACKENDS = ("json", "sqlite")
+SQLITE_FILE = "workouts.db"
+
+# Kinds of change passed to listeners: written or deleted through this
+# storage, or a log file edited/added or removed outside it (see reload)
+SAVED, DELETED, EDITED, REMOVED = "saved", "deleted", "edited", "removed"
+
+# Called with (kind, date, log or None for deletions) while the date is locked
+ChangeListener = Callable[[str, date, Optional[WorkoutLog]], None]
+
+
+class VersionConflict(Exception):
+    """The stored log is not at the version a conditional write expected."""
+
+    def __init__(self, log_date: date, expected: int, current: Optional[WorkoutLog]):
+        self.current = current
+        self.current_version = current.metadata.version if current else 0
+        super().__init__(
+            f"Log for {log_date} is at version {self.current_version}, expected {expected}"
+        )
+
+
+def create_backend(kind: str, data_dir: Path, cache_size: int = 256, durability: str = "atomic") -> LogBackend:
+    """Construct a log backend by name."""
+    if durability not in DURABILITY_MODES:
+        raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+
+    if kind == "json":
+        return JsonFileBackend(data_dir, cache_size=cache_size, durability=durability)
+    if kind == "sqlite":
+        return SQLiteBackend(Path(data_dir) / SQLITE_FILE, durability=durability, cache_size=cache_size)
+
+    raise ValueError(f"backend must be one of {BACKENDS}")
 
 
 class WorkoutStorage:
-    """Handles reading/writing workout logs to JSON files."""
+    """
+    Handles reading/writing workout logs.
+
+    Logs live in a `LogBackend` (JSON files by default, or SQLite); the
+    summary sidecar and weekly/monthly rollups are maintained on top of it.
+    """
 
-    def __init__(self, data_dir: str = "../data"):
-        """Initialize storage with data directory path."""
+    def __init__(
+        self,
+        data_dir: str = "../data",
+        cache_size: int = 256,
+        durability: str = "atomic",
+        backend: str = "json"
+    ):
+        """Initialize storage with data directory path, cache size, durability mode and backend."""
         self.data_dir = Path(data_dir)
-        self.logs_dir = self.data_dir / "logs"
         self.analysis_dir = self.data_dir / "analysis"
 
         # Ensure directories exist
-        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
         self.analysis_dir.mkdir(parents=True, exist_ok=True)
 
-    def _get_log_path(self, log_date: date) -> Path:
-        """Get file path for a specific date."""
-        return self.logs_dir / f"{log_date.isoformat()}.json"
+        self.backend = create_backend(backend, self.data_dir, cache_size, durability)
+
+        # Read-modify-write cycles on a date are serialised across threads and processes
+        self.locks = DateLocks(self.data_dir / "locks")
+
+        # Columnar sidecar for aggregate stats, updated on every save/delete
+        self.summary = SummaryStore(self.data_dir / "summary.bin")
+        self._summary_checked_index: Optional[List[date]] = None
+
+        # Inverted index over reflections, notes and body areas, updated the same
+        # way; loaded on first use (or by warm_up) rather than at startup
+        self._search_index: Optional[SearchIndex] = None
+        self._search_index_lock = threading.Lock()
+        self._search_checked_index: Optional[List[date]] = None
+
+        # Weekly/monthly aggregates in analysis_dir, refreshed per affected period
+        self.rollups = RollupEngine(self.analysis_dir, self.get_summary)
+
+        self._listeners: List[ChangeListener] = []
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """The search index as last saved (see get_search_index for a checked one)."""
+        if self._search_index is None:
+            with self._search_index_lock:
+                if self._search_index is None:
+                    self._search_index = SearchIndex(self.data_dir / "search_index.jsonl")
+        return self._search_index
 
-    def save_log(self, log: WorkoutLog) -> None:
-        """Save a workout log to a JSON file."""
-        log_path = self._get_log_path(log.date)
+    def add_listener(self, listener: ChangeListener) -> None:
+        """Call `listener` after every change to a log (it must be quick and not raise)."""
+        self._listeners.append(listener)
 
-        # Update metadata
-        if log.metadata:
-            log.metadata.updated_at = datetime.utcnow()
+    def remove_listener(self, listener: ChangeListener) -> None:
+        self._listeners.remove(listener)
 
-        # Convert to dict and handle datetime serialization
-        log_dict = json.loads(log.model_dump_json())
+    def _notify(self, kind: str, log_date: date, log: Optional[WorkoutLog] = None) -> None:
+        for listener in list(self._listeners):
+            listener(kind, log_date, log)
 
-        # Write to file with pretty formatting
-        with open(log_path, 'w', encoding='utf-8') as f:
-            json.dump(log_dict, f, indent=2, ensure_ascii=False)
+    @contextmanager
+    def lock(self, log_date: date) -> Iterator[None]:
+        """Hold a date's lock across a read-modify-write (reentrant)."""
+        with self.locks.hold([log_date]):
+            yield
+
+    def save_log(self, log: WorkoutLog, expected_version: Optional[int] = None) -> None:
+        """
+        Save a workout log.
+
+        With `expected_version` the write only happens if the stored log is at
+        that version (0: no log may exist yet); otherwise VersionConflict is
+        raised.
+        """
+        with self.lock(log.date):
+            if expected_version is not None:
+                current = self.get_log(log.date)
+                if (current.metadata.version if current else 0) != expected_version:
+                    raise VersionConflict(log.date, expected_version, current)
+
+            self.save_logs([log])
+
+    def save_logs(self, logs: List[WorkoutLog]) -> None:
+        """
+        Save several workout logs at once.
+
+        The backend writes them together (one journal commit or transaction),
+        the summary gets one append and each affected week/month rollup is
+        recomputed once. Each log's version is set to one past the stored one.
+        """
+        with OPERATION_SECONDS.time(operation="save_logs"), self.locks.hold(log.date for log in logs):
+            now = datetime.utcnow()
+
+            for log in logs:
+                current = self.backend.get(log.date)
+                version = current.metadata.version + 1 if current else 1
+
+                # Update metadata (replaced rather than mutated, as cached logs share it)
+                if log.metadata:
+                    log.metadata = log.metadata.model_copy(update={"updated_at": now, "version": version})
+
+                # Parsed loads are stored with the log so progression never re-parses history
+                log.metrics = compute_metrics(log)
+
+            self.backend.put_many(logs)
+
+            self.summary.upsert_many(logs)
+            self.search_index.upsert_many(logs)
+            self.rollups.refresh(*(log.date for log in logs), summary=self._current_summary())
+
+            for log in logs:
+                self._notify(SAVED, log.date, log)
 
     def get_log(self, log_date: date) -> Optional[WorkoutLog]:
-        """Retrieve a workout log for a specific date."""
-        log_path = self._get_log_path(log_date)
+        """
+        Retrieve a workout log for a specific date.
+
+        The returned object may share nested models with a cached copy:
+        top-level fields can be reassigned freely, nested models should be
+        replaced, not mutated.
+        """
+        return self.backend.get(log_date)
+
+    def get_log_json(self, log_date: date) -> Optional[bytes]:
+        """Compact JSON of the log for a date (cached with the log), or None."""
+        return self.backend.get_json(log_date)
+
+    def attach_analysis(
+        self,
+        log_date: date,
+        analysis: AIAnalysis,
+        log_version: Optional[int] = None
+    ) -> Optional[WorkoutLog]:
+        """
+        Save an analysis onto the current version of a log.
 
-        if not log_path.exists():
-            return None
+        The log is re-read under its lock, so edits made while the analysis
+        was running are kept. `log_version` is the version that was analysed:
+        if the log changed since, the analysis is still attached but keeps
+        that older `log_version` so it shows as outdated, and it never
+        replaces an analysis of a newer version. Returns None if the log has
+        been deleted meanwhile.
+        """
+        with self.lock(log_date):
+            log = self.get_log(log_date)
+            if not log:
+                return None
 
-        with open(log_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            if log_version is not None:
+                current = log.ai_analysis
+                if current and current.log_version and current.log_version > log_version:
+                    return log
 
-        return WorkoutLog(**data)
+                # Unchanged since it was read: the analysis covers the version about to be saved
+                fresh = log.metadata.version == log_version
+                analysis = analysis.model_copy(
+                    update={"log_version": log.metadata.version + 1 if fresh else log_version}
+                )
+
+            log.ai_analysis = analysis
+            self.save_log(log)
+            return log
 
     def get_logs_range(self, start_date: date, end_date: date) -> List[WorkoutLog]:
         """Get all logs within a date range (inclusive)."""
-        logs = []
-        current_date = start_date
+        with OPERATION_SECONDS.time(operation="get_logs_range"):
+            return self.backend.get_range(start_date, end_date)
+
+    def get_logs_range_json(self, start_date: date, end_date: date) -> bytes:
+        """
+        JSON array of the logs within a date range, built from each log's
+        cached serialisation rather than by encoding models per request.
+        """
+        with OPERATION_SECONDS.time(operation="get_logs_range_json"):
+            return b"[" + b",".join(self.backend.get_range_json(start_date, end_date)) + b"]"
+
+    def iter_raw_logs(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Iterator[Tuple[date, bytes]]:
+        """
+        Yield (date, JSON bytes) for each log in a range, one at a time.
 
-        while current_date <= end_date:
-            log = self.get_log(current_date)
+        Logs are not parsed or cached, so exporting a long history neither
+        holds it in memory nor evicts recently used logs.
+        """
+        return self.backend.iter_raw(start_date, end_date)
+
+    def find_logs(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        workout_type: Optional[str] = None,
+        body_area: Optional[str] = None,
+        min_fatigue: Optional[int] = None
+    ) -> List[WorkoutLog]:
+        """Get logs matching every given filter."""
+        with OPERATION_SECONDS.time(operation="find_logs"):
+            dates = self.backend.find_dates(start_date, end_date, workout_type, body_area, min_fatigue)
+            logs = []
+            for log_date in dates:
+                log = self.get_log(log_date)
+                if log:
+                    logs.append(log)
+            return logs
+
+    def find_logs_json(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        workout_type: Optional[str] = None,
+        body_area: Optional[str] = None,
+        min_fatigue: Optional[int] = None
+    ) -> bytes:
+        """JSON array of the logs matching every given filter (see find_logs)."""
+        with OPERATION_SECONDS.time(operation="find_logs_json"):
+            dates = self.backend.find_dates(start_date, end_date, workout_type, body_area, min_fatigue)
+            encoded = [data for data in map(self.backend.get_json, dates) if data]
+            return b"[" + b",".join(encoded) + b"]"
+
+    def find_exercise_logs(
+        self,
+        exercise: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> List[WorkoutLog]:
+        """Get the logs that include an exercise, found through the search index."""
+        dates = self.get_search_index().occurrences(exercises=[exercise])
+        logs = []
+        for log_date in next(iter(dates.values())):
+            if (start_date and log_date < start_date) or (end_date and log_date > end_date):
+                continue
+            log = self.get_log(log_date)
             if log:
                 logs.append(log)
-            current_date = current_date.replace(day=current_date.day + 1)
-
         return logs
 
+    def get_history(self, log_date: date, days: int) -> List[WorkoutLog]:
+        """Get logs from the N days before a date (excluding the date itself)."""
+        end_date = log_date - timedelta(days=1)
+        start_date = end_date - timedelta(days=days - 1)
+
+        return self.get_logs_range(start_date, end_date)
+
     def get_recent_logs(self, days: int = 7) -> List[WorkoutLog]:
         """Get the most recent N days of logs."""
-        from datetime import timedelta
-
         end_date = date.today()
         start_date = end_date - timedelta(days=days - 1)
 
@@ -75,29 +312,163 @@ class WorkoutStorage:
 
     def delete_log(self, log_date: date) -> bool:
         """Delete a workout log for a specific date."""
-        log_path = self._get_log_path(log_date)
+        with self.lock(log_date):
+            if not self.backend.delete(log_date):
+                return False
 
-        if log_path.exists():
-            log_path.unlink()
+            self.summary.remove(log_date)
+            self.search_index.remove(log_date)
+            self.rollups.refresh(log_date, summary=self._current_summary())
+            self._notify(DELETED, log_date)
             return True
-        return False
 
-    def list_all_dates(self) -> List[date]:
-        """List all dates that have logs."""
-        dates = []
+    def reload(self, dates: List[date]) -> List[Tuple[str, date]]:
+        """
+        Bring the summary, search index and rollups up to date with logs
+        changed outside this storage (hand-edited, copied in or removed
+        files) and tell the listeners.
 
-        for log_file in sorted(self.logs_dir.glob("*.json")):
-            # Skip example files
-            if "example" in log_file.name:
-                continue
+        Files that don't parse (e.g. still being written) are skipped until
+        they change again. Returns the (kind, date) changes applied.
+        """
+        with OPERATION_SECONDS.time(operation="reload"), self.locks.hold(dates):
+            changes, edited = [], []
+            for log_date in sorted(set(dates)):
+                try:
+                    log = self.get_log(log_date)
+                except ValueError:
+                    continue
+
+                if log:
+                    edited.append(log)
+                    changes.append((EDITED, log_date, log))
+                else:
+                    self.summary.remove(log_date)
+                    self.search_index.remove(log_date)
+                    changes.append((REMOVED, log_date, None))
+
+            self.summary.upsert_many(edited)
+            self.search_index.upsert_many(edited)
+            if changes:
+                self.rollups.refresh(*(log_date for _, log_date, _ in changes), summary=self._current_summary())
+
+            for kind, log_date, log in changes:
+                self._notify(kind, log_date, log)
+            return [(kind, log_date) for kind, log_date, _ in changes]
+
+    def close(self) -> None:
+        """Flush and close the backend and release the lock files."""
+        self.backend.close()
+        self.locks.close()
+        self.summary.close()
+        self.rollups.close()
+        if self._search_index is not None:
+            self._search_index.close()
 
+    def get_summary(self) -> SummaryStore:
+        """
+        Return the columnar summary of all logs.
+
+        The sidecar is reloaded first if another process (e.g. another
+        worker) wrote it. If the set of dates in the backend no longer
+        matches the summary (files added or removed by hand, or a
+        fresh/outdated sidecar) it is rebuilt from the logs. Hand edits to
+        existing files are not detected here; LogWatcher applies them
+        through reload(), or delete summary.bin to force a rebuild.
+        """
+        with OPERATION_SECONDS.time(operation="get_summary"):
+            refreshed = self.summary.refresh()
+            index = self.backend.list_dates()
+
+            if refreshed or index is not self._summary_checked_index:
+                if not self.summary.matches(index):
+                    self._rebuild_summary(index)
+                self._summary_checked_index = index
+
+            return self.summary
+
+    def _current_summary(self) -> SummaryStore:
+        """
+        The summary for rollups after a write, which has just updated it in
+        place: checked against the stored dates only if that never happened
+        yet, so writes don't rescan the date index or compare every date.
+        """
+        if self._summary_checked_index is None:
+            return self.get_summary()
+        return self.summary
+
+    def rebuild_summary(self) -> List[date]:
+        """
+        Rebuild the summary from every log, e.g. after logs were changed in
+        bulk outside the storage. Returns the dates whose files couldn't be read.
+        """
+        index = self.backend.list_dates()
+        unreadable: List[date] = []
+        self._rebuild_summary(index, unreadable)
+        self._summary_checked_index = index
+        return unreadable
+
+    def _rebuild_summary(self, index: List[date], unreadable: Optional[List[date]] = None) -> None:
+        self.summary.rebuild(self._readable_logs(index, unreadable))
+        # Stored rollups were computed from the old rows
+        self.rollups.invalidate(self.summary)
+
+    def get_search_index(self) -> SearchIndex:
+        """
+        Return the full-text search index.
+
+        Reloaded when another process wrote it, and rebuilt from the logs
+        when it doesn't cover exactly the stored dates, as for get_summary().
+        """
+        with OPERATION_SECONDS.time(operation="get_search_index"):
+            refreshed = self.search_index.refresh()
+            index = self.backend.list_dates()
+
+            if refreshed or index is not self._search_checked_index:
+                if not self.search_index.matches(index):
+                    self.search_index.rebuild(self._readable_logs(index))
+                self._search_checked_index = index
+
+            return self.search_index
+
+    def rebuild_search_index(self) -> List[date]:
+        """Rebuild the search index from every log, as rebuild_summary() does the summary."""
+        index = self.backend.list_dates()
+        unreadable: List[date] = []
+        self.search_index.rebuild(self._readable_logs(index, unreadable))
+        self._search_checked_index = index
+        return unreadable
+
+    def _readable_logs(self, dates: List[date], unreadable: Optional[List[date]] = None) -> Iterator[WorkoutLog]:
+        """The logs for some dates, skipping (and adding to `unreadable`) files that don't parse, e.g. mid-edit."""
+        for log_date in dates:
             try:
-                # Parse date from filename (YYYY-MM-DD.json)
-                date_str = log_file.stem
-                log_date = date.fromisoformat(date_str)
-                dates.append(log_date)
+                log = self.get_log(log_date)
             except ValueError:
-                # Skip files that don't match the date format
+                if unreadable is not None:
+                    unreadable.append(log_date)
                 continue
+            if log:
+                yield log
+
+    def warm_up(self, recent_days: int = 7) -> None:
+        """
+        Load what the first requests would otherwise wait for: the date index,
+        the summary and search index (rebuilding them if out of date) and
+        the most recent logs into the cache.
+        """
+        self.get_summary()
+        self.get_search_index()
+        self.get_recent_logs(recent_days)
+
+    def cache_info(self) -> dict:
+        """Report the backend in use and its cache counters."""
+        return {"backend": self.backend.name, **self.backend.cache_info()}
+
+    def list_all_dates(self) -> List[date]:
+        """List all dates that have logs."""
+        return list(self.backend.list_dates())
 
-        return dates
+    def list_dates_between(self, start_date: date, end_date: date) -> List[date]:
+        """List dates that have logs within a date range (inclusive)."""
+        return self.backend.list_dates_between(start_date, end_date)
@@ -0,0 +1,339 @@
+"""Append-only columnar summary of workout logs for fast aggregate stats."""
+
+import json
+import os
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from models import WorkoutLog, WorkoutType, PerceivedEffort, PainSeverity
+from date_locks import FileLock
+
+# File header; bump the version whenever SUMMARY_DTYPE changes so old
+# sidecars are discarded and rebuilt from the JSON logs.
+MAGIC = b"WTSUM002"
+
+# One fixed-width record per save/delete. Categorical fields are stored as
+# 1-based codes (0 = missing), floats use NaN for missing.
+SUMMARY_DTYPE = np.dtype([
+    ("date", "<i4"),              # date.toordinal()
+    ("deleted", "u1"),            # 1 = tombstone written by delete
+    ("workout_type", "u1"),
+    ("perceived_effort", "u1"),
+    ("fatigue_level", "u1"),
+    ("pain_severity", "u1"),
+    ("distance_km", "<f4"),
+    ("duration_minutes", "<f4"),
+    ("pace_min_per_km", "<f4"),
+    ("total_sets", "<u2"),        # sum of Exercise.sets
+    ("total_reps", "<u4"),        # sum of Exercise.sets * Exercise.reps
+    ("pain_areas", "<u8"),        # bitmask over SummaryStore.body_areas
+])
+
+WORKOUT_TYPES: List[WorkoutType] = list(WorkoutType)
+EFFORTS: List[PerceivedEffort] = list(PerceivedEffort)
+SEVERITIES: List[PainSeverity] = list(PainSeverity)
+
+# date(1970, 1, 1).toordinal(), used to turn ordinals into datetime64[D]
+EPOCH_ORDINAL = 719163
+
+# Body areas get one bit each in pain_areas; anything past the first 63
+# distinct areas shares the last bit
+MAX_BODY_AREAS = 64
+OTHER_AREA = "other"
+
+# Compact the file once it holds this many more records than live rows
+COMPACT_SLACK = 256
+
+
+def _code(value, choices: list) -> int:
+    """Encode an optional enum value as a 1-based code (0 = missing)."""
+    return choices.index(value) + 1 if value is not None else 0
+
+
+def _float(value: Optional[float]) -> float:
+    """Encode an optional float, using NaN for missing."""
+    return float(value) if value is not None else np.nan
+
+
+def normalize_body_area(area: str) -> str:
+    """Normalise a body area name so "Calves " and "calves" count together."""
+    return " ".join(area.lower().split())
+
+
+def sidecar_key(path: Path) -> Optional[tuple]:
+    """(inode, mtime_ns, size) of a sidecar file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class SummaryStore:
+    """
+    Columnar summary of the fields used by stats endpoints.
+
+    Every save/delete appends one fixed-width record to a sidecar file; the
+    latest record per date wins. In memory the live rows are kept as a
+    date-sorted structured array so stats are vectorised reductions.
+
+    Several processes (e.g. uvicorn workers) may share the sidecar: writes
+    hold a file lock and first load what others appended, and `refresh`
+    reloads the sidecar when its inode, mtime or size shows another
+    process wrote it.
+    """
+
+    def __init__(self, path: Path):
+        """Load the summary sidecar from disk (missing or outdated files load empty)."""
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(self.path.with_suffix(".lock"))
+        self._file_key: Optional[tuple] = None
+        self._rows = np.zeros(0, dtype=SUMMARY_DTYPE)
+        self._record_count = 0
+
+        # Bit i of pain_areas stands for body_areas[i]; the list only grows
+        self.areas_path = self.path.with_name(self.path.stem + "_areas.json")
+        self.body_areas: List[str] = []
+        with self._file_lock:
+            self._load()
+
+    def refresh(self) -> bool:
+        """Reload the sidecar if another process wrote it since; True if it did."""
+        if sidecar_key(self.path) == self._file_key:
+            return False
+        with self._file_lock:
+            return self._refresh()
+
+    def close(self) -> None:
+        self._file_lock.close()
+
+    def upsert(self, log: WorkoutLog) -> None:
+        """Record the current state of a log."""
+        self.upsert_many([log])
+
+    def upsert_many(self, logs: List[WorkoutLog]) -> None:
+        """Record the current state of several logs with a single append."""
+        if not logs:
+            return
+        with self._file_lock:
+            # Body area bits must agree with whatever other processes registered
+            self._refresh()
+            with self._lock:
+                known_areas = len(self.body_areas)
+                records = np.concatenate([self._encode(log) for log in logs])
+                if len(self.body_areas) != known_areas:
+                    self._write_areas()
+            self._append(records)
+
+    def remove(self, log_date: date) -> None:
+        """Record that a log was deleted."""
+        record = np.zeros(1, dtype=SUMMARY_DTYPE)
+        record["date"] = log_date.toordinal()
+        record["deleted"] = 1
+        with self._file_lock:
+            self._refresh()
+            self._append(record)
+
+    def rebuild(self, logs: Iterable[Optional[WorkoutLog]]) -> None:
+        """Replace the whole summary with records for the given logs."""
+        with self._file_lock, self._lock:
+            self.body_areas = []
+            encoded = [self._encode(log) for log in logs if log is not None]
+            records = np.concatenate(encoded) if encoded else np.zeros(0, dtype=SUMMARY_DTYPE)
+            self._write_areas()
+            self._rows = self._latest(records)
+            self._write_all(self._rows)
+
+    def matches(self, dates: List[date]) -> bool:
+        """Check whether the live rows cover exactly the given sorted dates."""
+        ordinals = np.fromiter((d.toordinal() for d in dates), dtype="<i4", count=len(dates))
+        with self._lock:
+            return np.array_equal(self._rows["date"], ordinals)
+
+    def columns(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """
+        Return the live rows as named columns, optionally limited to a date range.
+
+        `date` is returned as datetime64[D]; the other columns keep their
+        stored encoding (see SUMMARY_DTYPE).
+        """
+        with self._lock:
+            rows = self._rows
+
+        if start_date is not None or end_date is not None:
+            lo = 0 if start_date is None else np.searchsorted(rows["date"], start_date.toordinal(), "left")
+            hi = len(rows) if end_date is None else np.searchsorted(rows["date"], end_date.toordinal(), "right")
+            rows = rows[lo:hi]
+
+        columns = {name: rows[name] for name in SUMMARY_DTYPE.names if name != "deleted"}
+        columns["date"] = (rows["date"] - EPOCH_ORDINAL).astype("datetime64[D]")
+        return columns
+
+    def summary(self) -> dict:
+        """Counts and date range for the /stats/summary endpoint."""
+        with self._lock:
+            rows = self._rows
+
+        if len(rows) == 0:
+            return {"total_logs": 0, "date_range": None, "workout_types": {}}
+
+        counts = np.bincount(rows["workout_type"], minlength=len(WORKOUT_TYPES) + 1)
+        return {
+            "total_logs": int(len(rows)),
+            "date_range": {
+                "first": date.fromordinal(int(rows["date"][0])),
+                "last": date.fromordinal(int(rows["date"][-1]))
+            },
+            "workout_types": {
+                WORKOUT_TYPES[code - 1].value: int(count)
+                for code, count in enumerate(counts) if code and count
+            }
+        }
+
+    def _encode(self, log: WorkoutLog) -> np.ndarray:
+        """Encode a log as a single summary record."""
+        record = np.zeros(1, dtype=SUMMARY_DTYPE)
+        record["date"] = log.date.toordinal()
+        record["workout_type"] = _code(log.workout_type, WORKOUT_TYPES)
+        record["perceived_effort"] = _code(log.perceived_effort, EFFORTS)
+        record["fatigue_level"] = log.fatigue_level or 0
+
+        pain = log.pain_or_tightness
+        record["pain_severity"] = _code(pain.severity if pain else None, SEVERITIES)
+
+        run = log.running_data
+        record["distance_km"] = _float(run.distance_km if run else None)
+        record["duration_minutes"] = _float(run.duration_minutes if run else None)
+        record["pace_min_per_km"] = _float(run.pace_min_per_km if run else None)
+
+        exercises = log.exercises or []
+        record["total_sets"] = sum(ex.sets or 0 for ex in exercises)
+        record["total_reps"] = sum((ex.sets or 1) * (ex.reps or 0) for ex in exercises)
+
+        mask = 0
+        for area in (pain.body_areas or []) if pain else []:
+            mask |= 1 << self._area_bit(area)
+        record["pain_areas"] = mask
+
+        return record
+
+    def _area_bit(self, area: str) -> int:
+        """Return the pain_areas bit for a body area, registering new areas."""
+        area = normalize_body_area(area)
+        if area in self.body_areas:
+            return self.body_areas.index(area)
+        if len(self.body_areas) < MAX_BODY_AREAS - 1:
+            self.body_areas.append(area)
+            return len(self.body_areas) - 1
+        if OTHER_AREA not in self.body_areas:
+            self.body_areas.append(OTHER_AREA)
+        return self.body_areas.index(OTHER_AREA)
+
+    def _write_areas(self) -> None:
+        """Persist the body area vocabulary (before any record that uses it)."""
+        tmp_path = self.areas_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.body_areas, f, ensure_ascii=False)
+        os.replace(tmp_path, self.areas_path)
+
+    def _append(self, records: np.ndarray) -> None:
+        """Append records to the sidecar and apply them to the live rows."""
+        with self._lock:
+            if self._record_count == 0:
+                # A new sidecar isn't loadable without its area vocabulary, even an empty one
+                self._write_areas()
+                self._write_all(np.zeros(0, dtype=SUMMARY_DTYPE))
+
+            with open(self.path, 'ab') as f:
+                f.write(records.tobytes())
+            self._record_count += len(records)
+            self._file_key = sidecar_key(self.path)
+
+            rows = self._rows
+            if len(records) > 1:
+                # Merging is cheaper than one insert per record
+                rows = self._latest(np.concatenate([rows, records]))
+            else:
+                record = records[0]
+                ordinal = record["date"]
+                i = int(np.searchsorted(rows["date"], ordinal))
+                exists = i < len(rows) and rows["date"][i] == ordinal
+
+                if record["deleted"]:
+                    if exists:
+                        rows = np.delete(rows, i)
+                elif exists:
+                    rows = rows.copy()
+                    rows[i] = record
+                else:
+                    rows = np.insert(rows, i, record)
+            self._rows = rows
+
+            # Tombstones and superseded records pile up; compact occasionally
+            if self._record_count > len(rows) * 2 + COMPACT_SLACK:
+                self._write_all(rows)
+
+    def _refresh(self) -> bool:
+        """Reload the sidecar if it changed on disk (with the file lock held)."""
+        if sidecar_key(self.path) == self._file_key:
+            return False
+        with self._lock:
+            self._rows = np.zeros(0, dtype=SUMMARY_DTYPE)
+            self._record_count = 0
+            self.body_areas = []
+            self._load()
+        return True
+
+    def _load(self) -> None:
+        """Read the sidecar and resolve the latest record per date (with the file lock held)."""
+        self._file_key = sidecar_key(self.path)
+        try:
+            with open(self.areas_path, 'r', encoding='utf-8') as f:
+                self.body_areas = json.load(f)
+        except (FileNotFoundError, ValueError):
+            # Without the vocabulary the bitmasks are meaningless
+            return
+
+        try:
+            with open(self.path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return
+                records = np.fromfile(f, dtype=SUMMARY_DTYPE)
+        except FileNotFoundError:
+            return
+
+        # A crash mid-append can leave a partial record; cut it off so later
+        # appends stay aligned
+        valid_size = len(MAGIC) + records.nbytes
+        if os.path.getsize(self.path) != valid_size:
+            os.truncate(self.path, valid_size)
+            self._file_key = sidecar_key(self.path)
+
+        self._rows = self._latest(records)
+        self._record_count = len(records)
+
+    @staticmethod
+    def _latest(records: np.ndarray) -> np.ndarray:
+        """Keep the last record per date, drop tombstones, sort by date."""
+        if len(records) == 0:
+            return records
+
+        reversed_records = records[::-1]
+        _, first = np.unique(reversed_records["date"], return_index=True)
+        latest = reversed_records[first]
+        return latest[latest["deleted"] == 0].copy()
+
+    def _write_all(self, rows: np.ndarray) -> None:
+        """Atomically replace the sidecar with the given rows."""
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(rows.tobytes())
+        os.replace(tmp_path, self.path)
+        self._record_count = len(rows)
+        self._file_key = sidecar_key(self.path)
@@ -0,0 +1,250 @@
+"""Per-athlete storage, for hosting many tenants in one process."""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from storage import WorkoutStorage
+from history_retrieval import HistoryRetriever
+from batch_analysis import BatchAnalyzer
+from instrumentation import counter
+
+logger = logging.getLogger(__name__)
+
+# Request header naming the tenant; requests without it use DEFAULT_TENANT
+TENANT_HEADER = "X-Tenant-ID"
+DEFAULT_TENANT = "default"
+
+# Letters, digits, "_", "-" and "." (not leading), so an id is always a safe directory name
+TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+TENANTS_DIR = "tenants"
+
+TENANT_OPENS = counter("workout_tenant_opens", "Tenant storages opened")
+TENANT_EVICTIONS = counter("workout_tenant_evictions", "Tenant storages closed while idle", ["reason"])
+
+
+def tenant_dir(root: Path, tenant_id: str) -> Path:
+    """
+    Data directory of a tenant under `root`.
+
+    Tenants are spread over two levels of 256 directories by a hash of
+    their id (`tenants/3f/a2/<id>`), so no directory lists more than a few
+    entries even with millions of tenants. The default tenant keeps the
+    single-athlete layout directly in `root`.
+    """
+    if tenant_id == DEFAULT_TENANT:
+        return Path(root)
+    digest = hashlib.sha256(tenant_id.encode()).hexdigest()
+    return Path(root) / TENANTS_DIR / digest[:2] / digest[2:4] / tenant_id
+
+
+class Tenant:
+    """One athlete's storage and the services that read it."""
+
+    def __init__(
+        self,
+        tenant_id: str,
+        storage: WorkoutStorage,
+        history_retriever: HistoryRetriever,
+        batch_analyzer: BatchAnalyzer,
+        on_close: Optional[Callable[[], None]] = None
+    ):
+        self.id = tenant_id
+        self.storage = storage
+        self.history_retriever = history_retriever
+        self.batch_analyzer = batch_analyzer
+        self.on_close = on_close
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def retain(self) -> None:
+        """Keep the tenant open until a matching release()."""
+        with self._lock:
+            self.in_use += 1
+            self.last_used = time.monotonic()
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+            self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self.on_close:
+            self.on_close()
+        self.storage.close()
+
+
+class TenantRegistry:
+    """
+    Opens tenants on demand and closes idle ones.
+
+    At most `max_open` tenants stay open: when another one is opened, the
+    least recently used tenants that no request or background job is
+    holding are closed, as are tenants idle for longer than
+    `idle_seconds`. Caches, summaries and search indexes live with a
+    tenant's storage, so memory grows with the number of active tenants,
+    not with the number of tenants on disk.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        open_tenant: Callable[[str, Path], Tenant],
+        max_open: int = 64,
+        idle_seconds: float = 900.0,
+        multi_tenant: bool = True
+    ):
+        """Initialize with the data root and a function building a tenant from its id and directory."""
+        self.root = Path(root)
+        self.open_tenant = open_tenant
+        self.max_open = max(1, max_open)
+        self.idle_seconds = idle_seconds
+        self.multi_tenant = multi_tenant
+
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+        self._opening: Dict[str, threading.Event] = {}
+        self._closing: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def validate(self, tenant_id: Optional[str]) -> str:
+        """The tenant id to use for a header value; ValueError if it is not allowed."""
+        if not tenant_id:
+            return DEFAULT_TENANT
+        if not TENANT_ID_PATTERN.fullmatch(tenant_id):
+            raise ValueError(f"Invalid tenant id {tenant_id!r}")
+        if tenant_id != DEFAULT_TENANT and not self.multi_tenant:
+            raise ValueError("Multi-tenancy is disabled (set MULTI_TENANT=1)")
+        return tenant_id
+
+    def acquire(self, tenant_id: str) -> Tenant:
+        """
+        Open (or reuse) a tenant and retain it; release it when done.
+
+        Tenants are opened and closed outside the registry lock, so a slow
+        one (journal replay, index loading, checkpoints) only holds up
+        requests for that same tenant.
+        """
+        while True:
+            with self._lock:
+                tenant = self._tenants.get(tenant_id)
+                if tenant is not None:
+                    self._tenants.move_to_end(tenant_id)
+                    tenant.retain()
+                    evicted = self._evict()
+                    break
+
+                # Wait for another request opening it, or for its previous storage to close
+                busy = self._opening.get(tenant_id) or self._closing.get(tenant_id)
+                if busy is None:
+                    opening = self._opening[tenant_id] = threading.Event()
+            if busy is not None:
+                busy.wait()
+                continue
+
+            try:
+                tenant = self.open_tenant(tenant_id, tenant_dir(self.root, tenant_id))
+            except BaseException:
+                with self._lock:
+                    del self._opening[tenant_id]
+                opening.set()
+                raise
+            TENANT_OPENS.inc()
+
+            with self._lock:
+                del self._opening[tenant_id]
+                self._tenants[tenant_id] = tenant
+                tenant.retain()
+                evicted = self._evict()
+            opening.set()
+            break
+
+        self._close(evicted)
+        return tenant
+
+    def _evict(self) -> List[Tenant]:
+        """
+        Remove idle tenants beyond max_open or unused for idle_seconds, oldest
+        first, and return them for _close (called with the lock held).
+        """
+        now = time.monotonic()
+        evicted = []
+        for tenant in list(self._tenants.values()):
+            over_limit = len(self._tenants) > self.max_open
+            expired = now - tenant.last_used > self.idle_seconds
+            if not over_limit and not expired:
+                break
+            if tenant.in_use:
+                continue
+            del self._tenants[tenant.id]
+            self._closing[tenant.id] = threading.Event()
+            evicted.append(tenant)
+            TENANT_EVICTIONS.inc(reason="limit" if over_limit else "idle")
+        return evicted
+
+    def _close(self, tenants: List[Tenant]) -> None:
+        """Close evicted tenants (without the lock held), then let them be reopened."""
+        for tenant in tenants:
+            try:
+                tenant.close()
+            except Exception:
+                logger.exception("Closing tenant %s failed", tenant.id)
+            finally:
+                with self._lock:
+                    closed = self._closing.pop(tenant.id)
+                closed.set()
+
+    def open_tenants(self) -> List[Tenant]:
+        """The tenants currently open, least recently used first."""
+        with self._lock:
+            return list(self._tenants.values())
+
+    def info(self) -> dict:
+        """Open tenant count and limits."""
+        with self._lock:
+            return {
+                "open": len(self._tenants),
+                "in_use": sum(1 for tenant in self._tenants.values() if tenant.in_use),
+                "max_open": self.max_open,
+                "idle_seconds": self.idle_seconds,
+            }
+
+    def close(self) -> None:
+        """Close every open tenant."""
+        with self._lock:
+            tenants, self._tenants = list(self._tenants.values()), OrderedDict()
+            for tenant in tenants:
+                self._closing[tenant.id] = threading.Event()
+        self._close(tenants)
+
+
+class TenantMiddleware:
+    """
+    Releases the tenant a request acquired (stored as `request.state.tenant`)
+    once the response has been sent, so streamed exports and analyses keep
+    their tenant open until the last chunk.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            tenant = state.pop("tenant", None)
+            if tenant is not None:
+                tenant.release()
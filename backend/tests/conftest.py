@@ -0,0 +1,72 @@
+"""Shared fixtures: a storage in a temporary directory, a log factory, a fake-backed analyzer and an API client."""
+
+import os
+import sys
+import uuid
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import WorkoutLog  # noqa: E402
+from storage import WorkoutStorage  # noqa: E402
+
+
+@pytest.fixture
+def make_log():
+    """Build a valid WorkoutLog for a date (ISO string or date), overriding any fields."""
+    def make(log_date, **fields) -> WorkoutLog:
+        if isinstance(log_date, str):
+            log_date = date.fromisoformat(log_date)
+        fields.setdefault("workout_type", "strength")
+        return WorkoutLog(date=log_date, **fields)
+
+    return make
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """A JSON file storage in a fresh data directory."""
+    storage = WorkoutStorage(data_dir=tmp_path)
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    """A ClaudeAnalyzer on canned fake clients (their requests are in `.messages.calls`) with a result cache."""
+    from ai_service import ClaudeAnalyzer
+    from analysis_cache import AnalysisCache
+    from fake_anthropic import FakeAnthropic, FakeAsyncAnthropic
+
+    return ClaudeAnalyzer(
+        api_key=None,
+        client=FakeAnthropic(),
+        async_client=FakeAsyncAnthropic(),
+        cache=AnalysisCache(tmp_path / "analysis-cache")
+    )
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """The FastAPI app, imported with its data in a temporary directory and canned Claude responses."""
+    os.environ.update({
+        "DATA_DIR": str(tmp_path_factory.mktemp("data")),
+        "ANTHROPIC_FAKE": "1",
+        "MULTI_TENANT": "1",
+        "LOG_WATCH": "0",
+        "STARTUP_WARMUP": "0",
+    })
+    import main
+    return main
+
+
+@pytest.fixture
+def client(app):
+    """A test client sending a tenant header unique to the test, so tests don't share logs."""
+    from fastapi.testclient import TestClient
+
+    with TestClient(app.app, headers={"X-Tenant-ID": f"test-{uuid.uuid4().hex[:12]}"}) as client:
+        yield client
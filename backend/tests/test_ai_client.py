@@ -0,0 +1,192 @@
+"""Retries, deadlines, the circuit breaker and model fallback around Claude API calls."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ai_client import CLOSED, HALF_OPEN, OPEN, AIUnavailableError, CircuitBreaker, RetryPolicy
+
+
+class APIError(Exception):
+    """An SDK-style error carrying an HTTP status and optional retry-after header."""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+def run(attempts, outcomes):
+    """Drive a call's attempts, raising the next outcome (or succeeding) each time; returns the models tried."""
+    tried = []
+    outcomes = iter(outcomes)
+    for attempt in attempts:
+        with attempt:
+            tried.append(attempt.model)
+            outcome = next(outcomes, None)
+            if outcome is not None:
+                raise outcome
+    return tried
+
+
+def policy(**settings):
+    settings.setdefault("base_delay", 0.0)
+    settings.setdefault("min_attempt_seconds", 0.0)
+    return RetryPolicy(**settings)
+
+
+def test_transient_errors_are_retried_until_success():
+    attempts = policy().attempts(["main"])
+
+    assert run(attempts, [APIError(529), APIError(429)]) == ["main", "main", "main"]
+    assert attempts.model == "main"
+
+
+def test_errors_that_arent_transient_propagate_at_once():
+    attempts = policy().attempts(["main", "fallback"])
+
+    with pytest.raises(APIError):
+        run(attempts, [APIError(400)])
+    assert attempts._tries == 1
+
+
+def test_falls_back_once_a_models_attempts_are_used_up():
+    attempts = policy(max_attempts=2).attempts(["main", "fallback"])
+
+    assert run(attempts, [APIError(503), APIError(503)]) == ["main", "main", "fallback"]
+    assert attempts.model == "fallback"
+
+
+def test_unavailable_when_every_model_fails_with_the_servers_retry_hint():
+    attempts = policy(max_attempts=1).attempts(["main", "fallback"])
+
+    with pytest.raises(AIUnavailableError) as raised:
+        run(attempts, [APIError(529, retry_after=7)] * 2)
+    assert raised.value.retry_after == 7
+    assert isinstance(raised.value.__cause__, APIError)
+
+
+def test_no_retry_is_waited_for_that_the_deadline_cant_fit():
+    retry = policy(deadline=0.2, min_attempt_seconds=0.1)
+    retry.backoff = lambda attempt: 0.15
+    attempts = retry.attempts(["main"])
+    started = time.monotonic()
+
+    with pytest.raises(AIUnavailableError):
+        run(attempts, [APIError(500)] * 10)
+    assert time.monotonic() - started < 0.1
+    assert attempts._tries == 1
+
+
+def test_attempt_timeouts_are_capped_by_the_time_left():
+    attempts = policy(deadline=5.0, attempt_timeout=60.0).attempts(["main"])
+
+    assert next(iter(attempts)).timeout <= 5.0
+
+
+def test_committed_attempts_are_not_retried():
+    attempts = policy().attempts(["main"])
+
+    with pytest.raises(APIError):
+        for attempt in attempts:
+            with attempt:
+                attempt.commit()
+                raise APIError(529)
+
+
+def test_breaker_opens_after_repeated_failures_and_lets_one_trial_through():
+    breaker = CircuitBreaker("main", failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_a_failed_trial_opens_the_breaker_again():
+    breaker = CircuitBreaker("main", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+
+def test_open_breakers_are_skipped_for_the_fallback():
+    retry = policy(breaker_failures=1, breaker_reset_seconds=30)
+    retry.breaker("main").record_failure()
+
+    assert run(retry.attempts(["main", "fallback"]), []) == ["fallback"]
+    with pytest.raises(AIUnavailableError) as raised:
+        run(retry.attempts(["main"]), [])
+    assert 0 < raised.value.retry_after <= 30
+
+
+def test_async_attempts_retry_the_same_way():
+    async def call():
+        attempts = policy(max_attempts=1).attempts(["main", "fallback"])
+        tried = []
+        async for attempt in attempts:
+            with attempt:
+                tried.append(attempt.model)
+                if attempt.model == "main":
+                    raise TimeoutError()
+        return tried, attempts.model
+
+    assert asyncio.run(call()) == (["main", "fallback"], "fallback")
+
+
+def test_fallback_answers_are_returned_but_not_cached(analyzer, make_log):
+    analyzer.fast_model = "fast-model"
+    analyzer.policy = policy(max_attempts=1)
+    log = make_log("2025-03-01")
+    routed = analyzer.route(log)
+    messages = analyzer.client.messages
+    create = messages.create
+
+    def create_unless_routed(**kwargs):
+        if kwargs["model"] == routed:
+            raise APIError(529)
+        return create(**kwargs)
+
+    messages.create = create_unless_routed
+
+    analysis = analyzer.analyze_workout(log, [])
+    assert analysis.model != routed
+
+    analyzer.analyze_workout(log, [])
+    assert len(messages.calls) == 2
+
+
+def test_a_cancelled_trial_leaves_the_breaker_half_open_for_another_trial():
+    retry = policy(breaker_failures=1, breaker_reset_seconds=0.05)
+    breaker = retry.breaker("main")
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    async def trial():
+        async for attempt in retry.attempts(["main"]):
+            with attempt:
+                await asyncio.sleep(10)
+
+    async def cancel_trial():
+        task = asyncio.create_task(trial())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
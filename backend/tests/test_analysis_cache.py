@@ -0,0 +1,102 @@
+"""The content-addressed cache of AI analyses."""
+
+import os
+import threading
+import time
+
+from analysis_cache import AnalysisCache
+from models import AIAnalysis, MachineContext
+
+
+def analysis(text="Fine"):
+    return AIAnalysis(human_insight=text, machine_context=MachineContext())
+
+
+def test_identical_requests_are_answered_from_the_cache(analyzer, make_log):
+    log = make_log("2025-01-01", free_text_reflection="Felt strong")
+    history = [make_log("2024-12-31")]
+
+    first = analyzer.analyze_workout(log, history)
+    second = analyzer.analyze_workout(log, history)
+
+    assert len(analyzer._client.messages.calls) == 1
+    assert second.human_insight == first.human_insight
+
+
+def test_changed_inputs_or_refresh_call_the_api_again(analyzer, make_log):
+    log = make_log("2025-01-01", free_text_reflection="Felt strong")
+    analyzer.analyze_workout(log)
+
+    analyzer.analyze_workout(log.model_copy(update={"free_text_reflection": "Felt tired"}))
+    analyzer.analyze_workout(log, [make_log("2024-12-31")])
+    analyzer.analyze_workout(log, use_cache=False)
+
+    assert len(analyzer._client.messages.calls) == 4
+
+
+def test_keys_cover_the_prompt_version():
+    request = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+    assert AnalysisCache.make_key(request, "1") == AnalysisCache.make_key(dict(reversed(request.items())), "1")
+    assert AnalysisCache.make_key(request, "1") != AnalysisCache.make_key(request, "2")
+
+
+def test_expired_and_corrupt_entries_are_misses(tmp_path):
+    cache = AnalysisCache(tmp_path, max_age_days=1)
+    cache.put("aa01", analysis())
+    cache.put("bb02", analysis())
+
+    old = time.time() - 2 * 86400
+    os.utime(cache._path("aa01"), (old, old))
+    cache._path("bb02").write_text("{not json")
+
+    assert cache.get("aa01") is None
+    assert cache.get("bb02") is None
+    assert not cache._path("aa01").exists() and not cache._path("bb02").exists()
+
+
+def test_the_oldest_entries_are_evicted_beyond_max_entries(tmp_path):
+    cache = AnalysisCache(tmp_path, max_entries=3)
+    for i in range(4):
+        key = f"{i:02d}ff"
+        cache.put(key, analysis(str(i)))
+        stamp = time.time() - 100 + i
+        os.utime(cache._path(key), (stamp, stamp))
+    cache.put("04ff", analysis("4"))
+
+    assert [cache.get(f"{i:02d}ff") is not None for i in range(5)] == [False, False, True, True, True]
+
+
+def test_a_full_cache_is_scanned_once_per_tenth_of_its_size(tmp_path, monkeypatch):
+    cache = AnalysisCache(tmp_path, max_entries=100)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1) or evict())
+
+    for i in range(300):
+        cache.put(f"{i:04x}", analysis(str(i)))
+
+    assert len(scans) <= 21
+    assert 90 <= sum(1 for _ in tmp_path.glob("*/*.json")) <= 100
+
+
+def test_concurrent_writers_of_an_entry_all_succeed(tmp_path):
+    cache = AnalysisCache(tmp_path)
+    errors = []
+
+    def store():
+        try:
+            for _ in range(50):
+                cache.put("abcd", analysis())
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=store) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert cache.get("abcd").human_insight == "Fine"
+    assert list(tmp_path.glob("*/*.tmp")) == [] and list(tmp_path.glob("*/.*")) == []
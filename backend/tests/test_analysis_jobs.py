@@ -0,0 +1,91 @@
+"""The background analysis job queue."""
+
+import asyncio
+import sys
+import threading
+from datetime import date
+
+from analysis_jobs import AnalysisJobQueue
+from models import AIAnalysis, JobStatus, MachineContext
+
+
+class StubTenant:
+    def __init__(self, tenant_id, storage=None):
+        self.id = tenant_id
+        self.storage = storage
+        self.retained = 0
+
+    def retain(self):
+        self.retained += 1
+
+    def release(self):
+        self.retained -= 1
+
+
+class StubAnalyzer:
+    async def analyze_workout_async(self, log, history_logs=None, use_cache=True, related_logs=None):
+        return AIAnalysis(human_insight=f"Analysis of {log.date}", machine_context=MachineContext())
+
+
+def test_jobs_run_and_are_only_visible_to_their_tenant(storage, make_log):
+    from history_retrieval import HistoryRetriever
+
+    storage.save_log(make_log("2025-01-01"))
+    tenant = StubTenant("a", storage)
+    tenant.history_retriever = HistoryRetriever(storage)
+    finished = []
+
+    async def run():
+        queue = AnalysisJobQueue(StubAnalyzer(), on_finished=lambda tenant_id, job: finished.append(tenant_id))
+        await queue.start()
+        job = queue.submit(tenant, date(2025, 1, 1))
+        missing = queue.submit(tenant, date(2025, 1, 2))
+        while len(finished) < 2:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue, job, missing
+
+    queue, job, missing = asyncio.run(run())
+
+    assert queue.get(job.id, "a").status == JobStatus.SUCCEEDED
+    assert queue.get(missing.id, "a").status == JobStatus.FAILED
+    assert queue.get(job.id, "b") is None
+    assert storage.get_log(date(2025, 1, 1)).ai_analysis.human_insight == "Analysis of 2025-01-01"
+    assert tenant.retained == 0
+
+
+def test_concurrent_submits_from_threads_keep_the_job_table_consistent():
+    threads_count, per_thread = 8, 400
+    errors = []
+
+    async def run():
+        # No workers: jobs are marked finished by hand so every submit has some to prune
+        queue = AnalysisJobQueue(StubAnalyzer(), concurrency=0, max_finished_jobs=50)
+        await queue.start()
+
+        def submit_many(tenant_id):
+            tenant = StubTenant(tenant_id)
+            try:
+                for _ in range(per_thread):
+                    job = queue.submit(tenant, date(2025, 1, 1))
+                    job.status = JobStatus.SUCCEEDED
+                    queue.get(job.id, tenant_id)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=submit_many, args=(f"t{i}",)) for i in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        await asyncio.to_thread(lambda: [thread.join() for thread in threads])
+        return queue
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        queue = asyncio.run(run())
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    assert len(queue._jobs) == len(queue._owners) <= 50 + threads_count
+    assert set(queue._jobs) == set(queue._owners)
@@ -0,0 +1,47 @@
+"""HTTP API: log CRUD, conditional requests and tenant selection."""
+
+import asyncio
+
+from fastapi import HTTPException
+
+LOG = {"date": "2025-03-01", "workout_type": "strength", "fatigue_level": 4}
+
+
+def test_create_read_update_and_delete_a_log(client):
+    created = client.post("/logs", json=LOG)
+    assert created.status_code == 201
+    assert created.json()["metadata"]["version"] == 1
+
+    assert client.post("/logs", json=LOG).status_code == 409
+    assert client.get("/logs/2025-03-01").json()["fatigue_level"] == 4
+
+    updated = client.put("/logs/2025-03-01", json={**LOG, "fatigue_level": 6})
+    assert updated.json()["fatigue_level"] == 6
+    assert updated.json()["metadata"]["version"] == 2
+
+    assert client.delete("/logs/2025-03-01").status_code == 204
+    assert client.get("/logs/2025-03-01").status_code == 404
+
+
+def test_tenants_see_only_their_own_logs(client):
+    client.post("/logs", json=LOG)
+
+    other = client.get("/logs/dates", headers={"X-Tenant-ID": "someone-else"})
+    assert "2025-03-01" not in other.json()
+    assert client.get("/logs/dates").json() == ["2025-03-01"]
+
+    assert client.get("/logs/dates", headers={"X-Tenant-ID": "../up"}).status_code == 400
+
+
+def test_events_resolves_the_tenant_off_the_event_loop(client, app, monkeypatch):
+    calls = []
+
+    def acquire(tenant_id):
+        calls.append(asyncio._get_running_loop())
+        raise HTTPException(503, "stop here")
+
+    monkeypatch.setattr(app.tenants, "acquire", acquire)
+    assert client.get("/events").status_code == 503
+    assert calls == [None]
+
+    assert client.get("/events", params={"tenant": "../up"}, headers={"X-Tenant-ID": ""}).status_code == 400
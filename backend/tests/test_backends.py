@@ -0,0 +1,91 @@
+"""The JSON file and SQLite backends behave the same behind WorkoutStorage."""
+
+import json
+from datetime import date
+
+import pytest
+
+import sqlite_backend
+from storage import SQLITE_FILE, WorkoutStorage
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend_storage(request, tmp_path):
+    storage = WorkoutStorage(data_dir=tmp_path, backend=request.param)
+    yield storage
+    storage.close()
+
+
+def seed(storage, make_log):
+    storage.save_logs([
+        make_log("2025-01-01", fatigue_level=3),
+        make_log("2025-01-02", workout_type="run", fatigue_level=7,
+                 pain_or_tightness={"body_areas": ["Left Calf"], "description": "tight"}),
+        make_log("2025-01-03", fatigue_level=8,
+                 pain_or_tightness={"body_areas": ["left calf ", "hip"], "description": "sore"}),
+    ])
+
+
+def test_crud_and_ranges(backend_storage, make_log):
+    seed(backend_storage, make_log)
+
+    assert backend_storage.list_all_dates() == [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)]
+    assert [log.date.day for log in backend_storage.get_logs_range(date(2025, 1, 2), date(2025, 1, 9))] == [2, 3]
+    assert json.loads(backend_storage.get_log_json(date(2025, 1, 2)))["workout_type"] == "run"
+
+    assert backend_storage.delete_log(date(2025, 1, 2))
+    assert not backend_storage.delete_log(date(2025, 1, 2))
+    assert backend_storage.get_log(date(2025, 1, 2)) is None
+    assert backend_storage.list_all_dates() == [date(2025, 1, 1), date(2025, 1, 3)]
+
+
+@pytest.mark.parametrize("filters, days", [
+    ({"workout_type": "run"}, [2]),
+    ({"body_area": "LEFT CALF"}, [2, 3]),
+    ({"body_area": "hip", "min_fatigue": 8}, [3]),
+    ({"min_fatigue": 7, "end_date": date(2025, 1, 2)}, [2]),
+])
+def test_filters(backend_storage, make_log, filters, days):
+    seed(backend_storage, make_log)
+
+    assert [log.date.day for log in backend_storage.find_logs(**filters)] == days
+    assert [log["date"] for log in json.loads(backend_storage.find_logs_json(**filters))] == [
+        f"2025-01-0{day}" for day in days
+    ]
+
+
+def test_updated_pain_areas_replace_the_old_ones(backend_storage, make_log):
+    seed(backend_storage, make_log)
+    backend_storage.save_log(make_log("2025-01-03"))
+
+    assert [log.date.day for log in backend_storage.find_logs(body_area="hip")] == []
+
+
+def test_pain_without_body_areas(backend_storage, make_log):
+    seed(backend_storage, make_log)
+    backend_storage.save_log(make_log("2025-01-04", pain_or_tightness={"body_areas": None, "description": "stiff"}))
+
+    assert backend_storage.get_log(date(2025, 1, 4)).pain_or_tightness.body_areas is None
+    assert [log.date.day for log in backend_storage.find_logs(body_area="hip")] == [3]
+
+
+def test_sqlite_exports_every_page(tmp_path, make_log, monkeypatch):
+    monkeypatch.setattr(sqlite_backend, "PAGE_SIZE", 2)
+    storage = WorkoutStorage(data_dir=tmp_path, backend="sqlite")
+    storage.save_logs([make_log(f"2025-01-{day:02d}") for day in range(1, 6)])
+
+    assert [d.day for d, _ in storage.iter_raw_logs(date(2025, 1, 2))] == [2, 3, 4, 5]
+    storage.close()
+
+
+def test_sqlite_sees_writes_from_another_connection(tmp_path, make_log):
+    a = WorkoutStorage(data_dir=tmp_path, backend="sqlite")
+    b = WorkoutStorage(data_dir=tmp_path, backend="sqlite")
+    assert b.list_all_dates() == []
+
+    a.save_log(make_log("2025-01-01"))
+
+    assert b.list_all_dates() == [date(2025, 1, 1)]
+    assert (tmp_path / SQLITE_FILE).exists()
+    a.close()
+    b.close()
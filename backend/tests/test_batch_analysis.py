@@ -0,0 +1,101 @@
+"""Batch re-analysis: bounded concurrency, cancellation and per-batch checkpoints."""
+
+import asyncio
+from datetime import date, timedelta
+
+from batch_analysis import BatchAnalyzer
+from models import AIAnalysis, MachineContext
+
+
+class StubAnalyzer:
+    """Answers after `release` is set (immediately if None), recording concurrency and cancellations."""
+
+    model = "stub"
+
+    def __init__(self, release=None, fail=()):
+        self.release = release
+        self.fail = set(fail)
+        self.running = self.max_running = self.started = self.cancelled = 0
+
+    def is_outdated(self, analysis, log_version=None):
+        return True
+
+    async def analyze_workout_async(self, log, history_logs=None, use_cache=True, related_logs=None):
+        self.started += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            if self.release is not None and log.date != date(2025, 1, 1):
+                await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+        if log.date in self.fail:
+            raise RuntimeError("analysis failed")
+        return AIAnalysis(human_insight=f"Analysis of {log.date}", machine_context=MachineContext())
+
+
+def seed(storage, make_log, days, start=date(2025, 1, 1)):
+    for offset in range(days):
+        storage.save_log(make_log(start + timedelta(days=offset)))
+
+
+async def collect(batch, **kwargs):
+    return [result async for result in batch.run(**kwargs)]
+
+
+def test_no_more_than_concurrency_analyses_run_at_once(storage, make_log):
+    seed(storage, make_log, 12)
+    analyzer = StubAnalyzer()
+    batch = BatchAnalyzer(storage, analyzer, concurrency=3, requests_per_minute=0)
+
+    results = asyncio.run(collect(batch))
+
+    assert results[-1] == {"summary": {"analyzed": 12, "failed": 0, "skipped": 0}}
+    assert analyzer.max_running == 3
+    assert storage.get_log(date(2025, 1, 12)).ai_analysis.human_insight == "Analysis of 2025-01-12"
+    assert not list(batch.checkpoint_dir.glob("*.json"))
+
+
+def test_closing_the_stream_cancels_outstanding_analyses(storage, make_log):
+    seed(storage, make_log, 20)
+
+    async def first_then_close():
+        analyzer = StubAnalyzer(release=asyncio.Event())
+        batch = BatchAnalyzer(storage, analyzer, concurrency=4, requests_per_minute=0)
+        stream = batch.run()
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+        cancelled = analyzer.cancelled
+        analyzer.release.set()
+        return first, analyzer, cancelled
+
+    first, analyzer, cancelled = asyncio.run(first_then_close())
+
+    assert first["date"] == "2025-01-01"
+    assert analyzer.started <= 5
+    assert cancelled == analyzer.started - 1
+
+
+def test_batches_with_different_parameters_keep_their_own_checkpoints(storage, make_log):
+    seed(storage, make_log, 6)
+    january_2 = date(2025, 1, 2)
+
+    failing = BatchAnalyzer(storage, StubAnalyzer(fail={january_2}), requests_per_minute=0)
+    results = asyncio.run(collect(failing, start_date=date(2025, 1, 1), end_date=date(2025, 1, 3)))
+    assert results[-1]["summary"]["failed"] == 1
+
+    other = BatchAnalyzer(storage, StubAnalyzer(), requests_per_minute=0)
+    asyncio.run(collect(other, start_date=date(2025, 1, 4), end_date=date(2025, 1, 6)))
+
+    retry = StubAnalyzer()
+    batch = BatchAnalyzer(storage, retry, requests_per_minute=0)
+    results = asyncio.run(collect(batch, start_date=date(2025, 1, 1), end_date=date(2025, 1, 3)))
+
+    assert [r["date"] for r in results[:-1]] == ["2025-01-02"]
+    assert results[-1] == {"summary": {"analyzed": 1, "failed": 0, "skipped": 2}}
+    assert not list(batch.checkpoint_dir.glob("*.json"))
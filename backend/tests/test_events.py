@@ -0,0 +1,114 @@
+"""The GET /events broker: per-tenant fan-out, Last-Event-ID replay and resets."""
+
+import asyncio
+import json
+
+from events import EventBroker
+
+
+def drain(subscription):
+    """(type, data) of the events queued for a subscription."""
+    events = []
+    while not subscription.queue.empty():
+        event = subscription.queue.get_nowait()
+        events.append((event.type, json.loads(event.data)))
+    return events
+
+
+async def settle():
+    """Let call_soon_threadsafe deliveries run."""
+    await asyncio.sleep(0)
+
+
+def test_events_reach_only_their_tenants_subscribers():
+    async def scenario():
+        broker = EventBroker()
+        broker.start()
+        alice, bob = broker.subscribe("alice"), broker.subscribe("bob")
+
+        broker.publish("alice", "log", {"date": "2025-03-01"})
+        await settle()
+        return drain(alice), drain(bob), broker.info()
+
+    alice, bob, info = asyncio.run(scenario())
+    assert alice == [("log", {"date": "2025-03-01"})]
+    assert bob == []
+    assert info == {"subscribers": 2, "history": 1}
+
+
+def test_reconnecting_clients_get_the_events_they_missed():
+    async def scenario():
+        broker = EventBroker()
+        broker.start()
+        broker.publish("alice", "log", {"date": "2025-03-01"})
+        seen = f"{broker.epoch}-1"
+        broker.publish("bob", "log", {"date": "2025-03-02"})
+        broker.publish("alice", "deleted", {"date": "2025-03-03"})
+        return drain(broker.subscribe("alice", seen))
+
+    assert asyncio.run(scenario()) == [("deleted", {"date": "2025-03-03"})]
+
+
+def test_ids_from_another_process_or_past_the_history_get_a_reset():
+    async def scenario():
+        broker = EventBroker(history_size=2)
+        broker.start()
+        for day in range(1, 5):
+            broker.publish("alice", "log", {"date": f"2025-03-0{day}"})
+        return [
+            drain(broker.subscribe("alice", last_event_id))
+            for last_event_id in ("0badf00d-3", f"{broker.epoch}-1", f"{broker.epoch}-9", "garbage", f"{broker.epoch}-2")
+        ]
+
+    stale, too_old, ahead, garbage, recent = asyncio.run(scenario())
+    assert stale == too_old == ahead == garbage == [("reset", {})]
+    assert recent == [("log", {"date": "2025-03-03"}), ("log", {"date": "2025-03-04"})]
+
+
+def test_subscribers_that_fall_too_far_behind_get_a_reset():
+    async def scenario():
+        broker = EventBroker(queue_size=3)
+        broker.start()
+        subscription = broker.subscribe("alice")
+        for day in range(1, 6):
+            broker.publish("alice", "log", {"date": f"2025-03-0{day}"})
+        await settle()
+        first = drain(subscription)
+
+        broker.publish("alice", "log", {"date": "2025-03-06"})
+        await settle()
+        return first, drain(subscription)
+
+    first, after = asyncio.run(scenario())
+    assert [event_type for event_type, _ in first] == ["reset", "log"]
+    assert after == [("log", {"date": "2025-03-06"})]
+
+
+def test_storage_changes_are_published_as_log_and_deleted_events(storage, make_log):
+    async def scenario():
+        broker = EventBroker()
+        broker.start()
+        subscription = broker.subscribe("alice")
+        storage.add_listener(broker.storage_listener("alice"))
+
+        storage.save_log(make_log("2025-03-01"))
+        storage.delete_log(make_log("2025-03-01").date)
+        await settle()
+        return drain(subscription)
+
+    saved, deleted = asyncio.run(scenario())
+    assert saved[0] == "log" and saved[1]["date"] == "2025-03-01" and saved[1]["source"] == "api"
+    assert deleted == ("deleted", {"date": "2025-03-01", "source": "api"})
+
+
+def test_unsubscribed_streams_stop_receiving():
+    async def scenario():
+        broker = EventBroker()
+        broker.start()
+        subscription = broker.subscribe("alice")
+        broker.unsubscribe(subscription)
+        broker.publish("alice", "log", {"date": "2025-03-01"})
+        await settle()
+        return drain(subscription), broker.info()["subscribers"]
+
+    assert asyncio.run(scenario()) == ([], 0)
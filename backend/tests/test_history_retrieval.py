@@ -0,0 +1,62 @@
+"""Choosing the recent and related history sent with an analysis."""
+
+from datetime import date
+
+from ai_service import history_row_tokens
+from history_retrieval import HistoryRetriever
+
+KNEE = {"body_areas": ["Left Knee"], "description": "sore"}
+
+
+def seed(storage, make_log):
+    storage.save_logs([
+        make_log("2024-06-01", workout_type="run", pain_or_tightness=KNEE),
+        make_log("2024-07-01", workout_type="run"),
+        make_log("2024-08-01", exercises=[{"name": "Back Squat"}]),
+        make_log("2024-09-01", workout_type="run"),
+        make_log("2025-01-08"),
+        make_log("2025-01-09", workout_type="run"),
+    ])
+
+
+def current(make_log):
+    return make_log("2025-01-10", exercises=[{"name": "back squat"}], pain_or_tightness=KNEE)
+
+
+def test_recent_window_and_related_older_logs(storage, make_log):
+    seed(storage, make_log)
+
+    recent, related = HistoryRetriever(storage).select(current(make_log), 7)
+
+    assert [log.date for log in recent] == [date(2025, 1, 8), date(2025, 1, 9)]
+    assert [log.date for log in related] == [date(2024, 6, 1), date(2024, 8, 1)]
+
+
+def test_areas_outrank_exercises_which_outrank_types(storage, make_log):
+    seed(storage, make_log)
+
+    ranked = HistoryRetriever(storage).rank(current(make_log), date(2025, 1, 3))
+
+    assert ranked[:2] == [date(2024, 6, 1), date(2024, 8, 1)]
+    assert date(2024, 9, 1) not in ranked
+
+
+def test_related_logs_are_capped_and_sorted_oldest_first(storage, make_log):
+    seed(storage, make_log)
+
+    _, related = HistoryRetriever(storage, max_related=1).select(current(make_log), 7)
+    assert [log.date for log in related] == [date(2024, 6, 1)]
+
+    _, related = HistoryRetriever(storage, max_related=0).select(current(make_log), 7)
+    assert related == []
+
+
+def test_the_token_budget_drops_the_oldest_recent_logs_first(storage, make_log):
+    seed(storage, make_log)
+    log = current(make_log)
+    budget = history_row_tokens(storage.get_log(date(2025, 1, 9)))
+
+    recent, related = HistoryRetriever(storage, token_budget=budget).select(log, 7)
+
+    assert [prior.date for prior in recent] == [date(2025, 1, 9)]
+    assert related == []
@@ -0,0 +1,70 @@
+"""ETags, conditional GETs and response compression."""
+
+import gzip
+
+import pytest
+
+import compression
+from compression import choose_encoding
+
+LOG = {"date": "2025-03-01", "workout_type": "strength", "fatigue_level": 4}
+RANGE = {"start_date": "2025-01-01", "end_date": "2025-12-31"}
+
+
+def test_unchanged_logs_get_an_empty_304(client):
+    client.post("/logs", json=LOG)
+    first = client.get("/logs/2025-03-01")
+    etag = first.headers["etag"]
+
+    again = client.get("/logs/2025-03-01", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert (again.status_code, again.content) == (304, b"")
+    assert again.headers["etag"] == etag
+
+    client.put("/logs/2025-03-01", json={**LOG, "fatigue_level": 5})
+    assert client.get("/logs/2025-03-01", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_list_etags_change_with_any_log_in_the_selection(client):
+    client.post("/logs", json=LOG)
+    etag = client.get("/logs", params=RANGE).headers["etag"]
+    assert client.get("/logs", params=RANGE, headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/logs", json={**LOG, "date": "2025-03-02"})
+    assert client.get("/logs", params=RANGE, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_large_bodies_are_gzipped_and_small_ones_left_alone(client):
+    for day in range(1, 29):
+        client.post("/logs", json={**LOG, "date": f"2025-02-{day:02d}", "free_text_reflection": "easy day " * 5})
+
+    large = client.get("/logs", params=RANGE, headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in large.headers["vary"].lower()
+    assert len(large.json()) == 28
+
+    small = client.get("/logs/2025-02-01", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    export = client.get("/logs/export", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in export.headers
+    assert len(export.text.splitlines()) == 28
+
+
+@pytest.mark.parametrize("header, with_brotli, expected", [
+    ("gzip, deflate", False, "gzip"),
+    ("br;q=1.0, gzip;q=0.5", False, "gzip"),
+    ("br, gzip", True, "br"),
+    ("gzip;q=0", False, None),
+    ("*", False, "gzip"),
+    ("identity", True, None),
+])
+def test_encoding_negotiation(monkeypatch, header, with_brotli, expected):
+    monkeypatch.setattr(compression, "brotli", object() if with_brotli else None)
+
+    assert choose_encoding(header) == expected
+
+
+def test_gzip_round_trips():
+    body = b'{"a": 1}' * 500
+
+    assert gzip.decompress(compression.compress(body, "gzip")) == body
@@ -0,0 +1,75 @@
+"""Prometheus-format metrics, per-route request timing and opt-in traces."""
+
+import json
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from instrumentation import Counter, Histogram, InstrumentationMiddleware, counter, histogram
+
+
+def unique(name):
+    return f"test_{name}_{uuid.uuid4().hex[:8]}"
+
+
+def test_counters_render_per_label_set():
+    requests = Counter("hits", "Hits", ["path"])
+    requests.inc(path="/a")
+    requests.inc(2, path='/"b"\n')
+
+    assert requests.render() == [
+        "# HELP hits Hits",
+        "# TYPE hits counter",
+        'hits_total{path="/\\"b\\"\\n"} 2',
+        'hits_total{path="/a"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value)
+
+    assert latency.render()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 4.25",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    name = unique("twice")
+
+    assert counter(name, "x") is counter(name, "x")
+
+
+def test_requests_are_counted_by_route_template(client):
+    client.get("/logs/2031-01-01")
+
+    metrics = client.get("/metrics").text
+    assert 'method="GET",route="/logs/{log_date}",status="404"' in metrics
+    assert "workout_http_request_duration_seconds_bucket" in metrics
+
+
+def test_profiled_requests_write_a_trace(tmp_path):
+    work = histogram(unique("work_seconds"), "Work", ["step"])
+
+    app = FastAPI()
+    app.add_middleware(InstrumentationMiddleware, profile_dir=tmp_path)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        with work.time(step="load"):
+            return {"id": item_id}
+
+    with TestClient(app) as client:
+        assert "x-profile-trace" not in client.get("/items/1").headers
+        trace_file = client.get("/items/1", headers={"X-Profile": "1"}).headers["x-profile-trace"]
+
+    trace = json.loads((tmp_path / trace_file).read_text())
+    assert (trace["route"], trace["status"]) == ("/items/{item_id}", 200)
+    assert [span["labels"] for span in trace["spans"]] == [{"step": "load"}]
+    assert list(tmp_path.iterdir()) == [tmp_path / trace_file]
@@ -0,0 +1,45 @@
+"""Repair of almost-JSON machine context written by models."""
+
+import json
+
+import pytest
+
+from json_repair import extract_object, repair
+
+
+def repaired(text):
+    return json.loads(repair(text))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('Here you go:\n```json\n{"a": 1}\n```', {"a": 1}),
+    ('{"a": 1, // the count\n "b": 2}', {"a": 1, "b": 2}),
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ("{'a': 'x'}", {"a": "x"}),
+    ('{“a”: “x”}', {"a": "x"}),
+    ('{a: 1, b_2: "y"}', {"a": 1, "b_2": "y"}),
+    ('{"a": True, "b": None}', {"a": True, "b": None}),
+    ('{"a": [1, 2', {"a": [1, 2]}),
+    ('{"a": "cut off', {"a": "cut off"}),
+    ('{"a": 1, "b":', {"a": 1}),
+])
+def test_common_model_mistakes_are_repaired(text, expected):
+    assert repaired(text) == expected
+
+
+def test_typographic_quotes_inside_strings_are_kept():
+    assert repaired('{"summary": "felt “heavy” today", "x": 1,}') == {"summary": "felt “heavy” today", "x": 1}
+
+
+def test_string_contents_are_never_rewritten():
+    text = '{"note": "sets: 3, ]", "also": "a, b: True }", "c": 1,}'
+    assert repaired(text) == {"note": "sets: 3, ]", "also": "a, b: True }", "c": 1}
+
+
+def test_braces_inside_strings_dont_end_the_object():
+    assert extract_object('x {"a": "}"} y') == '{"a": "}"}'
+
+
+def test_text_without_an_object_is_rejected():
+    with pytest.raises(ValueError):
+        repair("no JSON here")
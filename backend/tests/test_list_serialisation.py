@@ -0,0 +1,51 @@
+"""Log lists served from each log's cached JSON rather than re-encoded models."""
+
+import json
+from datetime import date
+
+import pytest
+
+from models import WorkoutLog
+from storage import WorkoutStorage
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_cached_json_matches_encoding_the_models(tmp_path, make_log, backend):
+    storage = WorkoutStorage(data_dir=tmp_path, backend=backend)
+    storage.save_logs([
+        make_log("2025-01-01", exercises=[{"name": "Squat", "sets": 3, "reps": 5, "load": "100kg"}]),
+        make_log("2025-01-02", workout_type="run", running_data={"distance_km": 5.5},
+                 free_text_reflection="Ünïcode “quotes” and\nnewlines"),
+    ])
+
+    body = storage.get_logs_range_json(date(2025, 1, 1), date(2025, 1, 31))
+    expected = [json.loads(log.model_dump_json()) for log in storage.get_logs_range(date(2025, 1, 1), date(2025, 1, 31))]
+
+    assert json.loads(body) == expected
+    assert [WorkoutLog.model_validate(item) for item in json.loads(body)] == storage.get_logs_range(
+        date(2025, 1, 1), date(2025, 1, 31)
+    )
+    assert storage.get_logs_range_json(date(2025, 2, 1), date(2025, 2, 2)) == b"[]"
+    storage.close()
+
+
+def test_cached_json_follows_saves(storage, make_log):
+    storage.save_log(make_log("2025-01-01", fatigue_level=2))
+    storage.get_logs_range_json(date(2025, 1, 1), date(2025, 1, 1))
+
+    storage.save_log(make_log("2025-01-01", fatigue_level=8))
+
+    assert json.loads(storage.get_logs_range_json(date(2025, 1, 1), date(2025, 1, 1)))[0]["fatigue_level"] == 8
+
+
+def test_list_endpoint_returns_the_same_logs_as_single_reads(client):
+    for day, workout_type in ((1, "strength"), (2, "run"), (3, "strength")):
+        client.post("/logs", json={"date": f"2025-01-0{day}", "workout_type": workout_type, "fatigue_level": day})
+
+    listed = client.get("/logs", params={"start_date": "2025-01-01", "end_date": "2025-01-03"}).json()
+    assert listed == [client.get(f"/logs/2025-01-0{day}").json() for day in (1, 2, 3)]
+
+    filtered = client.get("/logs", params={
+        "start_date": "2025-01-01", "end_date": "2025-01-03", "workout_type": "strength", "min_fatigue": 2
+    }).json()
+    assert [log["date"] for log in filtered] == ["2025-01-03"]
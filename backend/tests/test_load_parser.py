@@ -0,0 +1,117 @@
+"""Free-text load parsing and the metrics stored from it."""
+
+import json
+from datetime import date
+
+import pytest
+
+from exercise_metrics import compute_metrics, exercise_progression, log_metrics
+from load_parser import PARSER_VERSION, parse_load
+from models import ImplementType, LogMetrics
+
+
+@pytest.mark.parametrize("load, name, kg, count, implement", [
+    ("20kg", None, 20.0, 1, None),
+    ("45 lb", None, 20.41, 1, None),
+    ("20", None, 20.0, 1, None),
+    ("2x12kg DB", None, 24.0, 2, ImplementType.DUMBBELL),
+    ("2 x 16 kg", "Goblet squat kettlebell", 32.0, 2, ImplementType.KETTLEBELL),
+    ("2x20kg DBs", None, 40.0, 2, ImplementType.DUMBBELL),
+    ("pair of 24s", None, 48.0, 2, None),
+    ("2x16 KB", None, 32.0, 2, ImplementType.KETTLEBELL),
+    ("16kg kettlebells", None, 32.0, 2, ImplementType.KETTLEBELL),
+    ("12kg", "Dumbbell Press", 12.0, 1, ImplementType.DUMBBELL),
+    ("60/70/80kg", "Back Squat", 80.0, 1, None),
+    ("20-24kg", None, 24.0, 1, None),
+    # Sets x reps is not a count of implements
+    ("3x10 @ 20kg DB", None, 20.0, 1, ImplementType.DUMBBELL),
+    ("4x8 20kg", "Dumbbell Row", 20.0, 1, ImplementType.DUMBBELL),
+    ("3 x 12", "Kettlebell swing", None, 1, ImplementType.KETTLEBELL),
+    ("5x5 100kg", None, 100.0, 1, None),
+    ("3x10", None, None, 1, None),
+    ("3x10 @ 2x12kg DB", None, 24.0, 2, ImplementType.DUMBBELL),
+])
+def test_weights_counts_and_implements(load, name, kg, count, implement):
+    parsed = parse_load(load, name)
+    assert parsed.kg == kg
+    assert parsed.count == count
+    assert parsed.implement == implement
+
+
+@pytest.mark.parametrize("load, name, kg", [
+    ("3x100kg", "Back squat", 100.0),
+    ("4x60kg", "Bench press", 60.0),
+    ("3 x 80kg", "Deadlift", 80.0),
+    ("2x50kg", "Barbell row", 50.0),
+    ("2 x 16 kg", None, 16.0),
+])
+def test_sets_of_a_weight_are_not_implement_counts(load, name, kg):
+    parsed = parse_load(load, name)
+    assert (parsed.kg, parsed.avg_kg, parsed.count) == (kg, kg, 1)
+
+
+def test_series_average_is_used_for_volume():
+    parsed = parse_load("60/70/80kg")
+    assert (parsed.kg, parsed.avg_kg) == (80.0, 70.0)
+
+
+@pytest.mark.parametrize("load, kg", [
+    ("bodyweight", 0.0),
+    ("BW+10kg", 10.0),
+    ("bw-20kg", -20.0),
+    ("assisted 20kg", -20.0),
+])
+def test_bodyweight_loads(load, kg):
+    parsed = parse_load(load)
+    assert parsed.bodyweight
+    assert parsed.kg == kg
+    assert parsed.implement == ImplementType.BODYWEIGHT
+
+
+def test_band_levels_have_no_weight():
+    parsed = parse_load("red band")
+    assert parsed.kg is None
+    assert parsed.implement == ImplementType.BAND
+
+
+def test_empty_loads_parse_to_none():
+    assert parse_load(None) is None
+    assert parse_load("  ") is None
+
+
+def test_metrics_use_sets_and_reps_not_implement_counts(make_log):
+    log = make_log("2025-01-01", exercises=[
+        {"name": "Dumbbell Row", "sets": 4, "reps": 8, "load": "4x8 20kg"},
+        {"name": "Goblet Squat", "sets": 3, "reps": 10, "load": "3x10 @ 20kg DB"},
+    ])
+    metrics = compute_metrics(log)
+
+    assert [m.top_set_kg for m in metrics.exercises] == [20.0, 20.0]
+    assert [m.volume_kg for m in metrics.exercises] == [640.0, 600.0]
+    assert metrics.exercises[0].estimated_1rm_kg == 25.3
+    assert metrics.total_volume_kg == 1240.0
+
+
+def test_metrics_from_an_older_parser_are_recomputed(make_log):
+    log = make_log("2025-01-01", exercises=[{"name": "Dumbbell Row", "sets": 4, "reps": 8, "load": "4x8 20kg"}])
+    log.metrics = LogMetrics(version=PARSER_VERSION - 1, total_volume_kg=2560.0)
+
+    assert log_metrics(log).total_volume_kg == 640.0
+    assert exercise_progression("dumbbell rows", [log]).best_top_set_kg == 20.0
+
+
+def test_metrics_of_a_hand_edited_log_follow_its_exercises(storage, make_log):
+    storage.save_log(make_log("2025-01-01", exercises=[
+        {"name": "Back Squat", "sets": 5, "reps": 3, "load": "100kg"},
+        {"name": "Bench Press", "sets": 3, "reps": 5, "load": "60kg"},
+    ]))
+    # Remove the squat by hand, leaving the stored metrics as they were
+    path = storage.backend.get_log_path(date(2025, 1, 1))
+    data = json.loads(path.read_text())
+    data["exercises"] = data["exercises"][1:]
+    path.write_text(json.dumps(data))
+    storage.reload([date(2025, 1, 1)])
+
+    progression = exercise_progression("bench press", [storage.get_log(date(2025, 1, 1))])
+    point = progression.points[0]
+    assert (point.top_set_kg, point.volume_kg, point.estimated_1rm_kg) == (60.0, 900.0, 70.0)
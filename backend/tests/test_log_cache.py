@@ -0,0 +1,64 @@
+"""The JSON backend's parsed-log cache."""
+
+import json
+import os
+from datetime import date
+
+from json_backend import JsonFileBackend
+
+JAN_1 = date(2025, 1, 1)
+
+
+def test_repeated_reads_are_served_from_the_cache(tmp_path, make_log):
+    backend = JsonFileBackend(tmp_path)
+    backend.put_many([make_log(JAN_1, fatigue_level=3)])
+
+    for _ in range(3):
+        assert backend.get(JAN_1).fatigue_level == 3
+
+    info = backend.cache_info()
+    assert (info["hits"], info["misses"], info["size"]) == (3, 0, 1)
+
+
+def test_a_file_edited_by_hand_is_read_again(tmp_path, make_log):
+    backend = JsonFileBackend(tmp_path)
+    backend.put_many([make_log(JAN_1, fatigue_level=3)])
+    path = backend.get_log_path(JAN_1)
+    st = path.stat()
+
+    # Same size, but a new mtime
+    path.write_text(path.read_text().replace('"fatigue_level": 3', '"fatigue_level": 4'))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert backend.get(JAN_1).fatigue_level == 4
+    assert json.loads(backend.get_json(JAN_1))["fatigue_level"] == 4
+
+
+def test_the_least_recently_used_log_is_evicted(tmp_path, make_log):
+    backend = JsonFileBackend(tmp_path, cache_size=2)
+    backend.put_many([make_log(f"2025-01-0{day}") for day in (1, 2, 3)])
+
+    assert backend.cache_info()["size"] == 2
+    backend.get(date(2025, 1, 2))
+    backend.get(JAN_1)
+
+    info = backend.cache_info()
+    assert (info["hits"], info["misses"]) == (1, 1)
+
+
+def test_callers_get_copies(tmp_path, make_log):
+    backend = JsonFileBackend(tmp_path)
+    backend.put_many([make_log(JAN_1, free_text_reflection="original")])
+
+    backend.get(JAN_1).free_text_reflection = "changed"
+
+    assert backend.get(JAN_1).free_text_reflection == "original"
+
+
+def test_deleted_logs_leave_the_cache(tmp_path, make_log):
+    backend = JsonFileBackend(tmp_path)
+    backend.put_many([make_log(JAN_1)])
+    backend.get_log_path(JAN_1).unlink()
+
+    assert backend.get(JAN_1) is None
+    assert backend.cache_info()["size"] == 0
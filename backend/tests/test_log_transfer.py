@@ -0,0 +1,90 @@
+"""NDJSON export and import."""
+
+import asyncio
+import json
+from datetime import date
+
+import log_transfer
+from log_transfer import LogImporter, export_ndjson
+from storage import WorkoutStorage
+
+
+async def chunked(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def run_import(storage, body, size=7, **kwargs):
+    return asyncio.run(LogImporter(storage, **kwargs).run(chunked(body, size)))
+
+
+def test_export_round_trips_through_import(storage, make_log, tmp_path, monkeypatch):
+    monkeypatch.setattr(log_transfer, "EXPORT_CHUNK_BYTES", 100)
+    storage.save_logs([make_log(f"2025-01-{day:02d}", fatigue_level=day) for day in range(1, 11)])
+
+    chunks = list(export_ndjson(storage, date(2025, 1, 3), date(2025, 1, 8)))
+    body = b"".join(chunks)
+    lines = body.splitlines()
+    assert len(chunks) > 1
+    assert [json.loads(line)["date"] for line in lines] == [f"2025-01-{day:02d}" for day in range(3, 9)]
+
+    target = WorkoutStorage(data_dir=tmp_path / "other")
+    result = run_import(target, body)
+    assert (result.imported, result.failed) == (6, 0)
+    assert target.get_log(date(2025, 1, 5)).fatigue_level == 5
+    target.close()
+
+
+def test_bad_lines_are_reported_and_the_rest_imported(storage):
+    body = b"\n".join([
+        b'{"date": "2025-01-01", "workout_type": "strength"}',
+        b"",
+        b'{"date": "2025-01-02", "workout_type": "juggling"}',
+        b"not json",
+        b'{"date": "2025-01-03", "workout_type": "run"}',
+    ])
+
+    result = run_import(storage, body, batch_size=2)
+
+    assert (result.imported, result.failed) == (2, 2)
+    assert [(e.line, e.date) for e in result.errors] == [(3, date(2025, 1, 2)), (4, None)]
+    assert "workout_type" in result.errors[0].error
+    assert storage.list_all_dates() == [date(2025, 1, 1), date(2025, 1, 3)]
+
+
+def test_existing_dates_are_skipped_unless_overwriting(storage, make_log):
+    storage.save_log(make_log("2025-01-01", fatigue_level=2))
+    body = b'{"date": "2025-01-01", "workout_type": "run", "fatigue_level": 9}\n'
+
+    assert run_import(storage, body).skipped == 1
+    assert storage.get_log(date(2025, 1, 1)).fatigue_level == 2
+
+    assert run_import(storage, body, overwrite=True).imported == 1
+    assert storage.get_log(date(2025, 1, 1)).fatigue_level == 9
+
+
+def test_a_dry_run_writes_nothing(storage):
+    result = run_import(storage, b'{"date": "2025-01-01", "workout_type": "run"}', dry_run=True)
+
+    assert (result.dry_run, result.imported) == (True, 1)
+    assert storage.list_all_dates() == []
+
+
+def test_unreadable_files_are_exported_as_error_lines(storage, make_log):
+    storage.save_log(make_log("2025-01-01"))
+    storage.backend.get_log_path(date(2025, 1, 1)).write_text("{broken")
+
+    line = json.loads(b"".join(export_ndjson(storage)))
+    assert line["date"] == "2025-01-01"
+    assert line["error"].startswith("Unreadable log file")
+
+
+def test_endpoints(client):
+    body = b'{"date": "2025-01-01", "workout_type": "strength"}\n{"date": "2025-01-02", "workout_type": "run"}\n'
+    assert client.post("/logs/import", content=body).json()["imported"] == 2
+
+    response = client.get("/logs/export", params={"start_date": "2025-01-02"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["date"] for line in response.text.splitlines()] == ["2025-01-02"]
+
+    assert client.get("/logs/export", params={"start_date": "2025-02-01", "end_date": "2025-01-01"}).status_code == 400
@@ -0,0 +1,76 @@
+"""LogWatcher: edits made outside the API are reloaded, the storage's own writes aren't reported back."""
+
+import json
+from datetime import date
+
+import pytest
+
+from log_watcher import LogWatcher
+from storage import EDITED, REMOVED
+
+
+@pytest.fixture
+def watched(storage):
+    """The polling watch of the `storage` fixture, with its first scan done."""
+    watcher = LogWatcher(use_inotify=False)
+    watcher.watch(storage)
+    watched = watcher._watched[id(storage)]
+    watcher.check(watched)
+    yield watcher, watched
+    watcher.unwatch(storage)
+    watcher.close()
+
+
+def edit(storage, log_date, **fields):
+    """Rewrite a log file by hand."""
+    path = storage.backend.get_log_path(log_date)
+    data = json.loads(path.read_text())
+    data.update(fields)
+    path.write_text(json.dumps(data))
+
+
+def test_hand_edits_are_reloaded_and_reported(storage, make_log, watched):
+    watcher, entry = watched
+    storage.save_log(make_log("2025-03-01", free_text_reflection="before"))
+    heard = []
+    storage.add_listener(lambda kind, log_date, log: heard.append((kind, log_date)))
+
+    edit(storage, date(2025, 3, 1), free_text_reflection="edited by hand, at some length")
+
+    assert watcher.check(entry) == [(EDITED, date(2025, 3, 1))]
+    assert storage.get_log(date(2025, 3, 1)).free_text_reflection == "edited by hand, at some length"
+    assert storage.search_index.search("hand")
+    assert heard == [(EDITED, date(2025, 3, 1))]
+
+
+def test_removed_files_are_reported(storage, make_log, watched):
+    watcher, entry = watched
+    storage.save_log(make_log("2025-03-01"))
+
+    storage.backend.get_log_path(date(2025, 3, 1)).unlink()
+
+    assert watcher.check(entry) == [(REMOVED, date(2025, 3, 1))]
+    assert storage.list_all_dates() == []
+
+
+def test_the_storages_own_writes_arent_reported(storage, make_log, watched):
+    watcher, entry = watched
+
+    storage.save_log(make_log("2025-03-01"))
+    storage.save_log(make_log("2025-03-02"))
+    storage.delete_log(date(2025, 3, 1))
+
+    assert watcher.check(entry) == []
+
+
+def test_unparseable_files_are_skipped_until_they_change_again(storage, make_log, watched):
+    watcher, entry = watched
+    storage.save_log(make_log("2025-03-01"))
+    path = storage.backend.get_log_path(date(2025, 3, 1))
+
+    path.write_text('{"date": "2025-03-01", ')
+    assert watcher.check(entry) == []
+
+    edit_text = json.dumps({**json.loads(make_log("2025-03-01").model_dump_json()), "free_text_reflection": "fixed"})
+    path.write_text(edit_text)
+    assert watcher.check(entry) == [(EDITED, date(2025, 3, 1))]
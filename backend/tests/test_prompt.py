@@ -0,0 +1,45 @@
+"""How analysis requests are put together: the cached system block and compact history rows."""
+
+from ai_service import HISTORY_HEADER, SYSTEM_PROMPT, _history_row, history_row_tokens
+from models import AIAnalysis, MachineContext
+
+
+def test_every_request_shares_one_cacheable_system_block(analyzer, make_log):
+    first = analyzer._build_request(make_log("2025-01-01"))
+    second = analyzer._build_request(make_log("2025-02-01", workout_type="run"), [make_log("2025-01-31")])
+
+    assert first["system"] == second["system"]
+    assert first["system"][0]["text"] == SYSTEM_PROMPT
+    assert first["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert SYSTEM_PROMPT not in first["messages"][0]["content"]
+
+
+def test_history_logs_become_one_table_row_each(analyzer, make_log):
+    log = make_log(
+        "2025-01-03",
+        perceived_effort="hard",
+        fatigue_level=7,
+        exercises=[{"name": "Squat", "sets": 3, "reps": 5}, {"name": "Lunge", "sets": 2, "reps": 10}],
+        running_data={"distance_km": 5.0, "duration_minutes": 27.5},
+        pain_or_tightness={"body_areas": ["calf", "hip"], "severity": "mild", "description": "tight"},
+        ai_analysis=AIAnalysis(human_insight="-", machine_context=MachineContext(injury_risk="low")),
+    )
+
+    assert _history_row(log) == "2025-01-03|strength|h|7|5x35|5/27.5/-|mild:calf,hip|low"
+    assert _history_row(make_log("2025-01-04")) == "2025-01-04|strength|-|-|-|-|-|-"
+    assert history_row_tokens(log) == len(_history_row(log)) // 4 + 1
+
+    prompt = analyzer._build_request(make_log("2025-01-05"), [log, make_log("2025-01-04")])["messages"][0]["content"]
+    history = prompt.split("## HISTORY\n", 1)[1].strip().splitlines()
+    assert history == [HISTORY_HEADER, _history_row(log), "2025-01-04|strength|-|-|-|-|-|-"]
+
+
+def test_related_sessions_say_why_they_were_picked(analyzer, make_log):
+    current = make_log("2025-03-01", exercises=[{"name": "Back Squat"}],
+                       pain_or_tightness={"body_areas": ["Left Knee"], "description": "sore"})
+    related = make_log("2024-11-01", exercises=[{"name": "back squat"}],
+                       pain_or_tightness={"body_areas": ["left knee"], "description": "sore"})
+
+    prompt = analyzer._build_request(current, related_logs=[related])["messages"][0]["content"]
+
+    assert prompt.rstrip().endswith("|area:left knee,ex:back squat,type")
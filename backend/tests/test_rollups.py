@@ -0,0 +1,134 @@
+"""Weekly and monthly rollups and when they are recomputed."""
+
+import threading
+from datetime import date
+
+from models import AIAnalysis, MachineContext
+from rollups import MONTHLY, WEEKLY, parse_period, period_bounds
+from storage import WorkoutStorage
+
+
+def write_by_hand(storage, log):
+    storage.backend.get_log_path(log.date).write_text(log.model_dump_json(indent=2))
+
+
+def test_period_labels_round_trip():
+    assert period_bounds(WEEKLY, date(2025, 1, 15)) == ("2025-W03", date(2025, 1, 13), date(2025, 1, 19))
+    assert period_bounds(MONTHLY, date(2024, 2, 10)) == ("2024-02", date(2024, 2, 1), date(2024, 2, 29))
+    assert parse_period(WEEKLY, "2025-W03") == (date(2025, 1, 13), date(2025, 1, 19))
+
+
+def test_saves_and_deletes_update_their_week_and_month(storage, make_log):
+    storage.save_log(make_log("2025-01-13", fatigue_level=4))
+    storage.save_log(make_log("2025-01-14", workout_type="run", running_data={"distance_km": 5.0}))
+
+    week = storage.rollups.read(WEEKLY, "2025-W03")
+    assert week["total_logs"] == 2
+    assert week["running_km"] == 5.0
+    assert storage.rollups.read(MONTHLY, "2025-01")["workout_types"] == {"strength": 1, "run": 1}
+
+    storage.delete_log(date(2025, 1, 13))
+    storage.delete_log(date(2025, 1, 14))
+    assert storage.rollups.read(WEEKLY, "2025-W03") is None
+
+
+def test_an_analysis_is_kept_but_marked_stale_when_logs_change(storage, make_log):
+    storage.save_log(make_log("2025-01-13"))
+    analysis = AIAnalysis(human_insight="Solid week", machine_context=MachineContext())
+    storage.rollups.attach_analysis(WEEKLY, "2025-W03", analysis)
+    assert storage.rollups.read(WEEKLY, "2025-W03")["ai_analysis"]["stale"] is False
+
+    storage.save_log(make_log("2025-01-15"))
+    rollup = storage.rollups.read(WEEKLY, "2025-W03")
+    assert rollup["ai_analysis"]["human_insight"] == "Solid week"
+    assert rollup["ai_analysis"]["stale"] is True
+
+
+def test_ranges_list_only_periods_with_logs(storage, make_log):
+    storage.save_log(make_log("2025-01-01"))
+    storage.save_log(make_log("2025-03-01"))
+
+    months = storage.rollups.get_range(MONTHLY, date(2025, 1, 1), date(2025, 3, 31))
+    assert [rollup["period"] for rollup in months] == ["2025-01", "2025-03"]
+
+
+def test_stored_rollups_follow_a_summary_rebuilt_for_hand_added_files(storage, make_log):
+    storage.save_log(make_log("2025-01-13"))
+    assert storage.rollups.read(WEEKLY, "2025-W03")["total_logs"] == 1
+
+    write_by_hand(storage, make_log("2025-01-14"))
+    storage.get_summary()
+
+    assert storage.rollups.read(WEEKLY, "2025-W03")["total_logs"] == 2
+
+
+def test_rebuild_summary_recomputes_rollups_after_bulk_edits(storage, make_log):
+    storage.save_log(make_log("2025-01-13"))
+    write_by_hand(storage, make_log("2025-01-13", workout_type="run"))
+
+    storage.rebuild_summary()
+
+    assert storage.rollups.read(WEEKLY, "2025-W03")["workout_types"] == {"run": 1}
+    assert storage.get_summary().summary()["workout_types"] == {"run": 1}
+
+
+def test_a_summary_rebuild_that_reorders_pain_areas_leaves_analyses_fresh(storage, make_log):
+    # Saved in this order the area vocabulary is [knee, hip]; rebuilt by date it is [hip, knee]
+    storage.save_log(make_log("2025-01-14", pain_or_tightness={"body_areas": ["knee"]}))
+    storage.save_log(make_log("2025-01-13", pain_or_tightness={"body_areas": ["hip"]}))
+    analysis = AIAnalysis(human_insight="Solid week", machine_context=MachineContext())
+    storage.rollups.attach_analysis(WEEKLY, "2025-W03", analysis)
+
+    storage.rebuild_summary()
+
+    assert storage.summary.body_areas == ["hip", "knee"]
+    assert storage.rollups.read(WEEKLY, "2025-W03")["ai_analysis"]["stale"] is False
+
+
+def test_storages_sharing_a_data_dir_update_the_same_rollups(tmp_path, make_log):
+    workers = [WorkoutStorage(data_dir=tmp_path) for _ in range(2)]
+    errors = []
+
+    def save(storage, day):
+        try:
+            for _ in range(20):
+                storage.save_log(make_log(date(2025, 1, day)))
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(storage, 13 + i)) for i, storage in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert workers[0].rollups.read(WEEKLY, "2025-W03")["total_logs"] == 2
+    for storage in workers:
+        storage.close()
+
+
+def test_saves_and_deletes_dont_check_every_date(storage, make_log, monkeypatch):
+    storage.save_log(make_log("2025-01-13"))
+    storage.get_summary()
+
+    def full_check(*args):
+        raise AssertionError("the save path checked every stored date")
+
+    monkeypatch.setattr(storage.backend, "list_dates", full_check)
+    monkeypatch.setattr(storage.summary, "matches", full_check)
+    storage.save_log(make_log("2025-01-14"))
+    storage.save_log(make_log("2025-01-14", fatigue_level=5))
+    storage.delete_log(date(2025, 1, 13))
+
+    week = storage.rollups.read(WEEKLY, "2025-W03")
+    assert week["dates"] == ["2025-01-14"] and week["avg_fatigue"] == 5.0
+    assert storage.get_log(date(2025, 1, 14)).metadata.version == 2
+
+
+def test_the_first_save_checks_the_summary_against_files_added_by_hand(storage, make_log):
+    write_by_hand(storage, make_log("2025-01-13"))
+
+    storage.save_log(make_log("2025-01-14"))
+
+    assert storage.rollups.read(WEEKLY, "2025-W03")["total_logs"] == 2
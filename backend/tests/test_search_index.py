@@ -0,0 +1,74 @@
+"""The full-text and body-area search index."""
+
+from datetime import date
+
+import pytest
+
+from search_index import SearchIndex, tokenize
+
+
+@pytest.fixture
+def index(tmp_path, make_log):
+    index = SearchIndex(tmp_path / "search_index.jsonl")
+    index.upsert_many([
+        make_log("2025-01-01", free_text_reflection="Knees felt fine, easy squats"),
+        make_log("2025-01-02", free_text_reflection="Left knee ached on the stairs",
+                 pain_or_tightness={"body_areas": ["Left Knee"], "description": "dull ache"}),
+        make_log("2025-01-03", exercises=[{"name": "Back Squat", "notes": "knee caved on rep 5"}]),
+        make_log("2025-01-04", free_text_reflection="Hamstrings tight after sprints",
+                 pain_or_tightness={"body_areas": ["hamstring"], "description": "tight"}),
+    ])
+    yield index
+    index.close()
+
+
+def dates(result):
+    return [hit[0].day for hit in result[1]]
+
+
+def test_tokens_are_lower_cased_and_plurals_folded():
+    assert tokenize("Knees, INJURIES and glass") == ["knee", "injury", "and", "glass"]
+
+
+def test_every_query_word_must_match_and_body_areas_rank_highest(index):
+    total, hits = index.search("knee")
+    assert total == 3
+    assert hits[0][0] == date(2025, 1, 2)
+    assert "body_areas" in hits[0][2]
+
+    assert dates(index.search("knee ache")) == [2]
+    assert index.search("knee hamstring") == (0, [])
+
+
+def test_prefix_area_and_date_filters(index):
+    assert sorted(dates(index.search("ham*"))) == [4]
+    assert dates(index.search(body_area="left knee ")) == [2]
+    assert dates(index.search(body_area="hamstring", start_date=date(2025, 1, 3))) == [4]
+    assert sorted(dates(index.search("knee", end_date=date(2025, 1, 2)))) == [1, 2]
+
+
+def test_without_a_query_matches_are_newest_first(index, make_log):
+    index.upsert_many([make_log("2025-01-05", pain_or_tightness={"body_areas": ["Left knee"], "description": "x"})])
+
+    assert dates(index.search(body_area="left knee")) == [5, 2]
+
+
+def test_updates_and_deletes_survive_a_reload(index, tmp_path, make_log):
+    index.upsert_many([make_log("2025-01-01", free_text_reflection="Shoulder day")])
+    index.remove(date(2025, 1, 4))
+
+    reloaded = SearchIndex(tmp_path / "search_index.jsonl")
+    assert dates(reloaded.search("shoulder")) == [1]
+    assert reloaded.search("hamstring") == (0, [])
+    assert reloaded.matches([date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)])
+    assert reloaded.occurrences(exercises=["back squat"]) == {("exercise", "back squat"): [date(2025, 1, 3)]}
+    reloaded.close()
+
+
+def test_endpoint(client):
+    client.post("/logs", json={"date": "2025-01-01", "workout_type": "run", "free_text_reflection": "Calf cramp"})
+
+    result = client.get("/search", params={"q": "calf"}).json()
+    assert result["total"] == 1
+    assert result["hits"][0]["log"]["date"] == "2025-01-01"
+    assert client.get("/search").status_code == 400
@@ -0,0 +1,82 @@
+"""Two storages on one data directory, as two uvicorn workers would have."""
+
+from datetime import date
+
+import pytest
+
+from storage import WorkoutStorage
+from trends import pain_area_counts
+
+
+@pytest.fixture
+def workers(tmp_path):
+    a, b = WorkoutStorage(data_dir=tmp_path), WorkoutStorage(data_dir=tmp_path)
+    # Both load their indexes before either writes, as at startup
+    for storage in (a, b):
+        storage.warm_up()
+    yield a, b
+    a.close()
+    b.close()
+
+
+def pain(*areas):
+    return {"body_areas": list(areas), "description": "tight " + " ".join(areas)}
+
+
+def seed(a, b, make_log, days=3):
+    """Logs both workers have seen, so later edits don't change the set of dates."""
+    for day in range(1, days + 1):
+        a.save_log(make_log(date(2025, 1, day)))
+    b.get_summary()
+    b.get_search_index()
+
+
+def test_summary_sees_the_other_workers_edits(workers, make_log):
+    a, b = workers
+    seed(a, b, make_log)
+    a.save_log(make_log("2025-01-02", workout_type="run"))
+
+    assert b.get_summary().summary()["workout_types"] == {"strength": 2, "run": 1}
+
+
+def test_search_sees_the_other_workers_edits(workers, make_log):
+    a, b = workers
+    seed(a, b, make_log)
+    a.save_log(make_log("2025-01-02", free_text_reflection="Hamstring felt tight on the last set"))
+
+    total, hits = b.get_search_index().search("hamstring")
+    assert total == 1
+    assert hits[0][0] == date(2025, 1, 2)
+
+
+def test_log_lists_see_the_other_workers_edits(workers, make_log):
+    a, b = workers
+    a.save_log(make_log("2025-01-01", fatigue_level=3))
+    assert b'"fatigue_level":3' in b.get_logs_range_json(date(2025, 1, 1), date(2025, 1, 1))
+
+    a.save_log(make_log("2025-01-01", fatigue_level=8))
+    assert b'"fatigue_level":8' in b.get_logs_range_json(date(2025, 1, 1), date(2025, 1, 1))
+
+
+def test_body_areas_registered_by_both_workers_stay_consistent(workers, make_log, tmp_path):
+    a, b = workers
+    seed(a, b, make_log)
+    a.save_log(make_log("2025-01-01", pain_or_tightness=pain("knee")))
+    b.save_log(make_log("2025-01-02", pain_or_tightness=pain("calf")))
+    a.save_log(make_log("2025-01-03", pain_or_tightness=pain("calf", "knee")))
+
+    fresh = WorkoutStorage(data_dir=tmp_path)
+    try:
+        for storage in (a, b, fresh):
+            summary = storage.get_summary()
+            counts = pain_area_counts(summary.columns()["pain_areas"], summary.body_areas)
+            assert counts == {"knee": 2, "calf": 2}
+    finally:
+        fresh.close()
+
+
+def test_own_writes_do_not_trigger_a_reload(workers, make_log):
+    a, _ = workers
+    a.save_log(make_log("2025-01-01"))
+    assert not a.summary.refresh()
+    assert not a.search_index.refresh()
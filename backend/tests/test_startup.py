@@ -0,0 +1,37 @@
+"""What importing the API and opening a storage do (and don't do) up front."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from ai_service import ClaudeAnalyzer
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def test_importing_the_app_leaves_the_anthropic_sdk_unloaded(tmp_path):
+    env = {**os.environ, "DATA_DIR": str(tmp_path), "LOG_WATCH": "0", "ANTHROPIC_API_KEY": "test"}
+    env.pop("ANTHROPIC_FAKE", None)
+
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('anthropic' in sys.modules)"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "False"
+
+
+def test_the_search_index_is_opened_on_first_use(storage):
+    assert storage._search_index is None
+    assert not (storage.data_dir / "search_index.jsonl").exists()
+
+    storage.get_search_index()
+
+    assert storage._search_index is not None
+
+
+def test_the_analyzer_creates_its_clients_on_first_use():
+    analyzer = ClaudeAnalyzer(api_key="test")
+
+    assert analyzer._client is None and analyzer._async_client is None
@@ -0,0 +1,64 @@
+"""WorkoutStorage: the date index and basic reads and writes."""
+
+from datetime import date
+
+from storage import WorkoutStorage
+
+
+def test_saved_logs_are_listed_in_date_order(storage, make_log):
+    for day in ("2025-01-03", "2025-01-01", "2025-01-02"):
+        storage.save_log(make_log(day))
+
+    assert storage.list_all_dates() == [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)]
+    assert storage.list_dates_between(date(2025, 1, 2), date(2025, 1, 5)) == [date(2025, 1, 2), date(2025, 1, 3)]
+
+
+def test_index_sees_files_added_and_removed_outside_the_storage(storage, make_log):
+    storage.save_log(make_log("2025-01-01"))
+    assert storage.list_all_dates() == [date(2025, 1, 1)]
+
+    path = storage.backend.get_log_path(date(2025, 1, 2))
+    path.write_text(make_log("2025-01-02").model_dump_json())
+    assert storage.list_all_dates() == [date(2025, 1, 1), date(2025, 1, 2)]
+
+    path.unlink()
+    assert storage.list_all_dates() == [date(2025, 1, 1)]
+
+
+def test_example_and_temporary_files_are_not_logs(storage, make_log):
+    storage.save_log(make_log("2025-01-01"))
+    (storage.backend.logs_dir / "2025-01-01.example.json").write_text("{}")
+    (storage.backend.logs_dir / "notes.txt").write_text("")
+    (storage.backend.logs_dir / ".2025-01-02.json.tmp").write_text("")
+
+    assert storage.list_all_dates() == [date(2025, 1, 1)]
+
+
+def test_range_reads_only_return_stored_dates(storage, make_log):
+    storage.save_log(make_log("2025-01-01", fatigue_level=3))
+    storage.save_log(make_log("2025-01-05", fatigue_level=7))
+
+    logs = storage.get_logs_range(date(2025, 1, 1), date(2025, 1, 4))
+    assert [log.fatigue_level for log in logs] == [3]
+
+
+def test_delete_removes_the_date(storage, make_log):
+    storage.save_log(make_log("2025-01-01"))
+
+    assert storage.delete_log(date(2025, 1, 1))
+    assert not storage.delete_log(date(2025, 1, 1))
+    assert storage.list_all_dates() == []
+    assert storage.get_log(date(2025, 1, 1)) is None
+
+
+def test_a_new_storage_finds_existing_logs(tmp_path, make_log):
+    first = WorkoutStorage(data_dir=tmp_path)
+    first.save_log(make_log("2025-02-01"))
+    first.close()
+
+    second = WorkoutStorage(data_dir=tmp_path)
+    try:
+        assert second.list_all_dates() == [date(2025, 2, 1)]
+        assert second.get_log(date(2025, 2, 1)).date == date(2025, 2, 1)
+    finally:
+        second.close()
@@ -0,0 +1,58 @@
+"""Two-way sync between the JSON files and SQLite, and the rebuild that follows it."""
+
+import json
+import sys
+from datetime import date
+
+import storage_sync
+from json_backend import JsonFileBackend
+from sqlite_backend import SQLiteBackend
+from storage import SQLITE_FILE, WorkoutStorage
+from storage_sync import StorageSync, TO_DB, TO_FILE
+
+
+def open_sync(data_dir):
+    return StorageSync(JsonFileBackend(data_dir), SQLiteBackend(data_dir / SQLITE_FILE))
+
+
+def test_new_logs_are_copied_each_way(tmp_path, make_log):
+    sync = open_sync(tmp_path)
+    sync.files.put_many([make_log("2025-01-01")])
+    sync.db.put_many([make_log("2025-01-02")])
+
+    actions = sync.plan()
+    assert actions == [(TO_DB, date(2025, 1, 1)), (TO_FILE, date(2025, 1, 2))]
+    sync.apply(actions)
+
+    assert sync.files.list_dates() == sync.db.list_dates() == [date(2025, 1, 1), date(2025, 1, 2)]
+    assert sync.plan() == []
+    sync.db.close()
+
+
+def test_rebuild_summary_skips_and_reports_unreadable_logs(storage, make_log):
+    storage.save_log(make_log("2025-01-01"))
+    storage.save_log(make_log("2025-01-02"))
+    storage.backend.get_log_path(date(2025, 1, 2)).write_text('{"date": "2025-01-02", ')
+
+    assert storage.rebuild_summary() == [date(2025, 1, 2)]
+    assert storage.rebuild_search_index() == [date(2025, 1, 2)]
+    assert storage.get_summary().summary()["total_logs"] == 1
+
+
+def test_sync_reports_unreadable_files_instead_of_failing(tmp_path, make_log, monkeypatch, capsys):
+    files = JsonFileBackend(tmp_path)
+    files.put_many([make_log("2025-01-01"), make_log("2025-01-02")])
+    files.get_log_path(date(2025, 1, 2)).write_text("{not json")
+
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("STORAGE_BACKEND", "json")
+    monkeypatch.setattr(sys, "argv", ["storage_sync.py", "sync"])
+    storage_sync.main()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines[-2]["summary"]["unreadable"] == 1
+    assert lines[-1] == {"unreadable": ["2025-01-02"]}
+
+    storage = WorkoutStorage(data_dir=tmp_path)
+    assert storage.get_summary().summary()["total_logs"] == 1
+    storage.close()
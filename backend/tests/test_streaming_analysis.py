@@ -0,0 +1,69 @@
+"""Incremental parsing of streamed analyses and the server-sent event endpoint."""
+
+import json
+
+import pytest
+
+from ai_service import StreamingAnalysisParser
+from fake_anthropic import FAKE_RESPONSE
+
+
+def parse_in_chunks(text, size):
+    parser = StreamingAnalysisParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    events.extend(parser.close())
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 3, 16, 1000])
+def test_any_chunking_gives_the_same_insight_and_context(analyzer, size):
+    expected = analyzer._parse_analysis_response(FAKE_RESPONSE)
+
+    parser, events = parse_in_chunks(FAKE_RESPONSE, size)
+
+    insight = "".join(text for kind, text in events if kind == "insight")
+    assert " ".join(insight.split()) == expected.human_insight
+    assert parser.context == expected.machine_context.model_dump(exclude_unset=True)
+    assert all(kind in ("insight", "context") for kind, _ in events)
+
+
+def test_context_fields_are_reported_once_their_values_are_complete():
+    parser = StreamingAnalysisParser()
+    parser.feed('### MACHINE CONTEXT\n```json\n{\n  "overall_fatigue": "hi')
+    assert parser.context == {}
+
+    events = parser.feed('gh",\n  "problem_areas": [\n    "calves",\n')
+    assert events == [("context", {"overall_fatigue": "high"})]
+
+    events = parser.feed('    "hips"\n  ],\n')
+    assert events == [("context", {"problem_areas": ["calves", "hips"]})]
+
+
+def test_markers_split_across_chunks_are_not_sent_as_insight():
+    _, events = parse_in_chunks("### HUMAN INSIGHT\nRest.\n### MACHINE CONTEXT\n", 2)
+
+    assert "".join(text for kind, text in events if kind == "insight") == "Rest.\n"
+
+
+def sse_events(body):
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        yield fields["event"], json.loads(fields["data"])
+
+
+def test_endpoint_streams_insight_context_and_the_saved_log(client):
+    client.post("/logs", json={"date": "2025-01-01", "workout_type": "strength"})
+
+    response = client.post("/analysis/2025-01-01/stream")
+    events = list(sse_events(response.text))
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert {kind for kind, _ in events[:-1]} == {"insight", "context"}
+    kind, saved = events[-1]
+    assert kind == "done"
+    assert saved["ai_analysis"]["machine_context"]["overall_fatigue"] == "moderate"
+    assert client.get("/logs/2025-01-01").json()["ai_analysis"] == saved["ai_analysis"]
+
+    assert client.post("/analysis/2025-01-02/stream").status_code == 404
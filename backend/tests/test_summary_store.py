@@ -0,0 +1,105 @@
+"""The append-only columnar summary behind the stats endpoints."""
+
+from datetime import date
+
+import numpy as np
+
+from storage import WorkoutStorage
+from summary_store import COMPACT_SLACK, MAGIC, SUMMARY_DTYPE, SummaryStore
+from trends import pain_area_counts
+
+
+def open_store(tmp_path):
+    return SummaryStore(tmp_path / "summary.bin")
+
+
+def test_the_latest_record_per_date_wins_and_survives_a_reload(tmp_path, make_log):
+    store = open_store(tmp_path)
+    store.upsert_many([make_log("2025-01-01"), make_log("2025-01-02")])
+    store.upsert(make_log("2025-01-01", workout_type="run"))
+    store.remove(date(2025, 1, 2))
+    store.close()
+
+    reloaded = open_store(tmp_path)
+    summary = reloaded.summary()
+    assert summary["total_logs"] == 1
+    assert summary["workout_types"] == {"run": 1}
+    assert reloaded.matches([date(2025, 1, 1)])
+    reloaded.close()
+
+
+def test_columns_hold_encoded_fields_and_can_be_limited_to_a_range(tmp_path, make_log):
+    store = open_store(tmp_path)
+    store.upsert_many([
+        make_log("2025-01-01", exercises=[{"name": "Squat", "sets": 3, "reps": 5}]),
+        make_log("2025-01-05", workout_type="run", running_data={"distance_km": 8.0}, fatigue_level=6,
+                 pain_or_tightness={"body_areas": ["Left Calf "], "description": "tight"}),
+    ])
+
+    columns = store.columns(start_date=date(2025, 1, 2))
+    assert columns["date"].tolist() == [date(2025, 1, 5)]
+    assert columns["distance_km"][0] == 8.0
+    assert columns["fatigue_level"][0] == 6
+    assert pain_area_counts(columns["pain_areas"], store.body_areas) == {"left calf": 1}
+
+    first = store.columns(end_date=date(2025, 1, 1))
+    assert (first["total_sets"][0], first["total_reps"][0]) == (3, 15)
+    assert np.isnan(first["distance_km"][0])
+    store.close()
+
+
+def test_a_partial_record_left_by_a_crash_is_cut_off(tmp_path, make_log):
+    store = open_store(tmp_path)
+    store.upsert(make_log("2025-01-01"))
+    store.close()
+    with open(tmp_path / "summary.bin", "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    reloaded = open_store(tmp_path)
+    reloaded.upsert(make_log("2025-01-02"))
+    assert reloaded.matches([date(2025, 1, 1), date(2025, 1, 2)])
+    assert (tmp_path / "summary.bin").stat().st_size == len(MAGIC) + 2 * SUMMARY_DTYPE.itemsize
+    reloaded.close()
+
+
+def test_superseded_records_are_compacted_away(tmp_path, make_log):
+    store = open_store(tmp_path)
+    for fatigue in range(COMPACT_SLACK + 10):
+        store.upsert(make_log("2025-01-01", fatigue_level=fatigue % 10 + 1))
+
+    assert (tmp_path / "summary.bin").stat().st_size < len(MAGIC) + COMPACT_SLACK * SUMMARY_DTYPE.itemsize
+    assert store.summary()["total_logs"] == 1
+    store.close()
+
+
+def test_a_sidecar_from_another_format_version_loads_empty(tmp_path, make_log):
+    store = open_store(tmp_path)
+    store.upsert(make_log("2025-01-01"))
+    store.close()
+    path = tmp_path / "summary.bin"
+    path.write_bytes(b"WTSUM000" + path.read_bytes()[len(MAGIC):])
+
+    reloaded = open_store(tmp_path)
+    assert reloaded.summary()["total_logs"] == 0
+    reloaded.close()
+
+
+def test_storage_rebuilds_a_missing_summary_from_the_logs(tmp_path, make_log):
+    storage = WorkoutStorage(data_dir=tmp_path)
+    storage.save_log(make_log("2025-01-01"))
+    storage.close()
+    (tmp_path / "summary.bin").unlink()
+
+    storage = WorkoutStorage(data_dir=tmp_path)
+    assert storage.get_summary().summary()["total_logs"] == 1
+    storage.close()
+
+
+def test_a_summary_written_by_saves_alone_is_reused_on_restart(tmp_path, make_log):
+    storage = WorkoutStorage(data_dir=tmp_path)
+    storage.save_log(make_log("2025-01-01"))
+    storage.close()
+
+    storage = WorkoutStorage(data_dir=tmp_path)
+    assert storage.summary.matches([date(2025, 1, 1)])
+    storage.close()
@@ -0,0 +1,53 @@
+"""The synthetic history generator and regression check used by the benchmarks."""
+
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from bench_suite import compare  # noqa: E402
+from storage import WorkoutStorage  # noqa: E402
+from synthetic import END_DATE, generate_logs, write_history  # noqa: E402
+
+
+def test_the_same_seed_gives_the_same_history():
+    first = [log.model_dump_json() for log in generate_logs(120, seed=3)]
+
+    assert first == [log.model_dump_json() for log in generate_logs(120, seed=3)]
+    assert first != [log.model_dump_json() for log in generate_logs(120, seed=4)]
+
+
+def test_history_covers_the_requested_days_oldest_first():
+    logs = list(generate_logs(365))
+    dates = [log.date for log in logs]
+
+    assert dates == sorted(set(dates))
+    assert dates[0] >= END_DATE - timedelta(days=364) and dates[-1] <= END_DATE
+    assert 150 < len(logs) < 365
+    assert {log.workout_type.value for log in logs} >= {"strength", "run", "recovery"}
+    assert any(log.pain_or_tightness for log in logs)
+    assert any(log.ai_analysis for log in logs)
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_written_histories_open_in_storage(tmp_path, backend):
+    count = write_history(tmp_path, 60, backend=backend, batch_size=7)
+
+    storage = WorkoutStorage(data_dir=tmp_path, backend=backend)
+    assert len(storage.list_all_dates()) == count
+    assert storage.get_summary().summary()["total_logs"] == count
+    storage.close()
+
+
+def test_compare_flags_slower_timings_and_lower_throughput():
+    baseline = {"results": [{"days": 1000, "backend": "json", "metrics": {"get_ms": 10.0, "saves_per_s": 100.0}}]}
+    results = [{"days": 1000, "backend": "json", "metrics": {"get_ms": 14.0, "saves_per_s": 70.0}}]
+
+    assert compare(results, baseline, tolerance=0.25) == [
+        "json/1000d get_ms: 10.0 -> 14.0 ms",
+        "json/1000d saves_per_s: 100.0 -> 70.0 /s",
+    ]
+    assert compare(results, baseline, tolerance=0.5) == []
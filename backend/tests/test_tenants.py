@@ -0,0 +1,142 @@
+"""TenantRegistry: tenant directories, eviction and the resources it releases."""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from storage import WorkoutStorage
+from tenants import DEFAULT_TENANT, Tenant, TenantRegistry, tenant_dir
+
+
+def open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+def simple_tenant(tenant_id: str, data_dir: Path) -> Tenant:
+    return Tenant(tenant_id, WorkoutStorage(data_dir=data_dir), None, None)
+
+
+def test_tenant_dirs_are_hashed_and_the_default_tenant_uses_the_root(tmp_path):
+    assert tenant_dir(tmp_path, DEFAULT_TENANT) == tmp_path
+    path = tenant_dir(tmp_path, "alice")
+    assert path.name == "alice"
+    assert path.parent.parent.parent == tmp_path / "tenants"
+
+
+def test_invalid_tenant_ids_are_rejected(tmp_path):
+    registry = TenantRegistry(tmp_path, simple_tenant)
+    assert registry.validate(None) == DEFAULT_TENANT
+    assert registry.validate("bob-1") == "bob-1"
+    for bad in ("../etc", ".hidden", "a/b", "x" * 65):
+        with pytest.raises(ValueError):
+            registry.validate(bad)
+
+    single = TenantRegistry(tmp_path, simple_tenant, multi_tenant=False)
+    with pytest.raises(ValueError):
+        single.validate("bob")
+
+
+def test_least_recently_used_idle_tenants_are_closed_over_the_limit(tmp_path):
+    closed = []
+
+    def open_tenant(tenant_id, data_dir):
+        tenant = simple_tenant(tenant_id, data_dir)
+        tenant.on_close = lambda: closed.append(tenant_id)
+        return tenant
+
+    registry = TenantRegistry(tmp_path, open_tenant, max_open=2)
+    a = registry.acquire("a")
+    registry.acquire("b").release()
+    registry.acquire("c").release()
+
+    # "a" is in use, so the idle "b" goes instead
+    assert closed == ["b"]
+    assert [tenant.id for tenant in registry.open_tenants()] == ["a", "c"]
+
+    a.release()
+    registry.acquire("d").release()
+    assert closed == ["b", "a"]
+    registry.close()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc/self/fd")
+def test_evicted_tenants_release_their_file_descriptors(tmp_path, make_log):
+    registry = TenantRegistry(tmp_path, simple_tenant, max_open=2)
+    # Warm up anything opened once per process
+    tenant = registry.acquire("warm")
+    tenant.storage.save_log(make_log("2025-01-01"))
+    tenant.release()
+    registry.close()
+
+    before = open_fds()
+    for i in range(50):
+        tenant = registry.acquire(f"t{i}")
+        tenant.storage.save_log(make_log("2025-01-01"))
+        tenant.release()
+    registry.close()
+
+    assert open_fds() <= before
+
+
+def test_a_slow_tenant_does_not_block_others(tmp_path):
+    release_slow = threading.Event()
+
+    def open_tenant(tenant_id, data_dir):
+        if tenant_id == "slow":
+            release_slow.wait(5)
+        return simple_tenant(tenant_id, data_dir)
+
+    registry = TenantRegistry(tmp_path, open_tenant)
+    slow = threading.Thread(target=lambda: registry.acquire("slow").release())
+    slow.start()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    registry.acquire("fast").release()
+    assert time.monotonic() - start < 1
+
+    release_slow.set()
+    slow.join()
+    registry.close()
+
+
+def test_concurrent_requests_open_a_tenant_once(tmp_path):
+    opened = []
+
+    def open_tenant(tenant_id, data_dir):
+        opened.append(tenant_id)
+        time.sleep(0.05)
+        return simple_tenant(tenant_id, data_dir)
+
+    registry = TenantRegistry(tmp_path, open_tenant)
+    acquired = []
+    threads = [threading.Thread(target=lambda: acquired.append(registry.acquire("a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert opened == ["a"]
+    assert len({id(tenant) for tenant in acquired}) == 1
+    assert acquired[0].in_use == 8
+    registry.close()
+
+
+def test_a_failed_open_can_be_retried(tmp_path):
+    attempts = []
+
+    def open_tenant(tenant_id, data_dir):
+        attempts.append(tenant_id)
+        if len(attempts) == 1:
+            raise OSError("disk unavailable")
+        return simple_tenant(tenant_id, data_dir)
+
+    registry = TenantRegistry(tmp_path, open_tenant)
+    with pytest.raises(OSError):
+        registry.acquire("a")
+    registry.acquire("a").release()
+    assert attempts == ["a", "a"]
+    registry.close()
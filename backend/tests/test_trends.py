@@ -0,0 +1,104 @@
+"""/stats/trends computed from the summary columns."""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from summary_store import SummaryStore
+from trends import ACUTE_DAYS, CHRONIC_DAYS, EFFORT_LOAD, compute_trends
+
+EFFORTS = [None, "easy", "moderate", "hard"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SummaryStore(tmp_path / "summary.bin")
+    yield store
+    store.close()
+
+
+def test_weekly_and_monthly_totals(store, make_log):
+    store.upsert_many([
+        # Monday and Sunday of one ISO week, then the next Monday (a new month too)
+        make_log("2025-01-27", exercises=[{"name": "Squat", "sets": 3, "reps": 5}]),
+        make_log("2025-02-02", workout_type="run", running_data={"distance_km": 5.0, "duration_minutes": 30}),
+        make_log("2025-02-03", workout_type="run", running_data={"distance_km": 10.0, "duration_minutes": 55}),
+    ])
+
+    trends = compute_trends(store, date(2025, 1, 27), date(2025, 2, 9))
+
+    assert [(w["period"], w["sessions"], w["running_km"]) for w in trends["weekly"]] == [
+        ("2025-01-27", 2, 5.0), ("2025-02-03", 1, 10.0)
+    ]
+    assert trends["weekly"][0]["total_reps"] == 15
+    assert [(m["period"], m["sessions"]) for m in trends["monthly"]] == [("2025-01", 1), ("2025-02", 2)]
+    assert len(trends["daily"]["dates"]) == 14
+
+
+def test_daily_load_and_acwr_match_a_day_by_day_computation(store, make_log):
+    rng = random.Random(4)
+    start, end = date(2025, 3, 1), date(2025, 4, 30)
+    loads = {}
+    logs = []
+    day = start - timedelta(days=40)
+    while day <= end:
+        if rng.random() < 0.6:
+            effort = rng.choice(EFFORTS)
+            logs.append(make_log(day, perceived_effort=effort))
+            loads[day] = EFFORT_LOAD[EFFORTS.index(effort)]
+        day += timedelta(days=1)
+    store.upsert_many(logs)
+
+    daily = compute_trends(store, start, end)["daily"]
+
+    def window(day, days):
+        return sum(loads.get(day - timedelta(days=i), 0.0) for i in range(days)) / days
+
+    for i, iso in enumerate(daily["dates"]):
+        day = date.fromisoformat(iso)
+        acute, chronic = window(day, ACUTE_DAYS), window(day, CHRONIC_DAYS)
+        assert daily["load"][i] == loads.get(day, 0.0)
+        assert daily["acute_load"][i] == pytest.approx(acute, abs=0.01)
+        assert daily["chronic_load"][i] == pytest.approx(chronic, abs=0.01)
+        assert daily["acwr"][i] == pytest.approx(round(acute / chronic, 2), abs=0.01)
+
+
+def test_fatigue_average_skips_days_without_a_rating(store, make_log):
+    store.upsert_many([make_log("2025-01-01", fatigue_level=4), make_log("2025-01-03", fatigue_level=8)])
+
+    fatigue = compute_trends(store, date(2025, 1, 1), date(2025, 1, 3))["daily"]["fatigue_ma"]
+
+    assert fatigue == [4.0, 4.0, 6.0]
+
+
+def test_pace_trend_and_pain_frequency(store, make_log):
+    store.upsert_many([
+        make_log("2025-01-01", workout_type="run", running_data={"pace_min_per_km": 6.0}),
+        make_log("2025-01-31", workout_type="run", running_data={"pace_min_per_km": 5.5},
+                 pain_or_tightness={"body_areas": ["calf"], "description": "tight"}),
+    ])
+
+    trends = compute_trends(store, date(2025, 1, 1), date(2025, 1, 31))
+
+    assert trends["pace"]["pace_min_per_km"] == [6.0, 5.5]
+    assert trends["pace"]["trend_per_30_days"] == -0.5
+    assert trends["pain_areas"] == {"calf": {"count": 1, "frequency": 0.5}}
+
+
+def test_empty_ranges_have_no_ratio(store):
+    trends = compute_trends(store, date(2025, 1, 1), date(2025, 1, 7))
+
+    assert trends["total_logs"] == 0
+    assert trends["daily"]["acwr"] == [None] * 7
+
+
+def test_endpoint_defaults_to_the_first_log_and_rejects_reversed_ranges(client):
+    client.post("/logs", json={"date": "2025-01-01", "workout_type": "strength"})
+
+    trends = client.get("/stats/trends", params={"end_date": "2025-01-07"}).json()
+    assert trends["start_date"] == "2025-01-01"
+    assert trends["total_logs"] == 1
+
+    assert client.get("/stats/trends", params={"start_date": "2025-02-01", "end_date": "2025-01-01"}).status_code == 400
+    assert client.get("/stats/trends", params={"load_metric": "vibes"}).status_code == 422
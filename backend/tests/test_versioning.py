@@ -0,0 +1,73 @@
+"""Per-date locking, log versions and conditional updates with If-Match."""
+
+import threading
+from datetime import date
+
+import pytest
+
+from models import Exercise
+from storage import VersionConflict
+
+LOG = {"date": "2025-03-01", "workout_type": "strength", "fatigue_level": 4}
+
+
+def test_put_with_the_current_etag_succeeds(client):
+    client.post("/logs", json=LOG)
+    etag = client.get("/logs/2025-03-01").headers["etag"]
+
+    updated = client.put("/logs/2025-03-01", json={**LOG, "fatigue_level": 5}, headers={"If-Match": etag})
+
+    assert updated.status_code == 200
+    assert updated.headers["etag"] != etag
+    assert updated.headers["etag"] == client.get("/logs/2025-03-01").headers["etag"]
+
+
+def test_put_with_a_stale_etag_is_rejected_with_412(client):
+    client.post("/logs", json=LOG)
+    stale = client.get("/logs/2025-03-01").headers["etag"]
+    client.put("/logs/2025-03-01", json={**LOG, "fatigue_level": 5})
+
+    rejected = client.put("/logs/2025-03-01", json={**LOG, "fatigue_level": 9}, headers={"If-Match": stale})
+
+    assert rejected.status_code == 412
+    assert rejected.headers["etag"] == client.get("/logs/2025-03-01").headers["etag"]
+    assert client.get("/logs/2025-03-01").json()["fatigue_level"] == 5
+
+
+@pytest.mark.parametrize("if_match, status", [("*", 200), ('"1"', 200), ("1", 200), ('"2"', 412), ('W/"nope"', 412)])
+def test_if_match_accepts_any_or_the_version_number(client, if_match, status):
+    client.post("/logs", json=LOG)
+
+    assert client.put("/logs/2025-03-01", json=LOG, headers={"If-Match": if_match}).status_code == status
+
+
+def test_save_log_checks_the_expected_version(storage, make_log):
+    storage.save_log(make_log("2025-01-01"), expected_version=0)
+
+    with pytest.raises(VersionConflict) as conflict:
+        storage.save_log(make_log("2025-01-01"), expected_version=0)
+    assert conflict.value.current_version == 1
+
+    storage.save_log(make_log("2025-01-01", fatigue_level=2), expected_version=1)
+    assert storage.get_log(date(2025, 1, 1)).metadata.version == 2
+
+
+def test_locked_read_modify_writes_from_threads_lose_no_updates(storage, make_log):
+    storage.save_log(make_log("2025-01-01", exercises=[]))
+    day = date(2025, 1, 1)
+
+    def add_exercise(i):
+        with storage.lock(day):
+            log = storage.get_log(day)
+            log.exercises = log.exercises + [Exercise(name=f"Lift {i}")]
+            storage.save_log(log)
+
+    threads = [threading.Thread(target=add_exercise, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    log = storage.get_log(day)
+    assert len(log.exercises) == 16
+    assert log.metadata.version == 17
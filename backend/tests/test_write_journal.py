@@ -0,0 +1,144 @@
+"""Atomic writes and the group-commit journal, including recovery and sharing between processes."""
+
+import threading
+import time
+
+import pytest
+
+import write_journal
+from write_journal import WriteJournal, atomic_write, journal_lock
+
+
+def test_atomic_write_replaces_the_file_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "log.json"
+    path.write_bytes(b"old")
+
+    atomic_write(path, b"new", fsync=True)
+
+    assert path.read_bytes() == b"new"
+    assert [p.name for p in tmp_path.iterdir()] == ["log.json"]
+
+
+def test_failed_atomic_write_keeps_the_old_contents(tmp_path, monkeypatch):
+    path = tmp_path / "log.json"
+    path.write_bytes(b"old")
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(write_journal.os, "replace", fail)
+    with pytest.raises(OSError):
+        atomic_write(path, b"new")
+
+    assert path.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["log.json"]
+
+
+def test_commits_are_applied_and_checkpointed(tmp_path):
+    journal = WriteJournal(tmp_path / "journal.wal", tmp_path)
+    (tmp_path / "logs").mkdir()
+
+    journal.commit([("logs/a.json", b"A"), ("logs/b.json", b"B")])
+    journal.commit([("logs/b.json", None)])
+
+    assert (tmp_path / "logs" / "a.json").read_bytes() == b"A"
+    assert not (tmp_path / "logs" / "b.json").exists()
+    assert (tmp_path / "journal.wal").stat().st_size > 0
+
+    journal.close()
+    assert (tmp_path / "journal.wal").stat().st_size == 0
+
+
+def test_paths_outside_the_base_directory_are_rejected(tmp_path):
+    journal = WriteJournal(tmp_path / "journal.wal", tmp_path / "base")
+    with pytest.raises(ValueError):
+        journal.commit([("../escaped.json", b"x")])
+    journal.close()
+    assert not (tmp_path / "escaped.json").exists()
+
+
+def test_recover_replays_complete_records_and_drops_a_torn_tail(tmp_path):
+    (tmp_path / "logs").mkdir()
+    records = WriteJournal._encode("logs/a.json", b"A1") + WriteJournal._encode("logs/a.json", b"A2")
+    torn = WriteJournal._encode("logs/b.json", b"B")[:-1]
+    (tmp_path / "journal.wal").write_bytes(records + torn)
+
+    assert WriteJournal.recover(tmp_path / "journal.wal", tmp_path) == 2
+
+    assert (tmp_path / "logs" / "a.json").read_bytes() == b"A2"
+    assert not (tmp_path / "logs" / "b.json").exists()
+    assert (tmp_path / "journal.wal").stat().st_size == 0
+
+
+def test_recover_skips_corrupt_records(tmp_path):
+    record = bytearray(WriteJournal._encode("a.json", b"AAAA"))
+    record[-1] ^= 0xFF
+    (tmp_path / "journal.wal").write_bytes(bytes(record))
+
+    assert WriteJournal.recover(tmp_path / "journal.wal", tmp_path) == 0
+    assert not (tmp_path / "a.json").exists()
+
+
+def test_concurrent_commits_share_fsyncs(tmp_path):
+    journal = WriteJournal(tmp_path / "journal.wal", tmp_path)
+    threads = [
+        threading.Thread(target=lambda i=i: journal.commit([(f"{i}.json", b"x")]))
+        for i in range(32)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = journal.stats()
+    assert stats["commits"] == 32
+    assert stats["fsyncs"] <= 32
+    assert len(list(tmp_path.glob("*.json"))) == 32
+    journal.close()
+
+
+@pytest.mark.skipif(write_journal.fcntl is None, reason="needs fcntl")
+def test_recovery_waits_for_a_journal_locked_by_another_process(tmp_path):
+    path = tmp_path / "journal.wal"
+    path.write_bytes(WriteJournal._encode("a.json", b"A"))
+    recovered = []
+
+    # A separate open file stands in for another worker's journal
+    with open(path, "r+b") as other, journal_lock(other):
+        thread = threading.Thread(target=lambda: recovered.append(WriteJournal.recover(path, tmp_path)))
+        thread.start()
+        time.sleep(0.1)
+        assert recovered == []
+    thread.join(5)
+
+    assert recovered == [1]
+
+
+def test_a_new_journal_on_a_live_one_keeps_its_writes(tmp_path):
+    path = tmp_path / "journal.wal"
+    first = WriteJournal(path, tmp_path)
+    first.commit([("a.json", b"A")])
+
+    # A second worker starting up replays and empties the shared journal
+    second = WriteJournal(path, tmp_path)
+    second.commit([("b.json", b"B")])
+    first.commit([("a.json", b"A2")])
+
+    assert (tmp_path / "a.json").read_bytes() == b"A2"
+    assert (tmp_path / "b.json").read_bytes() == b"B"
+    second.close()
+    first.close()
+
+
+def test_checkpoint_flushes_files_journaled_by_other_processes(tmp_path, monkeypatch):
+    path = tmp_path / "journal.wal"
+    first = WriteJournal(path, tmp_path)
+    second = WriteJournal(path, tmp_path)
+    second.commit([("b.json", b"B")])
+
+    synced = []
+    monkeypatch.setattr(WriteJournal, "_sync_files", staticmethod(lambda paths: synced.extend(paths)))
+    first.checkpoint()
+
+    assert tmp_path / "b.json" in synced
+    assert path.stat().st_size == 0
@@ -0,0 +1,187 @@
+"""Vectorised training trends computed from the columnar summary."""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from summary_store import SummaryStore, EPOCH_ORDINAL
+
+# Session load per perceived effort code: not recorded, easy, moderate, hard
+EFFORT_LOAD = np.array([1.0, 1.0, 2.0, 3.0])
+
+LOAD_METRICS = ("effort", "reps", "running_km", "running_minutes")
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+FATIGUE_WINDOW_DAYS = 7
+PACE_WINDOW_RUNS = 5
+
+
+def _values(array: np.ndarray, digits: int = 2) -> List[Optional[float]]:
+    """Convert a float array to a JSON-friendly list (NaN becomes None)."""
+    rounded = np.round(array.astype(float), digits)
+    return [None if np.isnan(v) else float(v) for v in rounded]
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing rolling sum (current element plus the window - 1 before it)."""
+    cumulative = np.cumsum(values, dtype=float)
+    result = cumulative.copy()
+    result[window:] -= cumulative[:-window]
+    return result
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division with NaN where the denominator is zero."""
+    result = np.full(len(numerator), np.nan)
+    np.divide(numerator, denominator, out=result, where=denominator > 0)
+    return result
+
+
+def _session_load(columns: Dict[str, np.ndarray], metric: str) -> np.ndarray:
+    """Per-log training load for the chosen metric."""
+    if metric == "effort":
+        return EFFORT_LOAD[columns["perceived_effort"]]
+    if metric == "reps":
+        return columns["total_reps"].astype(float)
+    if metric == "running_km":
+        return np.nan_to_num(columns["distance_km"].astype(float))
+    return np.nan_to_num(columns["duration_minutes"].astype(float))
+
+
+def _period_totals(periods: np.ndarray, columns: Dict[str, np.ndarray], labels) -> List[dict]:
+    """Sum volume and running columns per period (week or month)."""
+    keys, inverse = np.unique(periods, return_inverse=True)
+    size = len(keys)
+
+    def total(values):
+        return np.bincount(inverse, weights=values, minlength=size)
+
+    sessions = np.bincount(inverse, minlength=size)
+    sets = total(columns["total_sets"].astype(float))
+    reps = total(columns["total_reps"].astype(float))
+    km = total(np.nan_to_num(columns["distance_km"].astype(float)))
+    minutes = total(np.nan_to_num(columns["duration_minutes"].astype(float)))
+
+    return [
+        {
+            "period": labels(key),
+            "sessions": int(sessions[i]),
+            "total_sets": int(sets[i]),
+            "total_reps": int(reps[i]),
+            "running_km": round(float(km[i]), 2),
+            "running_minutes": round(float(minutes[i]), 1)
+        }
+        for i, key in enumerate(keys)
+    ]
+
+
+def pain_area_counts(masks: np.ndarray, body_areas: List[str]) -> Dict[str, int]:
+    """Count logs per body area by unpacking the pain_areas bitmask column."""
+    masks = masks.astype("<u8")
+    bits = np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    counts = bits.sum(axis=0)
+    return {area: int(counts[bit]) for bit, area in enumerate(body_areas) if counts[bit]}
+
+
+def compute_trends(
+    store: SummaryStore,
+    start_date: date,
+    end_date: date,
+    load_metric: str = "effort"
+) -> dict:
+    """
+    Compute weekly/monthly volume, pace, workload and fatigue/pain trends.
+
+    Load, ACWR and fatigue series are dense (one entry per calendar day in the
+    range). The chronic window looks back before start_date so the first days
+    of the range already have a full 28-day baseline.
+    """
+    # Pull enough history for the trailing windows, then a mask for the range
+    lookback = max(CHRONIC_DAYS, FATIGUE_WINDOW_DAYS) - 1
+    columns = store.columns(start_date - timedelta(days=lookback), end_date)
+    days = columns["date"].astype(np.int64)
+    start_day = start_date.toordinal() - EPOCH_ORDINAL
+    first_day = start_day - lookback
+    num_days = end_date.toordinal() - EPOCH_ORDINAL - first_day + 1
+    day_index = days - first_day
+
+    in_range = days >= start_day
+    ranged = {name: values[in_range] for name, values in columns.items()}
+    ranged_days = days[in_range]
+    calendar = np.arange(start_day, start_day + num_days - lookback).astype("datetime64[D]")
+    visible = slice(lookback, num_days)
+
+    # Weekly (ISO weeks starting Monday; 1970-01-01 was a Thursday) and monthly totals
+    week_starts = ranged_days - (ranged_days + 3) % 7
+    weekly = _period_totals(
+        week_starts, ranged,
+        lambda key: str(np.datetime64(int(key), "D"))
+    )
+    monthly = _period_totals(
+        ranged["date"].astype("datetime64[M]"), ranged,
+        lambda key: str(key)
+    )
+
+    # Daily load and acute:chronic workload ratio
+    load = _session_load(columns, load_metric)
+    daily_load = np.bincount(day_index, weights=load, minlength=num_days)
+    acute = _rolling_sum(daily_load, ACUTE_DAYS) / ACUTE_DAYS
+    chronic = _rolling_sum(daily_load, CHRONIC_DAYS) / CHRONIC_DAYS
+    acwr = _safe_divide(acute, chronic)
+
+    # Fatigue moving average over days that recorded fatigue
+    fatigue = columns["fatigue_level"].astype(float)
+    has_fatigue = fatigue > 0
+    fatigue_sum = np.bincount(day_index[has_fatigue], weights=fatigue[has_fatigue], minlength=num_days)
+    fatigue_count = np.bincount(day_index[has_fatigue], minlength=num_days).astype(float)
+    fatigue_ma = _safe_divide(
+        _rolling_sum(fatigue_sum, FATIGUE_WINDOW_DAYS),
+        _rolling_sum(fatigue_count, FATIGUE_WINDOW_DAYS)
+    )
+
+    # Pace per run, rolling mean over recent runs and a linear trend
+    pace = ranged["pace_min_per_km"].astype(float)
+    has_pace = ~np.isnan(pace)
+    run_pace = pace[has_pace]
+    run_days = ranged_days[has_pace]
+    pace_ma = _safe_divide(
+        _rolling_sum(run_pace, PACE_WINDOW_RUNS),
+        _rolling_sum(np.ones(len(run_pace)), PACE_WINDOW_RUNS)
+    )
+    pace_slope = None
+    if len(run_pace) >= 2 and run_days[-1] > run_days[0]:
+        # Minutes per km gained (+) or lost (-) per 30 days
+        pace_slope = round(float(np.polyfit(run_days, run_pace, 1)[0] * 30), 3)
+
+    # Pain frequency per body area
+    total_logs = len(ranged_days)
+    pain = {
+        area: {"count": count, "frequency": round(count / total_logs, 3)}
+        for area, count in pain_area_counts(ranged["pain_areas"], store.body_areas).items()
+    }
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_logs": total_logs,
+        "load_metric": load_metric,
+        "weekly": weekly,
+        "monthly": monthly,
+        "daily": {
+            "dates": [str(d) for d in calendar],
+            "load": _values(daily_load[visible]),
+            "acute_load": _values(acute[visible]),
+            "chronic_load": _values(chronic[visible]),
+            "acwr": _values(acwr[visible]),
+            "fatigue_ma": _values(fatigue_ma[visible])
+        },
+        "pace": {
+            "dates": [str(d) for d in run_days.astype("datetime64[D]")],
+            "pace_min_per_km": _values(run_pace),
+            "rolling_avg": _values(pace_ma),
+            "trend_per_30_days": pace_slope
+        },
+        "pain_areas": pain
+    }
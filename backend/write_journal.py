@@ -0,0 +1,290 @@
+"""Atomic file writes and a group-commit write-ahead journal."""
+
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: the journal is only safe within one process
+    fcntl = None
+
+# Record header: magic, data length (0xFFFFFFFF = delete), crc32, path length
+RECORD_HEADER = struct.Struct("<4sIIH")
+RECORD_MAGIC = b"WJR1"
+DELETE_MARKER = 0xFFFFFFFF
+
+# A journal operation: path relative to the base directory, and the new
+# file contents (None deletes the file)
+JournalOp = Tuple[str, Optional[bytes]]
+
+
+def fsync_dir(path: Path) -> None:
+    """Flush a directory entry (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: Path, data: bytes, fsync: bool = False) -> None:
+    """
+    Replace a file with `data` via a temp file and rename.
+
+    Readers see either the old or the new contents, never a partial write.
+    With `fsync`, the data and the rename are flushed to disk before
+    returning.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    if fsync:
+        fsync_dir(path.parent)
+
+
+@contextmanager
+def journal_lock(f: BinaryIO) -> Iterator[None]:
+    """Hold an exclusive lock on an open journal file against other processes."""
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class WriteJournal:
+    """
+    Write-ahead journal that lets concurrent writers share fsyncs.
+
+    Writers append their operations to the journal and block until it is
+    durable. Whoever finds no flush in progress becomes the leader: it writes
+    every queued operation with a single write and fsync, then applies them
+    to their target files without further fsyncs. Once the journal grows past
+    `checkpoint_bytes`, the touched files are fsynced and the journal is
+    truncated. After a crash, `recover` replays the complete records left in
+    the journal; a torn record at the end is discarded.
+
+    Several processes (e.g. uvicorn workers) may share a journal: appends,
+    replays and checkpoints each hold an exclusive flock on it, and a
+    checkpoint flushes the files of every record in the journal, not only
+    its own, before truncating it.
+    """
+
+    def __init__(self, path: Path, base_dir: Path, checkpoint_bytes: int = 4 * 1024 * 1024):
+        """Open (and first recover) the journal at `path`; op paths are relative to `base_dir`."""
+        self.path = Path(path)
+        self.base_dir = Path(base_dir)
+        self.checkpoint_bytes = checkpoint_bytes
+
+        self.recover(self.path, self.base_dir)
+        self._file = open(self.path, 'ab')
+
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[int, List[JournalOp]]] = []
+        self._next_seq = 0
+        self._done_seq = -1
+        self._flushing = False
+        self._errors: Dict[int, BaseException] = {}
+        self._dirty: Set[Path] = set()
+        self._commits = 0
+        self._fsyncs = 0
+
+    def commit(self, ops: List[JournalOp]) -> None:
+        """Durably apply a group of operations, batching with concurrent callers."""
+        with self._cond:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending.append((seq, ops))
+
+            while self._done_seq < seq:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+
+                # Become the leader for everything queued so far
+                self._flushing = True
+                batch, self._pending = self._pending, []
+                self._cond.release()
+                try:
+                    self._flush(batch)
+                except BaseException as e:
+                    for batch_seq, _ in batch:
+                        self._errors[batch_seq] = e
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    self._done_seq = batch[-1][0]
+                    self._cond.notify_all()
+
+            error = self._errors.pop(seq, None)
+        if error:
+            raise error
+
+    def checkpoint(self) -> None:
+        """Flush every file written through the journal, then truncate it."""
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            self._flushing = True
+        try:
+            with journal_lock(self._file):
+                self._checkpoint()
+        finally:
+            with self._cond:
+                self._flushing = False
+                self._cond.notify_all()
+
+    def close(self) -> None:
+        """Checkpoint and close the journal file."""
+        self.checkpoint()
+        self._file.close()
+
+    def stats(self) -> dict:
+        """Commit and fsync counters (commits per fsync shows the batching)."""
+        return {"commits": self._commits, "fsyncs": self._fsyncs}
+
+    @classmethod
+    def recover(cls, path: Path, base_dir: Path) -> int:
+        """Replay complete records from a journal left by a crash; returns the count."""
+        try:
+            f = open(path, 'r+b')
+        except FileNotFoundError:
+            return 0
+
+        with f, journal_lock(f):
+            raw = f.read()
+            if not raw:
+                return 0
+
+            ops = list(cls._decode(raw))
+            touched = set()
+            for name, data in ops:
+                target = cls._resolve(base_dir, name)
+                if target is None:
+                    continue
+                cls._apply(target, data)
+                touched.add(target)
+
+            cls._sync_files(touched)
+            f.truncate(0)
+            os.fsync(f.fileno())
+        return len(ops)
+
+    def _flush(self, batch: List[Tuple[int, List[JournalOp]]]) -> None:
+        """Journal a batch with one write + fsync, then apply it."""
+        ops = [op for _, group in batch for op in group]
+        with journal_lock(self._file):
+            self._file.write(b"".join(self._encode(name, data) for name, data in ops))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._commits += len(batch)
+            self._fsyncs += 1
+
+            for name, data in ops:
+                target = self._resolve(self.base_dir, name)
+                if target is None:
+                    raise ValueError(f"Journal path escapes base directory: {name}")
+                self._apply(target, data)
+                self._dirty.add(target)
+
+            # Other processes append too, so check the file rather than our offset
+            if os.fstat(self._file.fileno()).st_size >= self.checkpoint_bytes:
+                self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        """
+        Make applied files durable so the journal can be emptied (with the
+        journal locked).
+        """
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        targets = {self._resolve(self.base_dir, name) for name, _ in self._decode(raw)}
+        targets.discard(None)
+
+        self._sync_files(self._dirty | targets)
+        self._dirty = set()
+        self._file.truncate(0)
+        self._file.seek(0)
+        os.fsync(self._file.fileno())
+
+    @staticmethod
+    def _apply(target: Path, data: Optional[bytes]) -> None:
+        """Apply one operation to its file (not fsynced)."""
+        if data is None:
+            target.unlink(missing_ok=True)
+        else:
+            atomic_write(target, data)
+
+    @staticmethod
+    def _sync_files(paths: Set[Path]) -> None:
+        """fsync files and their directories."""
+        for target in paths:
+            try:
+                fd = os.open(target, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        for directory in {target.parent for target in paths}:
+            fsync_dir(directory)
+
+    @staticmethod
+    def _resolve(base_dir: Path, name: str) -> Optional[Path]:
+        """Map a journal path to a file under base_dir, rejecting anything outside it."""
+        parts = PurePosixPath(name).parts
+        if not parts or parts[0] == "/" or ".." in parts:
+            return None
+        return base_dir.joinpath(*parts)
+
+    @staticmethod
+    def _encode(name: str, data: Optional[bytes]) -> bytes:
+        """Serialise one operation as a journal record."""
+        name_bytes = name.encode("utf-8")
+        body = name_bytes + (data or b"")
+        length = DELETE_MARKER if data is None else len(data)
+        crc = zlib.crc32(body, zlib.crc32(struct.pack("<I", length)))
+        return RECORD_HEADER.pack(RECORD_MAGIC, length, crc, len(name_bytes)) + body
+
+    @staticmethod
+    def _decode(raw: bytes):
+        """Yield the valid operations in a journal, stopping at the first torn record."""
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(raw):
+            magic, length, crc, name_len = RECORD_HEADER.unpack_from(raw, offset)
+            data_len = 0 if length == DELETE_MARKER else length
+            start = offset + RECORD_HEADER.size
+            end = start + name_len + data_len
+
+            if magic != RECORD_MAGIC or end > len(raw):
+                return
+            body = raw[start:end]
+            if zlib.crc32(body, zlib.crc32(struct.pack("<I", length))) != crc:
+                return
+
+            name = body[:name_len].decode("utf-8")
+            yield name, None if length == DELETE_MARKER else body[name_len:]
+            offset = end
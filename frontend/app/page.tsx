@@ -1,24 +1,87 @@
 'use client';
 
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { api } from '@/lib/api';
 import { WorkoutLog } from '@/types';
 
+const RECENT_DAYS = 7;
+
+// YYYY-MM-DD of a day relative to today, in local time
+function isoDay(offsetDays: number = 0): string {
+  const d = new Date();
+  d.setDate(d.getDate() + offsetDays);
+  return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+}
+
+function isRecent(date: string): boolean {
+  return date >= isoDay(-(RECENT_DAYS - 1)) && date <= isoDay();
+}
+
 export default function Home() {
   const [recentLogs, setRecentLogs] = useState<WorkoutLog[]>([]);
   const [stats, setStats] = useState<any>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const logsRef = useRef<WorkoutLog[]>([]);
+  logsRef.current = recentLogs;
 
   useEffect(() => {
     loadData();
   }, []);
 
-  const loadData = async () => {
+  // Apply changes from the server as they happen instead of reloading the list
+  useEffect(() => {
+    let statsTimer: ReturnType<typeof setTimeout> | undefined;
+    const refreshStats = () => {
+      // One revalidation per burst of changes (imports, batch analyses)
+      clearTimeout(statsTimer);
+      statsTimer = setTimeout(() => {
+        api.getSummaryStats().then(setStats).catch(() => {});
+      }, 500);
+    };
+
+    const unsubscribe = api.subscribeChanges(async (event) => {
+      if (event.type === 'reset') {
+        loadData(false);
+        return;
+      }
+      // An analysed log also arrives as a `log` event
+      if (event.type === 'analysis') return;
+
+      refreshStats();
+      const { date } = event.data;
+      if (!isRecent(date)) return;
+
+      if (event.type === 'deleted') {
+        setRecentLogs((logs) => logs.filter((log) => log.date !== date));
+        return;
+      }
+
+      // Already up to date unless the version moved or the file was edited by hand
+      const current = logsRef.current.find((log) => log.date === date);
+      if (current && event.data.source === 'api' && current.metadata.version === event.data.version) return;
+
+      try {
+        const log = await api.getLog(date);
+        setRecentLogs((logs) =>
+          [...logs.filter((l) => l.date !== date), log].sort((a, b) => a.date.localeCompare(b.date))
+        );
+      } catch {
+        // Deleted meanwhile: a `deleted` event follows
+      }
+    });
+
+    return () => {
+      unsubscribe();
+      clearTimeout(statsTimer);
+    };
+  }, []);
+
+  const loadData = async (showLoading: boolean = true) => {
     try {
-      setLoading(true);
+      if (showLoading) setLoading(true);
       const [logs, statsData] = await Promise.all([
-        api.getLogs(7),
+        api.getLogs(RECENT_DAYS),
         api.getSummaryStats(),
       ]);
       setRecentLogs(logs);
@@ -2,12 +2,16 @@
  * API client for backend communication
  */
 
-import { WorkoutLog, WorkoutLogCreate } from '@/types';
+import {
+  AnalysisStreamEvent, ChangeEvent, ExerciseProgression, ImportResult, SearchResult, WorkoutLog, WorkoutLogCreate
+} from '@/types';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
 class APIClient {
   private baseUrl: string;
+  // Last response body and ETag per GET endpoint, revalidated with If-None-Match
+  private etagCache = new Map<string, { etag: string; data: unknown }>();
 
   constructor(baseUrl: string) {
     this.baseUrl = baseUrl;
@@ -34,6 +38,33 @@ class APIClient {
     return response.json();
   }
 
+  // GET a resource, sending the ETag of the copy fetched last time; while it
+  // is unchanged the server answers an empty 304 and that copy is reused
+  private async cachedRequest<T>(endpoint: string): Promise<T> {
+    const cached = this.etagCache.get(endpoint);
+    const response = await fetch(`${this.baseUrl}${endpoint}`, {
+      headers: cached ? { 'If-None-Match': cached.etag } : undefined,
+    });
+
+    if (response.status === 304 && cached) {
+      return cached.data as T;
+    }
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      throw new Error(error.detail || `HTTP ${response.status}`);
+    }
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+      this.etagCache.set(endpoint, { etag, data });
+    } else {
+      this.etagCache.delete(endpoint);
+    }
+    return data;
+  }
+
   // Health check
   async healthCheck() {
     return this.request<{ status: string }>('/');
@@ -41,17 +72,17 @@ class APIClient {
 
   // Get recent logs
   async getLogs(days: number = 7): Promise<WorkoutLog[]> {
-    return this.request<WorkoutLog[]>(`/logs?days=${days}`);
+    return this.cachedRequest<WorkoutLog[]>(`/logs?days=${days}`);
   }
 
   // Get logs in date range
   async getLogsRange(startDate: string, endDate: string): Promise<WorkoutLog[]> {
-    return this.request<WorkoutLog[]>(`/logs?start_date=${startDate}&end_date=${endDate}`);
+    return this.cachedRequest<WorkoutLog[]>(`/logs?start_date=${startDate}&end_date=${endDate}`);
   }
 
   // Get single log by date
   async getLog(date: string): Promise<WorkoutLog> {
-    return this.request<WorkoutLog>(`/logs/${date}`);
+    return this.cachedRequest<WorkoutLog>(`/logs/${date}`);
   }
 
   // Create new log
@@ -63,10 +94,13 @@ class APIClient {
   }
 
   // Update existing log
-  async updateLog(date: string, log: WorkoutLogCreate): Promise<WorkoutLog> {
+  // Pass the version that was loaded to have the update rejected (412) if
+  // the log changed since
+  async updateLog(date: string, log: WorkoutLogCreate, version?: number): Promise<WorkoutLog> {
     return this.request<WorkoutLog>(`/logs/${date}`, {
       method: 'PUT',
       body: JSON.stringify(log),
+      headers: version !== undefined ? { 'If-Match': `"${version}"` } : undefined,
     });
   }
 
@@ -77,14 +111,134 @@ class APIClient {
     });
   }
 
+  // Export logs as an NDJSON file (whole history by default)
+  async exportLogs(startDate?: string, endDate?: string): Promise<Blob> {
+    const params = new URLSearchParams();
+    if (startDate) params.set('start_date', startDate);
+    if (endDate) params.set('end_date', endDate);
+
+    const response = await fetch(`${this.baseUrl}/logs/export?${params}`);
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      throw new Error(error.detail || `HTTP ${response.status}`);
+    }
+
+    return response.blob();
+  }
+
+  // Import logs from an NDJSON file
+  async importLogs(file: Blob, options: { dryRun?: boolean; overwrite?: boolean } = {}): Promise<ImportResult> {
+    const params = new URLSearchParams({
+      dry_run: String(options.dryRun ?? false),
+      overwrite: String(options.overwrite ?? false),
+    });
+
+    return this.request<ImportResult>(`/logs/import?${params}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/x-ndjson' },
+      body: file,
+    });
+  }
+
   // Request AI analysis
   async analyzeLog(date: string, historyDays: number = 7): Promise<WorkoutLog> {
-    return this.request<WorkoutLog>(`/analysis/${date}?include_history_days=${historyDays}`);
+    return this.request<WorkoutLog>(`/analysis/${date}?include_history_days=${historyDays}`, {
+      method: 'POST',
+    });
+  }
+
+  // Request AI analysis as a stream of server-sent events; resolves with the saved log
+  async analyzeLogStream(
+    date: string,
+    onEvent: (event: AnalysisStreamEvent) => void,
+    historyDays: number = 7
+  ): Promise<WorkoutLog> {
+    const response = await fetch(
+      `${this.baseUrl}/analysis/${date}/stream?include_history_days=${historyDays}`,
+      { method: 'POST' }
+    );
+
+    if (!response.ok || !response.body) {
+      const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      throw new Error(error.detail || `HTTP ${response.status}`);
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += value;
+
+      // Events are separated by a blank line: "event: <type>\ndata: <json>"
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        const type = raw.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] ?? 'null');
+        const event = { type, data } as AnalysisStreamEvent;
+
+        onEvent(event);
+        if (event.type === 'error') throw new Error(event.data.detail);
+        if (event.type === 'done') return event.data;
+      }
+    }
+
+    throw new Error('Analysis stream ended unexpectedly');
+  }
+
+  // Subscribe to log changes (API writes, hand-edited files, finished
+  // analyses) as server-sent events; returns a function that unsubscribes.
+  // EventSource reconnects by itself and the server replays missed events,
+  // or sends `reset` when it can't
+  subscribeChanges(onEvent: (event: ChangeEvent) => void): () => void {
+    const source = new EventSource(`${this.baseUrl}/events`);
+    const types: ChangeEvent['type'][] = ['log', 'deleted', 'analysis', 'reset'];
+
+    for (const type of types) {
+      source.addEventListener(type, (message) => {
+        onEvent({ type, data: JSON.parse((message as MessageEvent).data) } as ChangeEvent);
+      });
+    }
+
+    return () => source.close();
+  }
+
+  // Search reflections, notes and body areas (`word*` matches a prefix)
+  async searchLogs(
+    query: string,
+    options: { bodyArea?: string; startDate?: string; endDate?: string; limit?: number } = {}
+  ): Promise<SearchResult> {
+    const params = new URLSearchParams();
+    if (query) params.set('q', query);
+    if (options.bodyArea) params.set('body_area', options.bodyArea);
+    if (options.startDate) params.set('start_date', options.startDate);
+    if (options.endDate) params.set('end_date', options.endDate);
+    if (options.limit) params.set('limit', String(options.limit));
+
+    return this.request<SearchResult>(`/search?${params}`);
+  }
+
+  // List logged exercises, most frequent first
+  async getProgressionExercises(): Promise<{ exercise: string; sessions: number; last_date: string }[]> {
+    return this.request('/progression');
+  }
+
+  // Top set, volume and estimated 1RM per session of one exercise
+  async getExerciseProgression(exercise: string, startDate?: string, endDate?: string): Promise<ExerciseProgression> {
+    const params = new URLSearchParams();
+    if (startDate) params.set('start_date', startDate);
+    if (endDate) params.set('end_date', endDate);
+
+    return this.request<ExerciseProgression>(`/progression/${encodeURIComponent(exercise)}?${params}`);
   }
 
   // Get summary stats
   async getSummaryStats() {
-    return this.request<{
+    return this.cachedRequest<{
       total_logs: number;
       date_range: { first: string; last: string } | null;
       workout_types: Record<string, number>;
@@ -93,7 +247,7 @@ class APIClient {
 
   // List all log dates
   async getLogDates(): Promise<string[]> {
-    return this.request<string[]>('/logs/dates');
+    return this.cachedRequest<string[]>('/logs/dates');
   }
 }
 
@@ -38,15 +38,44 @@ export interface MachineContext {
   confidence_score?: number;
 }
 
+export interface TokenUsage {
+  input_tokens: number;
+  cache_creation_input_tokens: number;
+  cache_read_input_tokens: number;
+  output_tokens: number;
+}
+
 export interface AIAnalysis {
   human_insight: string;
   machine_context: MachineContext;
   analyzed_at: string;
+  model?: string;
+  prompt_version?: string;
+  usage?: TokenUsage;
+  log_version?: number;
+}
+
+export type ImplementType = 'barbell' | 'dumbbell' | 'kettlebell' | 'machine' | 'cable' | 'band' | 'bodyweight';
+
+export interface ExerciseMetrics {
+  name: string;
+  implement?: ImplementType | null;
+  bodyweight: boolean;
+  top_set_kg?: number | null;
+  volume_kg?: number | null;
+  estimated_1rm_kg?: number | null;
+}
+
+export interface LogMetrics {
+  version: number;
+  total_volume_kg: number;
+  exercises: ExerciseMetrics[];
 }
 
 export interface Metadata {
   created_at: string;
   updated_at: string;
+  version: number;
 }
 
 export interface WorkoutLog {
@@ -59,6 +88,7 @@ export interface WorkoutLog {
   pain_or_tightness?: PainOrTightness;
   free_text_reflection?: string;
   ai_analysis?: AIAnalysis;
+  metrics?: LogMetrics | null;
   metadata: Metadata;
 }
 
@@ -72,3 +102,58 @@ export interface WorkoutLogCreate {
   pain_or_tightness?: PainOrTightness;
   free_text_reflection?: string;
 }
+
+export type AnalysisStreamEvent =
+  | { type: 'insight'; data: { text: string } }
+  | { type: 'context'; data: Partial<MachineContext> }
+  | { type: 'done'; data: WorkoutLog }
+  | { type: 'error'; data: { detail: string } };
+
+// Events from GET /events; `source` is "file" for logs edited outside the API
+export type ChangeEvent =
+  | { type: 'log'; data: { date: string; version: number | null; source: 'api' | 'file' } }
+  | { type: 'deleted'; data: { date: string; source: 'api' | 'file' } }
+  | {
+      type: 'analysis';
+      data: { date: string; status: 'succeeded' | 'failed'; job_id?: string; model?: string; error?: string };
+    }
+  | { type: 'reset'; data: Record<string, never> };
+
+export interface ImportResult {
+  dry_run: boolean;
+  imported: number;
+  skipped: number;
+  failed: number;
+  errors: { line: number; date: string | null; error: string }[];
+}
+
+export interface SearchHit {
+  date: string;
+  score: number;
+  fields: string[];
+  log?: WorkoutLog;
+}
+
+export interface SearchResult {
+  total: number;
+  hits: SearchHit[];
+}
+
+export interface ProgressionPoint {
+  date: string;
+  sets?: number | null;
+  reps?: number | null;
+  load?: string | null;
+  implement?: ImplementType | null;
+  top_set_kg?: number | null;
+  volume_kg?: number | null;
+  estimated_1rm_kg?: number | null;
+}
+
+export interface ExerciseProgression {
+  exercise: string;
+  sessions: number;
+  best_top_set_kg?: number | null;
+  best_estimated_1rm_kg?: number | null;
+  points: ProgressionPoint[];
+}